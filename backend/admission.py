@@ -0,0 +1,341 @@
+"""
+Admission Control
+Per-client token buckets, per-route concurrency caps and a bounded wait
+queue, so one client cannot monopolise the workers
+
+Each API route resolves to a rule (ROUTE_RULES, overridable with the
+ADMISSION_RULES JSON env var):
+
+    rate, burst      token bucket per client and route; empty -> 429
+    concurrency      requests of this route running at once in the process
+    queue, wait      how many may wait for a slot and for how long;
+                     queue full or wait expired -> 503
+
+Both rejections carry Retry-After. Buckets live in a memory-mapped file
+shared by every worker on the machine (ADMISSION_STORE=shared, the default
+where fcntl exists) or per process (ADMISSION_STORE=memory). Concurrency caps
+are per process; they matter for threaded and ASGI workers, while sync
+workers are protected by the shared buckets.
+
+Behind a reverse proxy set ADMISSION_PROXY_HOPS to the number of proxies
+that append to X-Forwarded-For, so the client address is taken from the
+entry the nearest trusted proxy added.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify, request
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+STORE = os.getenv('ADMISSION_STORE', 'shared' if fcntl else 'memory')
+STATE_FILE = os.getenv(
+    'ADMISSION_STATE_FILE',
+    os.path.join(tempfile.gettempdir(), 'sustainable-design-admission.bin'),
+)
+SHARED_SLOTS = int(os.getenv('ADMISSION_SHARED_SLOTS', 16384))
+MEMORY_MAX_CLIENTS = 10000
+PROXY_HOPS = int(os.getenv('ADMISSION_PROXY_HOPS', 0))
+
+# None disables a limit. Rates are requests per second per client.
+DEFAULT_RULE = {'rate': 20.0, 'burst': 40, 'concurrency': None, 'queue': 0, 'wait': 0.0}
+ROUTE_RULES = {
+    '/api/designs/generate': {'rate': 1.0, 'burst': 10, 'concurrency': 4, 'queue': 8, 'wait': 2.0},
+    # Fired on every slider step, and cheap
+    '/api/designs/preview': {'rate': 50.0, 'burst': 100},
+    '/api/designs/generate/batch': {'rate': 0.05, 'burst': 3, 'concurrency': 2, 'queue': 2, 'wait': 2.0},
+    '/api/analysis/uncertainty': {'rate': 2.0, 'burst': 10, 'concurrency': 2, 'queue': 4, 'wait': 1.0},
+    '/api/analysis/lifecycle': {'rate': 5.0, 'burst': 20, 'concurrency': 4, 'queue': 8, 'wait': 1.0},
+    '/api/portfolio/optimize': {'rate': 0.5, 'burst': 5, 'concurrency': 2, 'queue': 4, 'wait': 2.0},
+    # Submissions only; the work runs in the job worker pool
+    '/api/jobs': {'rate': 0.5, 'burst': 10},
+    '/api/auth/login': {'rate': 0.2, 'burst': 5, 'concurrency': 2, 'queue': 4, 'wait': 1.0},
+    '/api/auth/signup': {'rate': 0.05, 'burst': 3, 'concurrency': 2, 'queue': 4, 'wait': 1.0},
+    '/api/health': None,
+    '/api/metrics': None,
+}
+EXEMPT_PREFIXES = ('/api/admin/',)
+
+
+def _load_rules():
+    rules = {route: (dict(DEFAULT_RULE, **rule) if rule else None) for route, rule in ROUTE_RULES.items()}
+    overrides = os.getenv('ADMISSION_RULES')
+    if overrides:
+        for route, rule in json.loads(overrides).items():
+            rules[route] = dict(rules.get(route) or DEFAULT_RULE, **rule) if rule else None
+    return rules
+
+
+RULES = _load_rules()
+
+
+class AdmissionRejected(Exception):
+    """Request refused before it reached the handler"""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+# ==================== TOKEN BUCKETS ====================
+
+def _refill(tokens, last, now, rate, burst):
+    return min(float(burst), tokens + (now - last) * rate)
+
+
+class MemoryBuckets:
+    """Buckets held in this process (LRU-bounded)"""
+
+    def __init__(self, max_clients=MEMORY_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            tokens = burst if bucket is None else _refill(bucket[0], bucket[1], now, rate, burst)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+class SharedBuckets:
+    """
+    Buckets in a memory-mapped file shared by all workers on the machine.
+
+    Each slot is (key hash, tokens, last refill). A client whose slot was
+    taken over by a colliding key simply starts with a full bucket.
+    """
+
+    _SLOT = struct.Struct('<Qdd')
+
+    def __init__(self, path=STATE_FILE, slots=SHARED_SLOTS):
+        self.slots = slots
+        size = slots * self._SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        # flock excludes other processes; threads share the descriptor
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now):
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+        offset = (digest % self.slots) * self._SLOT.size
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                stored, tokens, last = self._SLOT.unpack_from(self._map, offset)
+                if stored != digest or last > now:
+                    tokens = float(burst)
+                else:
+                    tokens = _refill(tokens, last, now, rate, burst)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                self._SLOT.pack_into(self._map, offset, digest, tokens, now)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+# ==================== CONCURRENCY GATES ====================
+
+class RouteGate:
+    """Concurrency cap with a bounded, time-limited wait queue"""
+
+    def __init__(self, concurrency, queue, wait):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.wait = wait
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            if self.active < self.concurrency:
+                self.active += 1
+                return
+            if self.waiting >= self.queue:
+                raise AdmissionRejected(503, 'queue_full', max(self.wait, 1.0))
+            self.waiting += 1
+            deadline = time.monotonic() + self.wait
+            try:
+                while self.active >= self.concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise AdmissionRejected(503, 'wait_timeout', max(self.wait, 1.0))
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+# ==================== ADMISSION ====================
+
+_buckets = None
+_gates = {}
+_gates_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _get_buckets():
+    global _buckets
+    if _buckets is None:
+        try:
+            _buckets = SharedBuckets() if STORE == 'shared' and fcntl else MemoryBuckets()
+        except OSError as e:
+            print(f"⚠ Shared admission store unavailable ({e}), using per-process buckets")
+            _buckets = MemoryBuckets()
+    return _buckets
+
+
+def _gate(route, rule):
+    gate = _gates.get(route)
+    if gate is None:
+        with _gates_lock:
+            gate = _gates.setdefault(route, RouteGate(rule['concurrency'], rule['queue'], rule['wait']))
+    return gate
+
+
+def _count(route, outcome):
+    with _stats_lock:
+        per_route = _stats.setdefault(route, {'admitted': 0, 'rate_limited': 0, 'queue_full': 0, 'wait_timeout': 0})
+        per_route[outcome] += 1
+
+
+def rule_for(route):
+    """Rule applying to a route, or None if it is not admission-controlled"""
+    if not route.startswith('/api/') or route.startswith(EXEMPT_PREFIXES):
+        return None
+    return RULES.get(route, DEFAULT_RULE)
+
+
+def admit(route, client):
+    """
+    Apply the route's rule to one request.
+
+    Returns:
+        A release callable (call it when the request finishes)
+
+    Raises:
+        AdmissionRejected: 429 when the client's bucket is empty, 503 when
+        the route's queue is full or the wait expired
+    """
+    rule = rule_for(route) if ENABLED else None
+    if rule is None:
+        return _noop
+
+    if rule['rate']:
+        allowed, retry_after = _get_buckets().take(f"{route}|{client}", rule['rate'], rule['burst'], time.monotonic())
+        if not allowed:
+            _count(route, 'rate_limited')
+            raise AdmissionRejected(429, 'rate_limited', retry_after)
+
+    if not rule['concurrency']:
+        _count(route, 'admitted')
+        return _noop
+
+    gate = _gate(route, rule)
+    try:
+        gate.acquire()
+    except AdmissionRejected as e:
+        _count(route, e.reason)
+        raise
+    _count(route, 'admitted')
+    return gate.release
+
+
+def _noop():
+    pass
+
+
+def client_id(remote_addr, forwarded_for):
+    """Client address, honouring PROXY_HOPS trusted X-Forwarded-For entries"""
+    if PROXY_HOPS and forwarded_for:
+        hops = [part.strip() for part in forwarded_for.split(',') if part.strip()]
+        if hops:
+            return hops[-min(PROXY_HOPS, len(hops))]
+    return remote_addr or 'unknown'
+
+
+def rejection_body(error):
+    messages = {
+        'rate_limited': 'Too many requests, slow down',
+        'queue_full': 'Server busy, retry shortly',
+        'wait_timeout': 'Server busy, retry shortly',
+    }
+    return {'error': messages[error.reason], 'reason': error.reason}
+
+
+def retry_after_header(error):
+    return str(max(1, int(error.retry_after + 0.999)))
+
+
+def stats():
+    """Flat counters for /api/metrics"""
+    flat = {}
+    with _stats_lock:
+        for route, counts in _stats.items():
+            slug = re.sub(r'[^a-z0-9]+', '_', route[len('/api/'):].lower()).strip('_')
+            for outcome, value in counts.items():
+                flat[f"{slug}_{outcome}_total"] = value
+    for route, gate in list(_gates.items()):
+        slug = re.sub(r'[^a-z0-9]+', '_', route[len('/api/'):].lower()).strip('_')
+        flat[f"{slug}_active"] = gate.active
+        flat[f"{slug}_waiting"] = gate.waiting
+    return flat
+
+
+# ==================== FLASK HOOKS ====================
+
+def _before_request():
+    if request.url_rule is None:
+        return None
+    client = client_id(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    try:
+        g.admission_release = admit(request.url_rule.rule, client)
+    except AdmissionRejected as e:
+        return jsonify(rejection_body(e)), e.status, {'Retry-After': retry_after_header(e)}
+    return None
+
+
+def _teardown_request(error=None):
+    release = g.pop('admission_release', None)
+    if release is not None:
+        release()
+
+
+def init_admission(app):
+    """Install admission control on every API route"""
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
+    return app
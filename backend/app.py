@@ -9,20 +9,39 @@ evaluation, and lightweight ML-powered cost prediction and design ranking.
 Academic Project - Final Year Major Project with ML v2.0
 """
 
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify, session, stream_with_context
+from werkzeug.exceptions import BadRequest, HTTPException, RequestEntityTooLarge
 from flask_cors import CORS
 from datetime import datetime
 import json
 import os
 import secrets
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-from constraints import ConstraintEngine
-from generator import DesignGenerator
 from evaluator import SustainabilityEvaluator
+from generator import DesignGenerator
+from project_cache import project_cache
+import password_hasher
+import retention
+from instrumentation import init_instrumentation, register_collector, stage
+from profiler import init_profiler, is_admin
+import admission
+import deadlines
+import response_format
+import http_cache
+import incremental
+import jobs
+import lifecycle
+import portfolio
+import progressive
+from preview import init_preview
+import uncertainty
+from json_provider import init_json
+from static_assets import init_static
 
 # Try Supabase first, fallback to SQLite
 use_supabase = False
@@ -32,12 +51,14 @@ try:
         from db_supabase import (
             initialize_db,
             save_project,
+            save_projects,
             list_projects,
             get_project,
             create_user,
             verify_user,
             clear_projects,
         )
+        import db_supabase as db_backend
         use_supabase = True
         print("✓ Using Supabase PostgreSQL")
     else:
@@ -47,40 +68,34 @@ except Exception as e:
     from db import (
         initialize_db,
         save_project,
+        save_projects,
         list_projects,
         get_project,
         create_user,
         verify_user,
         clear_projects,
     )
-from simple_ml import (
-    SimpleCostPredictor, SimpleDesignRanker, SimpleDesignRecommender,
-    generate_synthetic_cost_data, generate_synthetic_preference_data,
-    generate_synthetic_historical_projects
-)
-from data_loader import (
-    auto_load_training_data,
-    prepare_cost_training_data,
-    prepare_preference_training_data,
-    prepare_historical_training_data
-)
+    import db as db_backend
+from simple_ml import SimpleCostPredictor
+import pipeline
+from pipeline import train_models, build_generation, rank_designs, recommend
 
 # Configure frontend static files for production
 frontend_build_path = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'dist')
 absolute_frontend_path = os.path.abspath(frontend_build_path)
 
 # Initialize Flask App
+# The frontend build is served from the static manifest (static_assets.py),
+# not Flask's static folder, so SPA routes and precompression share one path
 print(f"🔍 Looking for frontend at: {absolute_frontend_path}")
 print(f"🔍 Frontend exists: {os.path.exists(absolute_frontend_path)}")
+app = Flask(__name__, static_folder=None)
 if os.path.exists(absolute_frontend_path):
-    index_file = os.path.join(absolute_frontend_path, 'index.html')
-    print(f"🔍 index.html exists: {os.path.exists(index_file)}")
-    app = Flask(__name__, static_folder=absolute_frontend_path, static_url_path='/')
     print(f"✓ Serving frontend from {absolute_frontend_path}")
 else:
     print(f"⚠ Frontend not found at {absolute_frontend_path}, API-only mode")
-    app = Flask(__name__)
 
+init_json(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', secrets.token_hex(32))
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HTTPS
@@ -91,37 +106,13 @@ if frontend_url:
     allowed_origins.append(frontend_url)
 
 CORS(app, supports_credentials=True, origins=allowed_origins)
+init_instrumentation(app)
+init_profiler(app)
+admission.init_admission(app)
+deadlines.init_deadlines(app)
 
 # Serve frontend static files for SPA routing
-@app.route('/')
-def serve_frontend_index():
-    """Serve index.html for root path"""
-    index_path = os.path.join(absolute_frontend_path, 'index.html')
-    if os.path.exists(index_path):
-        from flask import send_file
-        return send_file(index_path)
-    return {'status': 'API active', 'message': 'Frontend not built'}, 200
-
-@app.route('/<path:path>')
-def serve_frontend_routes(path):
-    """Serve frontend for SPA routing, fallback for non-API routes"""
-    # If it's an API route, don't serve frontend
-    if path.startswith('api/'):
-        return {'error': 'Endpoint not found'}, 404
-    
-    # Try to serve static files
-    static_file_path = os.path.join(absolute_frontend_path, path)
-    if os.path.exists(static_file_path) and os.path.isfile(static_file_path):
-        from flask import send_file
-        return send_file(static_file_path)
-    
-    # Serve index.html for SPA routing
-    index_path = os.path.join(absolute_frontend_path, 'index.html')
-    if os.path.exists(index_path):
-        from flask import send_file
-        return send_file(index_path)
-    
-    return {'error': 'Not found'}, 404
+init_static(app, absolute_frontend_path)
 
 # Initialize OAuth
 try:
@@ -134,48 +125,54 @@ try:
 except ImportError as e:
     print(f"⚠ OAuth not available: {e}")
 
-# Initialize modules
-constraint_engine = ConstraintEngine()
-design_generator = DesignGenerator()
-evaluator = SustainabilityEvaluator()
+# Initialize modules (shared with the offline pipeline)
+constraint_engine = pipeline.constraint_engine
+design_generator = pipeline.design_generator
+evaluator = pipeline.evaluator
+# Cached responses also depend on the rule code, not just the model state
+CODE_VERSION = http_cache.source_version(
+    SustainabilityEvaluator, SimpleCostPredictor, DesignGenerator, uncertainty, lifecycle
+)
+
+# Metrics-only slider preview, answered ahead of Flask (preview.py)
+init_preview(app, CODE_VERSION, allowed_origins)
+
+# Spawned helper processes (the password hashing pool) import the script
+# that started the server as __mp_main__; only the server itself sets up the
+# database, the retention thread and the models
+IS_SERVER_PROCESS = __name__ != '__mp_main__'
 
 # Initialize SQLite DB
-initialize_db()
+if IS_SERVER_PROCESS:
+    initialize_db()
+    retention.start_retention_worker(db_backend)
+
+register_collector('project_cache', project_cache.stats)
+register_collector('password_hash', lambda: dict(password_hasher.stats))
+register_collector('retention', retention.metrics)
+register_collector('admission', admission.stats)
+register_collector('deadline', deadlines.stats)
 
 # Initialize Lightweight ML Models
-cost_predictor = SimpleCostPredictor()
-design_ranker = SimpleDesignRanker()
-design_recommender = SimpleDesignRecommender()
+# Requests read the current ModelSet once and never mutate it; retraining
+# builds a new set and swaps the module global in a single assignment, so
+# threaded workers never observe a half-trained model.
+models = train_models() if IS_SERVER_PROCESS else None
+_retrain_lock = threading.Lock()
 
-# Train models with real data (or synthetic fallback)
-try:
-    print("🤖 Initializing ML models...")
-    
-    # Try to load real datasets from data/ folder
-    import os
-    data_path = os.path.join(os.path.dirname(__file__), 'data')
-    real_data = auto_load_training_data(data_path)
-    
-    if real_data['cost']:
-        # Train with real data
-        print("✓ Training with REAL datasets...")
-        cost_predictor.train(prepare_cost_training_data(real_data['cost']))
-        design_ranker.train(prepare_preference_training_data(real_data['preference']))
-        design_recommender.learn_from_history(prepare_historical_training_data(real_data['historical']))
-        print(f"✓ ML Models trained on {len(real_data['cost'])} real samples")
-    else:
-        # Fallback to synthetic data
-        print("ℹ No real data found - using synthetic training data")
-        cost_predictor.train(generate_synthetic_cost_data(200))
-        design_ranker.train(generate_synthetic_preference_data(150))
-        design_recommender.learn_from_history(generate_synthetic_historical_projects(100))
-        print("✓ ML Models trained on synthetic data")
-    
-    ml_models_ready = True
-    
-except Exception as e:
-    print(f"⚠ ML training error: {e}")
-    ml_models_ready = True  # Still ready with defaults
+
+def cache_version(model_set=None):
+    """Version mixed into ETags: model fingerprint plus rule code"""
+    return f"{(model_set or models).version}:{CODE_VERSION}"
+
+
+def retrain_models():
+    """Train a new ModelSet off to the side and swap it in atomically"""
+    global models
+    with _retrain_lock:
+        fresh = train_models()
+        models = fresh
+    return fresh
 
 # ==================== ROUTES ====================
 
@@ -185,7 +182,9 @@ def health():
     return jsonify({
         'status': 'healthy',
         'service': 'Sustainable Design API',
-        'ml_enabled': ml_models_ready,
+        'ml_enabled': models.ready,
+        'project_cache': project_cache.stats(),
+        'retention': retention.stats(),
         'timestamp': datetime.now().isoformat()
     }), 200
 
@@ -229,6 +228,52 @@ def validate_constraints():
         return jsonify({'error': str(e)}), 500
 
 
+def run_generation(constraints, deadline=None):
+    """
+    Validate constraints, then generate, evaluate and score designs.
+
+    Shared by the WSGI route and the ASGI server (asgi.py). Optional ML
+    stages give way when deadline (default: the current request's) runs short.
+
+    Returns:
+        Response dict without project_id, or None if constraints are invalid
+    """
+    m = models
+    deadline = deadline or deadlines.current()
+
+    # Validate constraints
+    with stage('validate'):
+        is_valid, _ = constraint_engine.validate(constraints)
+    if not is_valid:
+        return None
+
+    # Get design recommendations from historical patterns
+    recommendations = None
+    if m.ready:
+        # Recommendations depend only on the priority (SimpleDesignRecommender)
+        recommendations = deadline.run('ml_recommend', recommend, constraints, m,
+                                       key=(m.version, constraints['priority']))
+
+    response = build_generation(constraints, m, recommendations, deadline)
+    if deadline.degraded:
+        response['degraded'] = deadline.degraded
+    return response
+
+
+def persist_generation(constraints, response, user_id):
+    """Save a generated project; returns its id"""
+    with stage('save_project'):
+        return save_project(constraints, response['designs'], generation_ml_data(response), user_id=user_id)
+
+
+def generation_ml_data(response):
+    """ML payload persisted alongside a generated project"""
+    return {
+        'ml_rankings': response.get('ml_rankings'),
+        'recommendations': response.get('recommendations')
+    }
+
+
 @app.route('/api/designs/generate', methods=['POST'])
 def generate_designs():
     """
@@ -241,80 +286,34 @@ def generate_designs():
         "climate": str,
         "priority": str
     }
+
+    With ?stream=ndjson or ?stream=sse (or the matching Accept header) the
+    designs and rule-based metrics are sent first and each ML result follows
+    as it finishes (progressive.py).
     """
     try:
         constraints = request.json
         user_id = constraints.get('user_id')
-        
-        # Validate constraints
-        is_valid, _ = constraint_engine.validate(constraints)
-        if not is_valid:
+
+        mode = progressive.requested_mode(request.args, request.headers.get('Accept'))
+        if mode:
+            return generate_designs_progressive(mode, constraints, user_id)
+
+        deadline = deadlines.current()
+        response = run_generation(constraints, deadline)
+        if response is None:
             return jsonify({'error': 'Invalid constraints'}), 400
-        
-        # Generate design alternatives
-        designs = design_generator.generate(constraints)
-        
-        # Evaluate each design
-        evaluated_designs = []
-        for idx, design in enumerate(designs):
-            design['metrics'] = evaluator.evaluate(design, constraints)
-            
-            # Add ML-powered cost prediction if available
-            if ml_models_ready:
-                try:
-                    predicted_cost = cost_predictor.predict(
-                        constraints['area'],
-                        constraints['budget'],
-                        constraints['climate'],
-                        constraints['priority'],
-                        idx
-                    )
-                    if predicted_cost:
-                        design['ml_predicted_cost'] = predicted_cost
-                except:
-                    pass
-            
-            evaluated_designs.append(design)
-        
-        # ML-powered design ranking if available
-        ml_rankings = None
-        if ml_models_ready:
-            try:
-                ranked = design_ranker.rank_designs(evaluated_designs, constraints)
-                ml_rankings = [{'id': d.get('id'), 'ml_score': round(score, 2)} 
-                              for d, score in ranked]
-            except:
-                pass
-        
-        # Get design recommendations from historical patterns
-        recommendations = None
-        if ml_models_ready:
-            try:
-                recommendations = design_recommender.recommend_design(constraints)
-            except:
-                pass
-        
-        response = {
-            'designs': evaluated_designs,
-            'count': len(evaluated_designs),
-            'constraints': constraints,
-            'generated_at': datetime.now().isoformat()
-        }
-        
-        # Add ML enhancements if available
-        if ml_models_ready:
-            response['ml_rankings'] = ml_rankings
-            response['recommendations'] = recommendations
 
-        # Persist project to SQLite
-        try:
-            project_id = save_project(constraints, evaluated_designs, {
-                'ml_rankings': ml_rankings,
-                'recommendations': recommendations
-            }, user_id=user_id)
-            response['project_id'] = project_id
-        except Exception:
-            pass
+        # Persist project to SQLite (skipped when the deadline is too close)
+        response['project_id'] = deadline.run('save_project', persist_generation, constraints, response, user_id)
+        if deadline.degraded:
+            response['degraded'] = deadline.degraded
+
+        # Opt-in compact encoding: ?format=compact[&templates=1]
+        if response_format.wants_compact(request.args):
+            response = response_format.compact_generation(
+                response, constraints, inline_templates=request.args.get('templates') == '1'
+            )
         
         return jsonify(response), 200
         
@@ -322,6 +321,207 @@ def generate_designs():
         return jsonify({'error': str(e)}), 500
 
 
+def generate_designs_progressive(mode, constraints, user_id):
+    """Streamed variant of generate_designs; see progressive.py"""
+    with stage('validate'):
+        is_valid, errors = constraint_engine.validate(constraints)
+    if not is_valid:
+        return jsonify({'error': 'Invalid constraints', 'errors': errors}), 400
+
+    def save(designs, ml_data):
+        with stage('save_project', swallow=True):
+            return save_project(constraints, designs, ml_data, user_id=user_id)
+        return None
+
+    body = progressive.stream(mode, constraints, models, save, app.json.dumps_bytes)
+    return app.response_class(
+        stream_with_context(body), mimetype=progressive.MIMETYPES[mode],
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/designs/generate/incremental', methods=['POST'])
+def generate_designs_incremental():
+    """
+    Patch a previous generation result for changed constraints, recomputing
+    only the affected outputs (for sliders). Nothing is persisted.
+    
+    Expected payload:
+    {
+        "previous": result of /api/designs/generate (or an earlier patch applied to it),
+        "changes": {"budget": 55, ...}  or  "constraints": {full constraints},
+        "model_version": str (optional, from an earlier incremental response)
+    }
+    
+    Returns an RFC 6902 JSON Patch against "previous"; a single replace of
+    the whole document if it cannot be patched.
+    """
+    m = models
+    try:
+        data = request.json
+        if not isinstance(data, dict) or not isinstance(data.get('previous'), dict):
+            return jsonify({'error': 'previous must be a generation result'}), 400
+
+        previous = data['previous']
+        constraints = data.get('constraints')
+        if constraints is None:
+            changes = data.get('changes') or {}
+            if not isinstance(changes, dict):
+                return jsonify({'error': 'changes must be an object'}), 400
+            constraints = dict(previous.get('constraints') or {}, **changes)
+
+        is_valid, errors = constraint_engine.validate(constraints)
+        if not is_valid:
+            return jsonify({'error': 'Invalid constraints', 'errors': errors}), 400
+        constraints = {field: constraints[field] for field in incremental.CONSTRAINT_FIELDS}
+
+        with stage('incremental'):
+            result = incremental.update(previous, constraints, m, data.get('model_version'))
+
+        return jsonify(dict(result, constraints=constraints, model_version=m.version)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 1000))
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', 50))
+NDJSON_TYPES = ('application/x-ndjson', 'application/jsonl')
+
+
+def _batch_items():
+    """(constraints, error) pairs from a JSON list body or an NDJSON stream"""
+    if request.mimetype in NDJSON_TYPES:
+        # Read line by line so work starts before the upload finishes
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield app.json.loads(line), None
+            except ValueError as e:
+                yield None, f'Invalid JSON: {e}'
+        return
+    body = request.get_json()
+    items = body.get('items') if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        raise BadRequest('Expected a JSON list of constraint sets or {"items": [...]}')
+    if len(items) > BATCH_MAX_ITEMS:
+        raise RequestEntityTooLarge(f'At most {BATCH_MAX_ITEMS} items per batch')
+    for item in items:
+        yield item, None
+
+
+def _generate_chunk(chunk, m):
+    """Results for one chunk of (index, constraints, error), in input order"""
+    results = {}
+    valid = []
+    for index, constraints, error in chunk:
+        if error is None and not isinstance(constraints, dict):
+            error = 'Each item must be a JSON object of constraints'
+        if error is not None:
+            results[index] = {'index': index, 'status': 400, 'error': error}
+            continue
+        with stage('validate'):
+            is_valid, errors = constraint_engine.validate(constraints)
+        if not is_valid:
+            results[index] = {'index': index, 'status': 400, 'error': 'Invalid constraints', 'errors': errors}
+            continue
+        valid.append((index, constraints))
+
+    # One pass over the history per distinct priority in the chunk
+    recommendations = [None] * len(valid)
+    if m.ready and valid:
+        with stage('ml_recommend', swallow=True):
+            recommendations = m.design_recommender.recommend_batch([c for _, c in valid])
+
+    generated = []
+    for (index, constraints), recommendation in zip(valid, recommendations):
+        try:
+            response = build_generation(constraints, m, recommendation)
+        except Exception as e:
+            results[index] = {'index': index, 'status': 500, 'error': str(e)}
+            continue
+        generated.append((index, constraints, response))
+
+    # One transaction for the chunk
+    if generated:
+        with stage('save_project', swallow=True):
+            project_ids = save_projects([
+                (constraints, response['designs'], generation_ml_data(response), constraints.get('user_id'))
+                for _, constraints, response in generated
+            ])
+            for (_, _, response), project_id in zip(generated, project_ids):
+                response['project_id'] = project_id
+
+    for index, constraints, response in generated:
+        results[index] = {'index': index, 'status': 200, 'result': response, 'constraints': constraints}
+    return [results[index] for index, _, _ in chunk]
+
+
+def run_generation_batch(items, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Generate, score and persist many constraint sets.
+
+    Items are processed in chunks; each chunk shares its recommendation
+    pass and its save transaction. Yields one result per item in input
+    order as each chunk completes; a bad item yields an error result
+    instead of failing the batch.
+    """
+    m = models
+    chunk = []
+    for index, (constraints, error) in enumerate(items):
+        if index >= BATCH_MAX_ITEMS:
+            yield {'index': index, 'status': 413, 'error': f'At most {BATCH_MAX_ITEMS} items per batch'}
+            break
+        chunk.append((index, constraints, error))
+        if len(chunk) >= chunk_size:
+            yield from _generate_chunk(chunk, m)
+            chunk = []
+    if chunk:
+        yield from _generate_chunk(chunk, m)
+
+
+@app.route('/api/designs/generate/batch', methods=['POST'])
+def generate_designs_batch():
+    """
+    Generate designs for many constraint sets in one request
+
+    Body: a JSON list of constraint objects (or {"items": [...]}), or an
+    NDJSON stream with Content-Type application/x-ndjson.
+
+    Streams NDJSON, one line per item in input order:
+        {"index": 0, "status": 200, "result": {...same as /api/designs/generate...}}
+        {"index": 1, "status": 400, "error": "Invalid constraints", "errors": [...]}
+    then {"summary": {"items": n, "succeeded": k, "failed": n - k}}.
+    ?format=compact applies to each result.
+    """
+    items = _batch_items()
+    compact = response_format.wants_compact(request.args)
+    if request.mimetype not in NDJSON_TYPES:
+        # Reject a malformed or oversized JSON body before streaming starts
+        try:
+            items = iter(list(items))
+        except HTTPException as e:
+            return jsonify({'error': e.description}), e.code
+
+    def stream():
+        succeeded = failed = 0
+        for entry in run_generation_batch(items):
+            constraints = entry.pop('constraints', None)
+            if entry['status'] == 200:
+                succeeded += 1
+                if compact:
+                    entry['result'] = response_format.compact_generation(entry['result'], constraints)
+            else:
+                failed += 1
+            yield app.json.dumps_bytes(entry) + b'\n'
+        summary = {'items': succeeded + failed, 'succeeded': succeeded, 'failed': failed}
+        yield app.json.dumps_bytes({'summary': summary}) + b'\n'
+
+    return app.response_class(stream_with_context(stream()), mimetype='application/x-ndjson')
+
+
 @app.route('/api/projects', methods=['GET'])
 def get_projects():
     """List recent saved projects"""
@@ -376,6 +576,8 @@ def signup():
             user = create_user(name, email, password)
             print(f"✓ User created: {email}")
             return jsonify({'user': user}), 201
+        except password_hasher.HashingBusyError as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
         except Exception as e:
             if 'duplicate' in str(e).lower() or 'unique' in str(e).lower():
                 return jsonify({'error': 'Email already exists'}), 409
@@ -404,12 +606,14 @@ def login():
 
         print(f"✓ User logged in: {email}")
         return jsonify({'user': user}), 200
+    except password_hasher.HashingBusyError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         print(f"❌ Login error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/designs/<design_id>/evaluate', methods=['POST'])
+@app.route('/api/designs/<design_id>/evaluate', methods=['GET', 'POST'])
 def evaluate_design(design_id):
     """
     Evaluate a specific design against sustainability metrics
@@ -419,29 +623,36 @@ def evaluate_design(design_id):
         "design": dict (design object),
         "constraints": dict (constraint object)
     }
+
+    Cached with a weak ETag: evaluation_timestamp differs between otherwise
+    identical responses.
     """
     try:
-        data = request.json
+        data = http_cache.request_input()
         design = data.get('design')
         constraints = data.get('constraints')
         
         if not design or not constraints:
             return jsonify({'error': 'Missing design or constraints'}), 400
         
-        # Evaluate sustainability impact
-        metrics = evaluator.evaluate(design, constraints)
-        
-        return jsonify({
-            'design_id': design_id,
-            'metrics': metrics,
-            'evaluation_timestamp': datetime.now().isoformat()
-        }), 200
+        def compute():
+            # Evaluate sustainability impact
+            with stage('evaluate'):
+                metrics = evaluator.evaluate(design, constraints)
+            
+            return {
+                'design_id': design_id,
+                'metrics': metrics,
+                'evaluation_timestamp': datetime.now().isoformat()
+            }, 200
+
+        return http_cache.conditional(data, cache_version(), compute, weak=True)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/comparison/rankings', methods=['POST'])
+@app.route('/api/comparison/rankings', methods=['GET', 'POST'])
 def get_rankings():
     """
     Rank designs by sustainability metrics (Rule-based and ML-based)
@@ -452,42 +663,46 @@ def get_rankings():
         "constraints": dict of constraints
     }
     """
+    m = models
     try:
-        data = request.json
+        data = http_cache.request_input()
         designs = data.get('designs', [])
         constraints = data.get('constraints', {})
         
         if not designs:
             return jsonify({'error': 'No designs provided'}), 400
         
-        # Rule-based ranking
-        rule_based_rankings = evaluator.rank_designs(designs)
-        
-        # ML-based ranking if available
-        ml_rankings = None
-        if ml_models_ready:
-            try:
-                ranked = design_ranker.rank_designs(designs, constraints)
-                ml_rankings = [{'id': d.get('id'), 'ml_score': round(score, 2)} 
-                              for d, score in ranked]
-            except:
-                pass
-        
-        response = {
-            'rule_based_rankings': rule_based_rankings,
-            'total_designs': len(designs)
-        }
-        
-        if ml_rankings:
-            response['ml_rankings'] = ml_rankings
-        
-        return jsonify(response), 200
+        deadline = deadlines.current()
+
+        def compute():
+            # Rule-based ranking
+            with stage('rank'):
+                rule_based_rankings = evaluator.rank_designs(designs)
+            
+            # ML-based ranking if available
+            ml_rankings = None
+            if m.ready:
+                ml_rankings = deadline.run('ml_rank', rank_designs, constraints, m, designs)
+            
+            response = {
+                'rule_based_rankings': rule_based_rankings,
+                'total_designs': len(designs)
+            }
+            
+            if ml_rankings:
+                response['ml_rankings'] = ml_rankings
+            if deadline.degraded:
+                response['degraded'] = deadline.degraded
+            
+            return response, 200
+
+        return http_cache.conditional(data, cache_version(m), compute)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/ml/cost-prediction', methods=['POST'])
+@app.route('/api/ml/cost-prediction', methods=['GET', 'POST'])
 def predict_cost():
     """
     Predict project cost using ML model
@@ -500,39 +715,219 @@ def predict_cost():
         "priority": str,
         "design_id": int (0, 1, or 2)
     }
+
+    confidence is the share of Monte Carlo samples (default input
+    uncertainty) within 10% of predicted_cost; prediction_interval gives
+    their p10/p50/p90.
     """
-    if not ml_models_ready:
+    m = models
+    if not m.ready:
         return jsonify({'error': 'ML models not available'}), 503
     
     try:
-        data = request.json
-        
-        predicted_cost = cost_predictor.predict(
-            data.get('area', 1000),
-            data.get('budget', 50),
-            data.get('climate', 'moderate'),
-            data.get('priority', 'energy'),
-            data.get('design_id', 0)
-        )
-        
-        if predicted_cost is None:
-            return jsonify({'error': 'Prediction failed'}), 500
+        data = http_cache.request_input()
         
-        # Get feature importance
-        importance = cost_predictor.get_feature_importance()
-        
-        return jsonify({
-            'predicted_cost': int(predicted_cost),
-            'confidence': 0.85,
-            'feature_importance': importance,
-            'model': 'LinearRegression'
-        }), 200
+        def compute():
+            with stage('ml_cost'):
+                predicted_cost = m.cost_predictor.predict(
+                    data.get('area', 1000),
+                    data.get('budget', 50),
+                    data.get('climate', 'moderate'),
+                    data.get('priority', 'energy'),
+                    data.get('design_id', 0)
+                )
+            
+            if predicted_cost is None:
+                return {'error': 'Prediction failed'}, 500
+            
+            # Get feature importance
+            importance = m.cost_predictor.get_feature_importance()
+
+            # Spread under default input uncertainty (uncertainty.py)
+            def cost_interval():
+                with stage('monte_carlo'):
+                    return uncertainty.cost_interval({
+                        'area': data.get('area', 1000),
+                        'budget': data.get('budget', 50),
+                        'climate': data.get('climate', 'moderate'),
+                        'priority': data.get('priority', 'energy'),
+                    }, m.cost_predictor, data.get('design_id', 0))
+
+            deadline = deadlines.current()
+            interval, confidence = deadline.run('monte_carlo', cost_interval, fallback=(None, None))
+            
+            response = {
+                'predicted_cost': int(predicted_cost),
+                'confidence': confidence,
+                'prediction_interval': interval,
+                'feature_importance': importance,
+                'model': 'LinearRegression'
+            }
+            if deadline.degraded:
+                response['degraded'] = deadline.degraded
+            return response, 200
+
+        return http_cache.conditional(data, cache_version(m), compute)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/ml/recommendations', methods=['POST'])
+@app.route('/api/analysis/uncertainty', methods=['GET', 'POST'])
+def uncertainty_analysis():
+    """
+    Monte Carlo percentile bands for cost, payback and operational carbon
+    
+    Expected payload:
+    {
+        "area": int, "budget": int, "climate": str, "priority": str,
+        "area_tolerance": float (default 0.10),
+        "budget_range": int (default 10),
+        "climate_mix": {"cold": w, "moderate": w, "hot": w} (default: climate),
+        "cost_per_sqft_cv": float (default 0.12),
+        "design_ids": ["design-a", ...] (default: all),
+        "samples": int (default 100000), "seed": int (default 0)
+    }
+    """
+    m = models
+    try:
+        data = http_cache.request_input()
+
+        is_valid, errors = constraint_engine.validate(data)
+        params, param_errors = uncertainty.parse_params(data)
+        errors = (errors if not is_valid else []) + param_errors
+        if errors:
+            return jsonify({'error': 'Invalid input', 'errors': errors}), 400
+
+        def compute():
+            with stage('monte_carlo'):
+                return uncertainty.analyze(data, m.cost_predictor, params), 200
+
+        return http_cache.conditional(data, cache_version(m), compute)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/analysis/lifecycle', methods=['GET', 'POST'])
+def lifecycle_analysis():
+    """
+    Yearly cumulative carbon and discounted cash flow per design and scenario
+    
+    Expected payload:
+    {
+        "area": int, "budget": int, "climate": str, "priority": str,
+        "years": int (default 30, at most 60),
+        "scenarios": ["static_grid", "stated_policies", "net_zero_2050",
+                      {"name": str, "base": preset, "grid_decarbonization": float,
+                       "grid_floor": float, "degradation": float,
+                       "discount_rate": float, "energy_price_escalation": float}],
+        "green_premium": float (default 0.08),
+        "design_ids": ["design-a", ...] (default: all)
+    }
+    """
+    try:
+        data = http_cache.request_input()
+
+        is_valid, errors = constraint_engine.validate(data)
+        params, param_errors = lifecycle.parse_params(data)
+        errors = (errors if not is_valid else []) + param_errors
+        if errors:
+            return jsonify({'error': 'Invalid input', 'errors': errors}), 400
+
+        def compute():
+            with stage('lifecycle'):
+                return lifecycle.analyze(data, params), 200
+
+        return http_cache.conditional(data, cache_version(), compute)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/portfolio/optimize', methods=['POST'])
+def optimize_portfolio():
+    """
+    Budget levels and designs across buildings maximizing total
+    sustainabilityIndex under a total cost cap
+    
+    Expected payload:
+    {
+        "budget_cap": number (USD),
+        "buildings": [{"id": any, "area": int, "climate": str, "priority": str,
+                       "budget_levels": [int, ...] (optional)}, ...],
+        "budget_levels": [int, ...] (default 0, 10, ..., 100),
+        "method": "auto" | "dp" | "lagrangian" (default "auto")
+    }
+    """
+    try:
+        params, errors = portfolio.parse_request(request.json)
+        if errors:
+            return jsonify({'error': 'Invalid input', 'errors': errors}), 400
+
+        with stage('portfolio'):
+            result, status = portfolio.optimize(params)
+        return jsonify(result), status
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a long-running analysis for the job worker pool (jobs.py)
+    
+    Expected payload:
+    {
+        "kind": "sweep" | "monte_carlo" | "lifecycle" | "portfolio" | "batch_score",
+        "params": dict (the kind's payload),
+        "priority": int (-100 to 100, default 0; higher runs first)
+    }
+    
+    Returns 202 with the job id; poll GET /api/jobs/<job_id>.
+    """
+    try:
+        # Attributed to the signed-in user only; the body cannot claim one
+        body, status = jobs.submit(db_backend, request.get_json(silent=True), user_id=session.get('user_id'))
+        response = jsonify(body)
+        response.status_code = status
+        if status == 202:
+            response.headers['Location'] = body['status_url']
+        elif status == 503:
+            response.headers['Retry-After'] = '30'
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Status, progress and (once succeeded) result of a job"""
+    try:
+        job = db_backend.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(jobs.public_view(job)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued job, or ask the worker pool to stop a running one"""
+    try:
+        status = db_backend.cancel_job(job_id, ttl_seconds=jobs.RESULT_TTL_SECONDS)
+        if status is None:
+            return jsonify({'error': 'Job not found'}), 404
+        if status not in ('cancelled', 'cancelling'):
+            return jsonify({'error': 'Job already finished', 'job_id': job_id, 'status': status}), 409
+        return jsonify({'job_id': job_id, 'status': status}), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/ml/recommendations', methods=['GET', 'POST'])
 def get_recommendations():
     """
     Get design recommendations based on similar historical projects
@@ -545,26 +940,29 @@ def get_recommendations():
         "priority": str
     }
     """
-    if not ml_models_ready:
+    m = models
+    if not m.ready:
         return jsonify({'error': 'ML models not available'}), 503
     
     try:
-        constraints = request.json
+        constraints = http_cache.request_input()
         
-        recommendations = design_recommender.recommend_design(constraints, top_n=3)
-        
-        # Map design index to names
-        design_names = ['Eco-Efficient', 'Carbon-Optimized', 'Regenerative']
-        
-        response = {
-            'recommended_design': design_names[recommendations['recommended_design']] 
-                                 if recommendations['recommended_design'] is not None else None,
-            'recommended_design_id': recommendations['recommended_design'],
-            'confidence': round(recommendations['confidence'], 3),
-            'model': 'HistoricalSimilarity'
-        }
-        
-        return jsonify(response), 200
+        def compute():
+            with stage('ml_recommend'):
+                recommendations = m.design_recommender.recommend_design(constraints, top_n=3)
+            
+            # Map design index to names
+            design_names = ['Eco-Efficient', 'Carbon-Optimized', 'Regenerative']
+            
+            return {
+                'recommended_design': design_names[recommendations['recommended_design']] 
+                                     if recommendations['recommended_design'] is not None else None,
+                'recommended_design_id': recommendations['recommended_design'],
+                'confidence': round(recommendations['confidence'], 3),
+                'model': 'HistoricalSimilarity'
+            }, 200
+
+        return http_cache.conditional(constraints, cache_version(m), compute)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -573,7 +971,8 @@ def get_recommendations():
 @app.route('/api/metadata', methods=['GET'])
 def get_metadata():
     """Get system metadata and capabilities"""
-    return jsonify({
+    m = models
+    return http_cache.conditional({}, cache_version(m), lambda: ({
         'project': 'Sustainable Design and Planning Using Generative AI',
         'version': '2.0.0',
         'type': 'Decision-Support System with ML',
@@ -594,9 +993,28 @@ def get_metadata():
                 'Recommendations (HistoricalSimilarity)'
             ]
         },
-        'ml_enabled': ml_models_ready,
+        'ml_enabled': m.ready,
         'academic_context': 'Final-year college project demonstrating AI-powered sustainable design'
-    }), 200
+    }, 200), max_age=http_cache.METADATA_MAX_AGE)
+
+
+@app.route('/api/templates', methods=['GET'])
+def get_templates():
+    """Design templates referenced by compact generate responses"""
+    response = jsonify(response_format.templates_document())
+    response.set_etag(response_format.TEMPLATES_VERSION)
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400
+    return response.make_conditional(request)
+
+
+@app.route('/api/admin/models/retrain', methods=['POST'])
+def retrain():
+    """Retrain the ML models of this worker and swap them in atomically"""
+    if not is_admin():
+        return jsonify({'error': 'Endpoint not found'}), 404
+    fresh = retrain_models()
+    return jsonify({'retrained': True, 'pid': os.getpid(), 'ml_enabled': fresh.ready}), 200
 
 
 # ==================== ERROR HANDLERS ====================
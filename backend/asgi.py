@@ -0,0 +1,477 @@
+"""
+ASGI Server Entry Point
+Asyncio serving mode for the same route set as app.py
+
+    uvicorn asgi:app --workers 4 --port 5000
+
+Routes whose latency is dominated by blocking I/O (design generation with
+its project save, project history, signup and login) are handled natively:
+the event loop awaits database calls on the db_async pool and runs the
+CPU-bound design pipeline on a thread pool, so a worker keeps accepting
+requests while earlier ones wait on PostgreSQL or PBKDF2. Password hashing
+still goes through the password_hasher process pool.
+
+Frontend files are sent straight from the static manifest (static_assets),
+using the server's pathsend extension when it offers one, and slider
+previews are answered on the event loop (preview.py). Progressive
+generation (progressive.py) runs in Flask and is streamed chunk by chunk.
+
+Every other route (validation, evaluation, rankings, ML endpoints, metrics,
+admin and OAuth) is served by the Flask app through a WSGI bridge on its own
+thread pool, so behaviour stays identical to the sync deployment.
+"""
+
+import asyncio
+import io
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import admission
+import deadlines
+import app as wsgi
+import password_hasher
+import preview
+import progressive
+import response_format
+import static_assets
+from db_async import AsyncDB
+from instrumentation import record_request, stage
+
+CPU_THREADS = int(os.getenv('ASGI_CPU_THREADS', 4))
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 8))
+ADMISSION_THREADS = int(os.getenv('ASGI_ADMISSION_THREADS', 16))
+
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_THREADS, thread_name_prefix='cpu')
+wsgi_executor = ThreadPoolExecutor(max_workers=WSGI_THREADS, thread_name_prefix='wsgi')
+# Requests queued by admission control wait here, off the event loop
+admission_executor = ThreadPoolExecutor(max_workers=ADMISSION_THREADS, thread_name_prefix='admission')
+db = AsyncDB(wsgi.db_backend)
+
+
+# ==================== HELPERS ====================
+
+class Request:
+    """Minimal request view over an ASGI scope and its body"""
+
+    __slots__ = ('scope', 'body', 'params', 'start')
+
+    def __init__(self, scope, body, params, start=None):
+        self.scope = scope
+        self.body = body
+        self.params = params
+        self.start = start
+
+    @property
+    def json(self):
+        return wsgi.app.json.loads(self.body) if self.body else None
+
+    @property
+    def args(self):
+        query = parse_qs(self.scope.get('query_string', b'').decode('latin-1'))
+        return {key: values[0] for key, values in query.items()}
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _run_cpu(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, fn, *args)
+
+
+def _cors_headers(scope):
+    """Same CORS answer flask-cors gives the Flask routes"""
+    for name, value in scope.get('headers', []):
+        if name == b'origin':
+            origin = value.decode('latin-1')
+            if origin in wsgi.allowed_origins:
+                return [('Access-Control-Allow-Origin', origin),
+                        ('Access-Control-Allow-Credentials', 'true'),
+                        ('Vary', 'Origin')]
+    return []
+
+
+def _client_id(scope):
+    forwarded = None
+    for name, value in scope.get('headers', []):
+        if name == b'x-forwarded-for':
+            forwarded = value.decode('latin-1')
+    client = scope.get('client') or ('', 0)
+    return admission.client_id(client[0], forwarded)
+
+
+def _json(payload, status=200, headers=None):
+    return status, payload, headers or {}
+
+
+# ==================== NATIVE ROUTES ====================
+
+async def generate_designs(request):
+    """Async twin of app.generate_designs"""
+    try:
+        constraints = request.json
+        user_id = constraints.get('user_id')
+        deadline = deadlines.Deadline.from_header(_header(request.scope, b'x-request-deadline-ms'), request.start)
+
+        response = await _run_cpu(wsgi.run_generation, constraints, deadline)
+        if response is None:
+            return _json({'error': 'Invalid constraints'}, 400)
+
+        response['project_id'] = None
+        if deadline.allows('save_project'):
+            started = time.perf_counter()
+            with stage('save_project', swallow=True) as saving:
+                response['project_id'] = await db.save_project(
+                    constraints, response['designs'], wsgi.generation_ml_data(response), user_id=user_id
+                )
+            deadlines.observe('save_project', time.perf_counter() - started)
+            if saving.failed:
+                deadline.degrade('save_project', 'failed')
+        else:
+            deadline.degrade('save_project', 'skipped')
+        headers = {}
+        if deadline.degraded:
+            response['degraded'] = deadline.degraded
+            headers['X-Degraded-Stages'] = deadlines.degraded_header(deadline.degraded)
+        if response_format.wants_compact(request.args):
+            response = response_format.compact_generation(
+                response, constraints, inline_templates=request.args.get('templates') == '1'
+            )
+        return _json(response, headers=headers)
+    except Exception as e:
+        return _json({'error': str(e)}, 500)
+
+
+async def get_projects(request):
+    """Async twin of app.get_projects"""
+    try:
+        args = request.args
+        limit = int(args.get('limit', 50))
+        user_id = args.get('user_id')
+        guest = args.get('guest') == '1'
+        user_id_val = int(user_id) if user_id is not None and user_id.isdigit() else None
+        return _json({'projects': await db.list_projects(limit, user_id=user_id_val, guest=guest)})
+    except Exception as e:
+        return _json({'error': str(e)}, 500)
+
+
+async def get_project_by_id(request):
+    """Async twin of app.get_project_by_id"""
+    try:
+        project = await db.get_project(int(request.params['project_id']))
+        if not project:
+            return _json({'error': 'Project not found'}, 404)
+        return _json(project)
+    except Exception as e:
+        return _json({'error': str(e)}, 500)
+
+
+async def clear_project_history(request):
+    """Async twin of app.clear_project_history"""
+    try:
+        data = request.json or {}
+        deleted = await db.clear_projects(user_id=data.get('user_id'), guest=bool(data.get('guest')))
+        return _json({'deleted': deleted})
+    except Exception as e:
+        return _json({'error': str(e)}, 500)
+
+
+async def signup(request):
+    """Async twin of app.signup"""
+    try:
+        data = request.json
+        name = data.get('name', '').strip()
+        email = data.get('email', '').strip()
+        password = data.get('password', '').strip()
+
+        if not name or not email or not password:
+            return _json({'error': 'Name, email, and password are required'}, 400)
+
+        try:
+            user = await db.create_user(name, email, password)
+            print(f"✓ User created: {email}")
+            return _json({'user': user}, 201)
+        except password_hasher.HashingBusyError as e:
+            return _json({'error': str(e)}, 503, {'Retry-After': '1'})
+        except Exception as e:
+            if 'duplicate' in str(e).lower() or 'unique' in str(e).lower():
+                return _json({'error': 'Email already exists'}, 409)
+            print(f"❌ Signup error: {str(e)}")
+            return _json({'error': str(e)}, 500)
+    except Exception as e:
+        print(f"❌ Signup error: {str(e)}")
+        return _json({'error': str(e)}, 500)
+
+
+async def login(request):
+    """Async twin of app.login"""
+    try:
+        data = request.json
+        email = data.get('email', '').strip()
+        password = data.get('password', '').strip()
+
+        if not email or not password:
+            return _json({'error': 'Email and password are required'}, 400)
+
+        user = await db.verify_user(email, password)
+        if not user:
+            print(f"❌ Login failed for {email} - invalid credentials")
+            return _json({'error': 'Invalid credentials'}, 401)
+
+        print(f"✓ User logged in: {email}")
+        return _json({'user': user})
+    except password_hasher.HashingBusyError as e:
+        return _json({'error': str(e)}, 503, {'Retry-After': '1'})
+    except Exception as e:
+        print(f"❌ Login error: {str(e)}")
+        return _json({'error': str(e)}, 500)
+
+
+# (method, pattern, Flask-style rule for metrics, handler)
+ROUTES = [
+    ('POST', re.compile(r'^/api/designs/generate$'), '/api/designs/generate', generate_designs),
+    ('GET', re.compile(r'^/api/projects$'), '/api/projects', get_projects),
+    ('GET', re.compile(r'^/api/projects/(?P<project_id>\d+)$'), '/api/projects/<int:project_id>', get_project_by_id),
+    ('POST', re.compile(r'^/api/projects/clear$'), '/api/projects/clear', clear_project_history),
+    ('POST', re.compile(r'^/api/auth/signup$'), '/api/auth/signup', signup),
+    ('POST', re.compile(r'^/api/auth/login$'), '/api/auth/login', login),
+]
+
+
+def _match(method, path):
+    for route_method, pattern, rule, handler in ROUTES:
+        if route_method == method:
+            found = pattern.match(path)
+            if found:
+                return rule, handler, found.groupdict()
+    return None
+
+
+# ==================== WSGI BRIDGE ====================
+
+def _wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'CONTENT_LENGTH': str(len(body)),
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = f'HTTP_{name}'
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _call_wsgi(environ):
+    captured = {}
+
+    def start_response(status, headers, exc_info=None):
+        captured['status'] = int(status.split(' ', 1)[0])
+        captured['headers'] = headers
+
+    result = wsgi.app(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return captured['status'], captured['headers'], body
+
+
+def _pump_wsgi(environ, loop, queue):
+    """Run the Flask app on this thread, handing each chunk to the loop as it is produced"""
+    def put(item):
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    def start_response(status, headers, exc_info=None):
+        put((int(status.split(' ', 1)[0]), headers))
+
+    try:
+        result = wsgi.app(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    put(chunk)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+    finally:
+        put(None)
+
+
+async def _stream_wsgi(scope, body, send):
+    """WSGI bridge that forwards each chunk instead of buffering the body"""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    pump = loop.run_in_executor(wsgi_executor, _pump_wsgi, _wsgi_environ(scope, body), loop, queue)
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        if isinstance(item, tuple):
+            status, headers = item
+            await send({
+                'type': 'http.response.start',
+                'status': status,
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+            })
+        else:
+            await send({'type': 'http.response.body', 'body': item, 'more_body': True})
+    await pump
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+# ==================== STATIC FILES ====================
+
+STATIC_CHUNK = 256 * 1024
+
+
+def _header(scope, name):
+    for raw_name, value in scope.get('headers', []):
+        if raw_name == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def _send_static(scope, send):
+    """Serve a frontend file from the static manifest; False when there is none"""
+    entry = static_assets.lookup(scope['path'].lstrip('/'))
+    if entry is None:
+        return False
+    start = time.perf_counter()
+    status, headers, file_path = static_assets.select(
+        entry, _header(scope, b'accept-encoding'), _header(scope, b'if-none-match')
+    )
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+    })
+    if file_path is None or scope['method'] == 'HEAD':
+        await send({'type': 'http.response.body', 'body': b''})
+    elif 'http.response.pathsend' in scope.get('extensions', {}):
+        # The server can send the file itself (sendfile where available)
+        await send({'type': 'http.response.pathsend', 'path': file_path})
+    else:
+        loop = asyncio.get_running_loop()
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = await loop.run_in_executor(wsgi_executor, f.read, STATIC_CHUNK)
+                more = len(chunk) == STATIC_CHUNK
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': more})
+                if not more:
+                    break
+    record_request('/<path:path>', scope['method'], status, time.perf_counter() - start)
+    return True
+
+
+# ==================== ASGI APP ====================
+
+async def _send(send, status, headers, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            cpu_executor.shutdown(wait=False)
+            wsgi_executor.shutdown(wait=False)
+            admission_executor.shutdown(wait=False)
+            db.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    body = await _read_body(receive)
+    if scope['path'] == preview.ROUTE and scope['method'] in preview.METHODS:
+        # Microseconds of work and a rate-only admission rule: answered on the loop
+        status, headers, payload = preview.handle(
+            scope['method'], scope.get('query_string', b'').decode('latin-1'), body,
+            _header(scope, b'if-none-match'), _header(scope, b'origin'), _client_id(scope),
+        )
+        await _send(send, status, headers, payload)
+        return
+    if (scope['path'] == '/api/designs/generate' and scope['method'] == 'POST'
+            and progressive.requested_mode(Request(scope, body, {}).args, _header(scope, b'accept'))):
+        # Progressive responses stream from Flask chunk by chunk
+        await _stream_wsgi(scope, body, send)
+        return
+    matched = _match(scope['method'], scope['path'])
+    if (matched is None and scope['method'] in ('GET', 'HEAD')
+            and not scope['path'].startswith('/api/') and await _send_static(scope, send)):
+        return
+    if matched is None:
+        environ = _wsgi_environ(scope, body)
+        loop = asyncio.get_running_loop()
+        status, headers, payload = await loop.run_in_executor(wsgi_executor, _call_wsgi, environ)
+        await _send(send, status, headers, payload)
+        return
+
+    rule, handler, params = matched
+    start = time.perf_counter()
+    try:
+        release = await asyncio.get_running_loop().run_in_executor(
+            admission_executor, admission.admit, rule, _client_id(scope)
+        )
+    except admission.AdmissionRejected as e:
+        status, payload, extra_headers = _json(admission.rejection_body(e), e.status,
+                                               {'Retry-After': admission.retry_after_header(e)})
+    else:
+        try:
+            status, payload, extra_headers = await handler(Request(scope, body, params, start))
+        finally:
+            release()
+    data = wsgi.app.json.dumps_bytes(payload) + b'\n'
+    elapsed = time.perf_counter() - start
+    record_request(rule, scope['method'], status, elapsed, len(data))
+
+    headers = [('Content-Type', 'application/json'), ('Content-Length', str(len(data))),
+               ('Server-Timing', f"total;dur={elapsed * 1000:.2f}")]
+    headers.extend(extra_headers.items())
+    headers.extend(_cors_headers(scope))
+    await _send(send, status, headers, data)
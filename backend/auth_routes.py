@@ -3,7 +3,7 @@ OAuth Authentication Routes
 Handles social login callbacks and user authentication
 """
 
-from flask import Blueprint, redirect, url_for, session, request, jsonify
+from flask import Blueprint, current_app, redirect, url_for, session, request, jsonify
 from oauth_config import get_user_info
 import secrets
 
@@ -16,8 +16,10 @@ except ImportError:
 # Initialize blueprint
 auth_bp = Blueprint('auth', __name__)
 
-# This will be set by init_auth_routes
-oauth_instance = None
+
+def _oauth_client(provider):
+    """OAuth client registered on the app by init_auth_routes"""
+    return getattr(current_app.extensions['oauth'], provider)
 
 @auth_bp.route('/auth/<provider>/login')
 def oauth_login(provider):
@@ -26,7 +28,7 @@ def oauth_login(provider):
         return jsonify({'error': 'Invalid provider'}), 400
     
     try:
-        client = getattr(oauth_instance, provider)
+        client = _oauth_client(provider)
         # Store frontend URL in session for redirect after auth
         session['auth_redirect'] = request.args.get('redirect', 'http://localhost:3000')
         redirect_uri = url_for('auth.oauth_callback', provider=provider, _external=True)
@@ -41,7 +43,7 @@ def oauth_callback(provider):
         return jsonify({'error': 'Invalid provider'}), 400
     
     try:
-        client = getattr(oauth_instance, provider)
+        client = _oauth_client(provider)
         token = client.authorize_access_token()
         
         # Get user info from provider
@@ -127,6 +129,6 @@ def logout():
 
 def init_auth_routes(app, oauth):
     """Initialize authentication routes with OAuth instance"""
-    global oauth_instance
-    oauth_instance = oauth
+    # Kept on the app rather than a module global so each app owns its client
+    app.extensions['oauth'] = oauth
     return auth_bp
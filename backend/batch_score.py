@@ -0,0 +1,314 @@
+"""
+Offline Batch Scoring
+Score a CSV of candidate projects through the design pipeline, without the
+web tier
+
+    python batch_score.py data/sample_training_data.csv -o scores.csv
+    python batch_score.py candidates.csv -o scores.parquet --workers 4 --chunk-size 2000
+
+Input is a CSV with area, budget, climate and priority columns, the
+data/sample_training_data.csv format (other columns are ignored). Each row
+is validated by ConstraintEngine, then generated, evaluated and scored by
+the cost predictor, ranker and recommender exactly as /api/designs/generate
+does (pipeline.py).
+
+Output has one row per design of each input row, or a single row listing
+the errors of an invalid input. It is written as CSV, JSON lines or
+Parquet (needs pyarrow), chosen by the output extension unless --format is
+given; "-o -" writes CSV or JSON lines to stdout.
+
+Chunks of rows are scored on a process pool with a bounded number in
+flight and written in input order as they complete, so memory use does not
+depend on the input size. Progress and rows/sec go to stderr.
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline import DATA_DIR, build_generation, constraint_engine, train_models
+from response_format import METRIC_FIELDS, metric_value
+
+INPUT_FIELDS = ('area', 'budget', 'climate', 'priority')
+INTEGER_FIELDS = ('area', 'budget')
+
+# Output columns and their types (for Parquet)
+COLUMNS = (
+    ('row', 'int'),
+    ('area', 'int'),
+    ('budget', 'int'),
+    ('climate', 'str'),
+    ('priority', 'str'),
+    ('valid', 'bool'),
+    ('errors', 'str'),
+    ('feasibility_score', 'float'),
+    ('design_id', 'str'),
+    ('design_name', 'str'),
+    *((field.replace('.', '_'), 'str' if field == 'carbonFootprint' else 'float') for field in METRIC_FIELDS),
+    ('ml_predicted_cost', 'float'),
+    ('ml_score', 'float'),
+    ('ml_rank', 'int'),
+    ('recommended_design', 'int'),
+    ('recommendation_confidence', 'float'),
+)
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+PROGRESS_INTERVAL = 2.0
+
+# Set in the parent before the pool starts, so forked workers inherit it;
+# workers started with "spawn" train their own in _init_worker
+_models = None
+
+
+# ==================== SCORING ====================
+
+def _init_worker(data_dir):
+    global _models
+    if _models is None:
+        with contextlib.redirect_stdout(sys.stderr):
+            _models = train_models(data_dir)
+
+
+def _parse(raw):
+    """Constraints from one CSV row; unparseable numbers are kept for validation to report"""
+    constraints = {}
+    for field in INPUT_FIELDS:
+        value = raw.get(field)
+        if value is None or value.strip() == '':
+            continue
+        value = value.strip()
+        if field in INTEGER_FIELDS:
+            try:
+                value = int(value)
+            except ValueError:
+                pass
+        constraints[field] = value
+    return constraints
+
+
+def _base_row(row_number, constraints, errors=None, feasibility=None):
+    row = dict.fromkeys(COLUMN_NAMES)
+    row['row'] = row_number
+    for field in INPUT_FIELDS:
+        value = constraints.get(field)
+        if field in INTEGER_FIELDS and not isinstance(value, int):
+            value = None
+        row[field] = value
+    row['valid'] = not errors
+    row['errors'] = '; '.join(errors) if errors else None
+    row['feasibility_score'] = feasibility
+    return row
+
+
+def _design_rows(row_number, constraints, response):
+    feasibility = constraint_engine.calculate_feasibility(constraint_engine.process(constraints))
+    ranks = {
+        entry['id']: (position, entry['ml_score'])
+        for position, entry in enumerate(response.get('ml_rankings') or [], start=1)
+    }
+    recommendation = response.get('recommendations') or {}
+    rows = []
+    for design in response['designs']:
+        row = _base_row(row_number, constraints, feasibility=feasibility)
+        row['design_id'] = design.get('id')
+        row['design_name'] = design.get('name')
+        for field in METRIC_FIELDS:
+            row[field.replace('.', '_')] = metric_value(design.get('metrics', {}), field)
+        row['ml_predicted_cost'] = design.get('ml_predicted_cost')
+        row['ml_rank'], row['ml_score'] = ranks.get(design.get('id'), (None, None))
+        row['recommended_design'] = recommendation.get('recommended_design')
+        row['recommendation_confidence'] = recommendation.get('confidence')
+        rows.append(row)
+    return rows
+
+
+def score_chunk(chunk):
+    """
+    Score one chunk of (row_number, csv_row) pairs.
+
+    Returns:
+        (output rows in input order, number of invalid inputs)
+    """
+    return score_items([(row_number, _parse(raw)) for row_number, raw in chunk], _models)
+
+
+def score_items(items, m):
+    """
+    Score (row_number, constraints) pairs with a ModelSet.
+
+    Returns:
+        (output rows in input order, number of invalid inputs)
+    """
+    per_input = []
+    valid = []
+    for row_number, constraints in items:
+        is_valid, errors = constraint_engine.validate(constraints)
+        if is_valid:
+            valid.append((len(per_input), row_number, constraints))
+            per_input.append(None)
+        else:
+            per_input.append([_base_row(row_number, constraints, errors=errors)])
+
+    # One pass over the recommender history per distinct priority
+    recommendations = m.design_recommender.recommend_batch([c for _, _, c in valid]) if m.ready else [None] * len(valid)
+    for (slot, row_number, constraints), recommendation in zip(valid, recommendations):
+        try:
+            response = build_generation(constraints, m, recommendation)
+            per_input[slot] = _design_rows(row_number, constraints, response)
+        except Exception as e:
+            per_input[slot] = [_base_row(row_number, constraints, errors=[f'Scoring failed: {e}'])]
+
+    invalid = sum(1 for rows in per_input if len(rows) == 1 and not rows[0]['valid'])
+    return [row for rows in per_input for row in rows], invalid
+
+
+def _chunks(path, chunk_size, limit=None):
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        missing = [field for field in INPUT_FIELDS if field not in (reader.fieldnames or [])]
+        if missing:
+            raise SystemExit(f"❌ {path} is missing column(s): {', '.join(missing)}")
+        chunk = []
+        for row_number, raw in enumerate(reader, start=1):
+            if limit is not None and row_number > limit:
+                break
+            chunk.append((row_number, raw))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+# ==================== WRITERS ====================
+
+class CSVWriter:
+    def __init__(self, path):
+        self.file = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=COLUMN_NAMES)
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class JSONLinesWriter:
+    def __init__(self, path):
+        self.file = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        self.file.writelines(json.dumps(row, separators=(',', ':')) + '\n' for row in rows)
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class ParquetWriter:
+    """One row group per chunk"""
+
+    TYPES = {'int': 'int64', 'float': 'float64', 'str': 'string', 'bool': 'bool_'}
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("❌ Parquet output needs pyarrow (pip install pyarrow)")
+        self.pa = pyarrow
+        self.schema = pyarrow.schema([(name, getattr(pyarrow, self.TYPES[kind])()) for name, kind in COLUMNS])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        columns = {name: [row[name] for row in rows] for name in COLUMN_NAMES}
+        self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {'csv': CSVWriter, 'jsonl': JSONLinesWriter, 'parquet': ParquetWriter}
+
+
+def _output_format(path, requested):
+    if requested:
+        return requested
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    return {'parquet': 'parquet', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}.get(extension, 'csv')
+
+
+# ==================== CLI ====================
+
+def run(input_path, writer, workers, chunk_size, limit=None):
+    """Score input_path into writer; returns (input rows, invalid rows, seconds)"""
+    _init_worker(DATA_DIR)
+    start = time.perf_counter()
+    scored = invalid = 0
+    last_report = time.perf_counter()
+
+    def handle(result, size):
+        nonlocal scored, invalid, last_report
+        rows, chunk_invalid = result
+        writer.write(rows)
+        scored += size
+        invalid += chunk_invalid
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            print(f"… {scored:,} rows, {scored / (now - start):,.0f} rows/s", file=sys.stderr)
+
+    chunks = _chunks(input_path, chunk_size, limit)
+    if workers <= 1:
+        for chunk in chunks:
+            handle(score_chunk(chunk), len(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(DATA_DIR,)) as pool:
+            # Bounded read-ahead keeps memory flat; results are written in input order
+            pending = deque()
+            for chunk in chunks:
+                pending.append((pool.submit(score_chunk, chunk), len(chunk)))
+                if len(pending) >= 2 * workers:
+                    future, size = pending.popleft()
+                    handle(future.result(), size)
+            while pending:
+                future, size = pending.popleft()
+                handle(future.result(), size)
+
+    return scored, invalid, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a CSV of candidate projects offline')
+    parser.add_argument('input', help='CSV with area, budget, climate and priority columns')
+    parser.add_argument('-o', '--output', required=True, help='output path, or - for stdout')
+    parser.add_argument('--format', choices=sorted(WRITERS), help='default: from the output extension')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--limit', type=int, help='score only the first N rows')
+    args = parser.parse_args()
+
+    output_format = _output_format(args.output, args.format)
+    if args.output == '-' and output_format == 'parquet':
+        raise SystemExit("❌ Parquet output needs a file path")
+
+    writer = WRITERS[output_format](args.output)
+    try:
+        rows, invalid, seconds = run(args.input, writer, args.workers, args.chunk_size, args.limit)
+    finally:
+        writer.close()
+    print(f"✓ Scored {rows:,} rows ({invalid:,} invalid) in {seconds:.1f}s, "
+          f"{rows / seconds if seconds else 0:,.0f} rows/s → {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
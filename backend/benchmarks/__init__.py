@@ -0,0 +1,4 @@
+"""
+Benchmark scripts for the Sustainable Design backend.
+Run from the backend/ folder, e.g. ``python -m benchmarks.bench_storage``.
+"""
@@ -0,0 +1,59 @@
+"""
+Batch generation benchmark
+
+Generates the same constraint sets once through /api/designs/generate in a
+loop and once through /api/designs/generate/batch, against a throwaway
+SQLite database, and reports wall time per item for both.
+
+    python -m benchmarks.bench_batch --items 200 --chunk 50
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.fixtures import constraint_samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch generation benchmark')
+    parser.add_argument('--items', type=int, default=200)
+    parser.add_argument('--chunk', type=int, default=50, help='BATCH_CHUNK_SIZE')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tmpdir.name, 'bench.db')
+    os.environ['RETENTION_ENABLED'] = 'false'
+    os.environ['ADMISSION_ENABLED'] = 'false'
+    os.environ['BATCH_CHUNK_SIZE'] = str(args.chunk)
+    import app as app_module
+
+    client = app_module.app.test_client()
+    constraints = constraint_samples(args.items)
+
+    start = time.perf_counter()
+    for item in constraints:
+        client.post('/api/designs/generate', json=item)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response = client.post('/api/designs/generate/batch', json=constraints)
+    lines = response.data.splitlines()
+    batch_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        'items': args.items,
+        'chunk_size': args.chunk,
+        'loop_ms_per_item': round(1000 * loop_seconds / args.items, 3),
+        'batch_ms_per_item': round(1000 * batch_seconds / args.items, 3),
+        'speedup': round(loop_seconds / batch_seconds, 1),
+        'summary': json.loads(lines[-1])['summary'],
+    }, indent=2))
+    tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
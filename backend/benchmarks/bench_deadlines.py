@@ -0,0 +1,104 @@
+"""
+Request deadline benchmark
+
+Slows the recommender and the project save down (as an overloaded model
+host or database would), then sends the same POST /api/designs/generate
+requests through the whole WSGI app with a generous and with a tight
+X-Request-Deadline-Ms. Reports latency percentiles and how often each
+stage was skipped or served from cache.
+
+    python -m benchmarks.bench_deadlines --requests 200 --delay-ms 40 --deadline-ms 25
+
+Exits non-zero if the tight deadline does not bound the p90 latency
+(deadline plus --margin-ms) or a degraded response lacks its designs.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from werkzeug.test import EnvironBuilder
+
+from benchmarks.fixtures import constraint_samples
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    return {f'p{q}_ms': round(ordered[int(q / 100 * (len(ordered) - 1))], 2) for q in (50, 90, 99)} | {
+        'mean_ms': round(statistics.mean(ordered), 2)}
+
+
+def _run(app, samples, deadline_ms):
+    latencies, degraded, failures = [], Counter(), []
+    for constraints in samples:
+        environ = EnvironBuilder(path='/api/designs/generate', method='POST', json=constraints,
+                                 headers={'X-Request-Deadline-Ms': str(deadline_ms)}).get_environ()
+        start = time.perf_counter()
+        body = b''.join(app.wsgi_app(environ, lambda status, headers, exc_info=None: None))
+        latencies.append((time.perf_counter() - start) * 1000)
+        result = json.loads(body)
+        if len(result.get('designs') or []) != 3:
+            failures.append(f'no designs for {constraints}: {result}')
+        for entry in result.get('degraded') or []:
+            degraded[f"{entry['stage']};{entry['reason']}" + (';cached' if entry['cached'] else '')] += 1
+    return _percentiles(latencies), dict(degraded), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Request deadline benchmark')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--delay-ms', type=float, default=40, help='added to the recommender and the save')
+    parser.add_argument('--deadline-ms', type=float, default=25)
+    parser.add_argument('--margin-ms', type=float, default=15)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tmpdir.name, 'bench.db')
+    os.environ['RETENTION_ENABLED'] = 'false'
+    os.environ['ADMISSION_ENABLED'] = 'false'
+    import app as app_module
+    import deadlines
+
+    def slowed(fn):
+        def wrapper(*a, **kw):
+            time.sleep(args.delay_ms / 1000)
+            return fn(*a, **kw)
+        return wrapper
+
+    recommender = app_module.models.design_recommender
+    recommender.recommend_design = slowed(recommender.recommend_design)
+    app_module.save_project = slowed(app_module.save_project)
+
+    # Repeated constraint sets, as real traffic has
+    samples = (constraint_samples(20) * (args.requests // 20 + 1))[:args.requests]
+    app = app_module.app
+    generous, generous_degraded, failures = _run(app, samples, deadlines.MAX_MS)
+    tight, tight_degraded, tight_failures = _run(app, samples, args.deadline_ms)
+    failures += tight_failures
+
+    print(json.dumps({
+        'requests': args.requests,
+        'injected_delay_ms': args.delay_ms,
+        'generous_deadline': {'deadline_ms': deadlines.MAX_MS, 'latency': generous, 'degraded': generous_degraded},
+        'tight_deadline': {'deadline_ms': args.deadline_ms, 'latency': tight, 'degraded': tight_degraded},
+    }, indent=2))
+    tmpdir.cleanup()
+
+    if tight['p90_ms'] > args.deadline_ms + args.margin_ms:
+        failures.append(f"p90 {tight['p90_ms']}ms exceeds the {args.deadline_ms}ms deadline "
+                        f"by more than {args.margin_ms}ms")
+    for failure in failures[:20]:
+        print(f"✗ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✓ Tight deadline bounds latency and degraded responses stay usable")
+
+
+if __name__ == '__main__':
+    main()
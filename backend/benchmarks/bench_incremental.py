@@ -0,0 +1,110 @@
+"""
+Incremental re-evaluation benchmark
+
+Replays slider-drag traces (budget 0 -> 100 and back, area 300 -> 2000 in
+25 sq ft steps, and random single-field edits) starting from seeded
+constraint sets. For every step it checks that applying the incremental
+patch to the previous result gives exactly the full regeneration, and it
+compares full vs incremental compute time, nodes recomputed and payload
+bytes.
+
+    python -m benchmarks.bench_incremental --starts 5
+
+Exits non-zero on any mismatch.
+"""
+
+import argparse
+import copy
+import json
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.fixtures import CLIMATES, PRIORITIES, SEED, constraint_samples
+import incremental
+from pipeline import build_generation, train_models
+
+IGNORED = ('generated_at', 'project_id')
+
+
+def _traces(start, rng, steps):
+    budget_drag = [dict(start, budget=b) for b in list(range(start['budget'], 101)) + list(range(100, -1, -1))]
+    area_drag = [dict(start, area=a) for a in range(300, 2001, 25)]
+    edits, current = [], dict(start)
+    for _ in range(steps):
+        field = rng.choice(incremental.CONSTRAINT_FIELDS)
+        value = {'area': lambda: rng.randint(300, 2000), 'budget': lambda: rng.randint(0, 100),
+                 'climate': lambda: rng.choice(CLIMATES), 'priority': lambda: rng.choice(PRIORITIES)}[field]()
+        current = dict(current, **{field: value})
+        edits.append(current)
+    return {'budget_drag': budget_drag, 'area_drag': area_drag, 'random_edits': edits}
+
+
+def _full(m, constraints):
+    return build_generation(constraints, m, m.design_recommender.recommend_design(constraints))
+
+
+def _comparable(result):
+    return {key: value for key, value in result.items() if key not in IGNORED}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental re-evaluation benchmark')
+    parser.add_argument('--starts', type=int, default=5)
+    parser.add_argument('--random-steps', type=int, default=200)
+    args = parser.parse_args()
+
+    m = train_models()
+    rng = random.Random(SEED)
+    failures = []
+    stats = {}
+
+    for start in constraint_samples(args.starts):
+        for name, trace in _traces(start, rng, args.random_steps).items():
+            row = stats.setdefault(name, {'steps': 0, 'full_us': [], 'incremental_us': [], 'recomputed': [],
+                                          'patch_ops': [], 'full_bytes': [], 'patch_bytes': []})
+            state = _full(m, trace[0])
+            for constraints in trace[1:]:
+                t0 = time.perf_counter()
+                full = _full(m, constraints)
+                t1 = time.perf_counter()
+                result = incremental.update(state, constraints, m)
+                t2 = time.perf_counter()
+
+                state = incremental.apply_patch(copy.deepcopy(state), result['patch'])
+                if _comparable(state) != _comparable(json.loads(json.dumps(full))):
+                    failures.append(f'{name}: patched result differs from full generation at {constraints}')
+                    state = full
+
+                row['steps'] += 1
+                row['full_us'].append((t1 - t0) * 1e6)
+                row['incremental_us'].append((t2 - t1) * 1e6)
+                row['recomputed'].append(result['recomputed'])
+                row['patch_ops'].append(len(result['patch']))
+                row['full_bytes'].append(len(json.dumps(full, default=str)))
+                row['patch_bytes'].append(len(json.dumps(result['patch'])))
+
+    report = {'nodes': len(incremental.GRAPH), 'traces': {}}
+    for name, row in stats.items():
+        report['traces'][name] = {
+            'steps': row['steps'],
+            'full_us_median': round(statistics.median(row['full_us']), 1),
+            'incremental_us_median': round(statistics.median(row['incremental_us']), 1),
+            'speedup': round(sum(row['full_us']) / sum(row['incremental_us']), 1),
+            'recomputed_mean': round(statistics.mean(row['recomputed']), 1),
+            'patch_ops_mean': round(statistics.mean(row['patch_ops']), 1),
+            'bytes_full_mean': round(statistics.mean(row['full_bytes'])),
+            'bytes_patch_mean': round(statistics.mean(row['patch_bytes'])),
+        }
+
+    print(json.dumps(report, indent=2))
+    for failure in failures[:20]:
+        print(f"✗ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✓ Patched results match full regeneration on every step")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Background job benchmark
+
+Starts `python jobs.py` against a temporary SQLite database and, through the
+WSGI app:
+  - submits a small sweep and checks its Pareto frontier against one
+    computed in-process
+  - times POST /api/designs/generate with the pool idle and while it runs
+    heavy sweeps, to show the web process is not the one doing the work
+  - cancels a running sweep and checks it stops within --cancel-timeout
+
+    python -m benchmarks.bench_jobs --workers 2 --requests 100
+
+Exits non-zero if a job result is wrong or cancellation does not stop a job.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fixtures import constraint_samples
+
+SMALL_SWEEP = {'area': {'start': 500, 'stop': 2000, 'step': 250}, 'budget': [20, 50, 80],
+               'climate': ['cold', 'moderate', 'hot'], 'priority': ['energy', 'water']}
+HEAVY_SWEEP = {'area': {'start': 300, 'stop': 2000, 'step': 1}, 'budget': {'start': 0, 'stop': 100, 'step': 10},
+               'climate': ['cold', 'moderate', 'hot'], 'priority': ['energy', 'water', 'materials']}
+
+
+def _latency(client, samples):
+    latencies = []
+    for constraints in samples:
+        start = time.perf_counter()
+        client.post('/api/designs/generate', json=constraints)
+        latencies.append((time.perf_counter() - start) * 1000)
+    ordered = sorted(latencies)
+    return {'p50_ms': round(statistics.median(ordered), 2),
+            'p95_ms': round(ordered[int(0.95 * (len(ordered) - 1))], 2)}
+
+
+def _wait(client, job_id, statuses, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/api/jobs/{job_id}').get_json()
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.05)
+    return client.get(f'/api/jobs/{job_id}').get_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Background job benchmark')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--cancel-timeout', type=float, default=5.0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tmpdir.name, 'bench.db')
+    os.environ['RETENTION_ENABLED'] = 'false'
+    os.environ['ADMISSION_ENABLED'] = 'false'
+    os.environ['JOB_POLL_SECONDS'] = '0.1'
+    os.environ['JOB_KIND_LIMITS'] = json.dumps({'sweep': args.workers})
+    # Room for sweeps that outlast the latency run
+    os.environ['JOB_SWEEP_MAX_POINTS'] = str(200000)
+    import app as app_module
+    import jobs
+
+    client = app_module.app.test_client()
+    samples = constraint_samples(args.requests)
+    failures = []
+    idle = _latency(client, samples)
+
+    pool = subprocess.Popen([sys.executable, 'jobs.py', '--workers', str(args.workers)],
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        small = client.post('/api/jobs', json={'kind': 'sweep', 'params': SMALL_SWEEP, 'priority': 10})
+        job = _wait(client, small.get_json()['job_id'], ('succeeded', 'failed'), 120)
+        expected = jobs.KINDS['sweep'].run(SMALL_SWEEP, None, lambda fraction: None)
+        if job['status'] != 'succeeded' or job['result'] != json.loads(json.dumps(expected)):
+            failures.append(f"small sweep: {job['status']} {job.get('error')}")
+
+        heavy = [client.post('/api/jobs', json={'kind': 'sweep', 'params': HEAVY_SWEEP}).get_json()['job_id']
+                 for _ in range(args.workers)]
+        for job_id in heavy:
+            _wait(client, job_id, ('running',), 30)
+        busy = _latency(client, samples)
+
+        start = time.monotonic()
+        for job_id in heavy:
+            client.delete(f'/api/jobs/{job_id}')
+        for job_id in heavy:
+            job = _wait(client, job_id, ('cancelled', 'succeeded', 'failed'), args.cancel_timeout)
+            if job['status'] != 'cancelled':
+                failures.append(f"heavy sweep {job_id} is {job['status']} after cancelling")
+        cancel_ms = (time.monotonic() - start) * 1000
+    finally:
+        pool.terminate()
+        pool.wait(30)
+
+    print(json.dumps({
+        'workers': args.workers,
+        'requests': args.requests,
+        'generate_pool_idle': idle,
+        'generate_pool_busy': busy,
+        'cancel_ms': round(cancel_ms, 1),
+    }, indent=2))
+    tmpdir.cleanup()
+
+    for failure in failures[:20]:
+        print(f"✗ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✓ Jobs run out of process, match in-process results and cancel promptly")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+JSON encoder and response format benchmark
+
+Serializes generate-shaped responses with the standard library and with
+orjson (when installed), in the full and the compact format, and reports
+median encode time and body size (raw and gzip).
+
+    python -m benchmarks.bench_json --responses 200
+
+In production the same numbers per route come from /api/metrics
+(sustainable_http_response_size_bytes and the "serialize" stage).
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import time
+from datetime import datetime
+
+from flask import Flask
+
+from benchmarks.fixtures import project_samples
+from json_provider import FastJSONProvider, orjson
+import response_format
+
+
+def _responses(n):
+    responses = []
+    for i, project in enumerate(project_samples(n)):
+        response = {
+            'designs': project['designs'],
+            'count': len(project['designs']),
+            'constraints': project['constraints'],
+            'generated_at': datetime.now().isoformat(),
+            'ml_rankings': project['ml']['ml_rankings'],
+            'recommendations': project['ml']['recommendations'],
+            'project_id': i + 1,
+        }
+        responses.append((response, project['constraints']))
+    return responses
+
+
+def _measure(encode, bodies, repeats=5):
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for body in bodies:
+            encode(body)
+        timings.append((time.perf_counter() - t0) / len(bodies))
+    return round(statistics.median(timings) * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON encoder benchmark')
+    parser.add_argument('--responses', type=int, default=200)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    std = FastJSONProvider(app)
+    std.use_orjson = False
+    fast = FastJSONProvider(app)
+    fast.use_orjson = orjson is not None
+
+    pairs = _responses(args.responses)
+    formats = {
+        'full': [response for response, _ in pairs],
+        'compact': [response_format.compact_generation(r, c) for r, c in pairs],
+    }
+
+    results = {}
+    with app.app_context():
+        for name, bodies in formats.items():
+            encoded = [std.dumps_bytes(b) for b in bodies]
+            results[name] = {
+                'bytes': round(statistics.mean(len(e) for e in encoded)),
+                'gzip_bytes': round(statistics.mean(len(gzip.compress(e)) for e in encoded)),
+                'std_encode_us': _measure(std.dumps_bytes, bodies),
+                'orjson_encode_us': _measure(fast.dumps_bytes, bodies) if fast.use_orjson else None,
+            }
+
+    results['compact_vs_full_bytes_pct'] = round(
+        100.0 * (results['compact']['bytes'] / results['full']['bytes'] - 1), 1
+    )
+    results['compact_vs_full_gzip_pct'] = round(
+        100.0 * (results['compact']['gzip_bytes'] / results['full']['gzip_bytes'] - 1), 1
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
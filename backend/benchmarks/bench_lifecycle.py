@@ -0,0 +1,82 @@
+"""
+Lifecycle simulation benchmark
+
+Evaluates the designs of many constraint sets, then reports median
+lifecycle.simulate time for growing design counts (all presets, 60 years)
+to show cost per design-scenario-year stays flat, and checks the numpy
+engine against the pure-Python one on a small slice.
+
+    python -m benchmarks.bench_lifecycle --designs 300 3000 30000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import constraint_samples
+from evaluator import SustainabilityEvaluator
+from generator import DesignGenerator
+import lifecycle
+
+
+def _inputs(n):
+    evaluator = SustainabilityEvaluator()
+    generator = DesignGenerator()
+    inputs = []
+    for constraints in constraint_samples((n + 2) // 3):
+        for design in generator.generate(constraints):
+            inputs.append(lifecycle.design_inputs(constraints['area'], evaluator.evaluate(design, constraints)))
+    return inputs[:n]
+
+
+def _median_ms(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lifecycle simulation benchmark')
+    parser.add_argument('--designs', type=int, nargs='+', default=[300, 3000, 30000])
+    parser.add_argument('--years', type=int, default=60)
+    parser.add_argument('--repeats', type=int, default=7)
+    args = parser.parse_args()
+
+    scenarios = [dict(preset, name=name) for name, preset in lifecycle.SCENARIOS.items()]
+    inputs = _inputs(max(args.designs))
+
+    fast = lifecycle.simulate(inputs[:60], scenarios, args.years)
+    saved, lifecycle.np = lifecycle.np, None
+    try:
+        slow = lifecycle.simulate(inputs[:60], scenarios, args.years)
+    finally:
+        lifecycle.np = saved
+    failures = [
+        name for name in ('cumulative_carbon', 'cumulative_cash_flow', 'discounted_payback_year')
+        if not np.allclose(fast[name], np.array(slow[name], dtype=float), rtol=1e-9, atol=1e-6)
+    ]
+
+    results = {'years': args.years, 'scenarios': len(scenarios), 'runs': {}}
+    for n in args.designs:
+        batch = np.array(inputs[:n])
+        ms = _median_ms(lambda: lifecycle.simulate(batch, scenarios, args.years), args.repeats)
+        cells = n * len(scenarios) * args.years
+        results['runs'][str(n)] = {'ms': round(ms, 2), 'ns_per_cell': round(ms * 1e6 / cells, 2)}
+
+    print(json.dumps(results, indent=2))
+    for name in failures:
+        print(f"✗ {name}: numpy and pure-Python engines disagree")
+    if failures:
+        sys.exit(1)
+    print("✓ numpy and pure-Python engines agree")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Mixed login/generate load benchmark
+
+Saturates /api/auth/login from several threads while measuring
+/api/designs/generate latency against a running server:
+
+    gunicorn --workers 4 --worker-class sync --bind 127.0.0.1:8000 app:app
+    python -m benchmarks.bench_login_load --url http://127.0.0.1:8000
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+from benchmarks.fixtures import constraint_samples
+
+
+def _post(url, payload):
+    req = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _generate_phase(base_url, seconds, threads):
+    latencies = []
+    stop = time.monotonic() + seconds
+    samples = constraint_samples(256)
+
+    def worker(offset):
+        i = offset
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            _post(f"{base_url}/api/designs/generate", samples[i % len(samples)])
+            latencies.append((time.perf_counter() - t0) * 1000)
+            i += threads
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(_percentile(latencies, 50), 2),
+        'p99_ms': round(_percentile(latencies, 99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mixed login/generate load benchmark')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--login-threads', type=int, default=16)
+    parser.add_argument('--generate-threads', type=int, default=2)
+    args = parser.parse_args()
+
+    email = f"bench-{int(time.time())}@example.com"
+    _post(f"{args.url}/api/auth/signup", {'name': 'bench', 'email': email, 'password': 'bench-pass'})
+
+    baseline = _generate_phase(args.url, args.seconds, args.generate_threads)
+
+    login_status = Counter()
+    stop_logins = threading.Event()
+
+    def login_worker():
+        while not stop_logins.is_set():
+            status = _post(f"{args.url}/api/auth/login", {'email': email, 'password': 'bench-pass'})
+            login_status[status] += 1
+
+    logins = [threading.Thread(target=login_worker) for _ in range(args.login_threads)]
+    for t in logins:
+        t.start()
+    under_load = _generate_phase(args.url, args.seconds, args.generate_threads)
+    stop_logins.set()
+    for t in logins:
+        t.join()
+
+    print(json.dumps({
+        'generate_idle': baseline,
+        'generate_under_login_load': under_load,
+        'login_status_counts': {str(k): v for k, v in sorted(login_status.items())},
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
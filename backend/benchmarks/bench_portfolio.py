@@ -0,0 +1,95 @@
+"""
+Portfolio optimization benchmark
+
+Checks both solvers against exhaustive search on small portfolios, then
+reports option-table, solve time and optimality gap per method for growing
+portfolios at a cap halfway between the cheapest and the most expensive
+allocation.
+
+    python -m benchmarks.bench_portfolio --buildings 100 300 1000
+
+Exits non-zero if dp misses the exhaustive optimum by more than its cost
+rounding allows, or any allocation breaks the cap.
+"""
+
+import argparse
+import itertools
+import json
+import random
+import sys
+
+from benchmarks.fixtures import CLIMATES, PRIORITIES, SEED
+import portfolio
+
+
+def _buildings(n, seed=SEED):
+    rng = random.Random(seed)
+    return [
+        {'id': f'b{i}', 'area': rng.randint(300, 2000), 'climate': rng.choice(CLIMATES),
+         'priority': rng.choice(PRIORITIES), 'budget_levels': list(portfolio.DEFAULT_BUDGET_LEVELS)}
+        for i in range(n)
+    ]
+
+
+def _cap(tables, share):
+    low = sum(table[0][0] for table in tables)
+    high = sum(table[-1][0] for table in tables)
+    return low + share * (high - low)
+
+
+def check_exhaustive(trials, size):
+    failures = []
+    rng = random.Random(SEED)
+    for trial in range(trials):
+        buildings = _buildings(size, seed=SEED + trial)
+        tables = [portfolio.option_table(b) for b in buildings]
+        cap = _cap(tables, rng.random())
+        best = max(
+            sum(option[1] for option in combo)
+            for combo in itertools.product(*tables)
+            if sum(option[0] for option in combo) <= cap
+        )
+        for method in ('dp', 'lagrangian'):
+            result, _ = portfolio.optimize({'budget_cap': cap, 'method': method, 'buildings': buildings})
+            total = result['total_sustainability_index']
+            if result['total_cost'] > cap:
+                failures.append(f'{method} trial {trial}: cost {result["total_cost"]} over cap {cap:.0f}')
+            if total > best or result['solver']['upper_bound'] < best - 1e-9:
+                failures.append(f'{method} trial {trial}: {total} / bound {result["solver"]["upper_bound"]} vs optimum {best}')
+            if method == 'dp' and result['solver']['method'] == 'dp' and total < best - 2:
+                failures.append(f'dp trial {trial}: {total} vs optimum {best}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Portfolio optimization benchmark')
+    parser.add_argument('--buildings', type=int, nargs='+', default=[100, 300, 1000])
+    parser.add_argument('--share', type=float, default=0.5, help='cap position between cheapest and dearest')
+    parser.add_argument('--trials', type=int, default=20)
+    args = parser.parse_args()
+
+    failures = check_exhaustive(args.trials, 4)
+
+    results = {}
+    for n in args.buildings:
+        buildings = _buildings(n)
+        cap = _cap([portfolio.option_table(b) for b in buildings], args.share)
+        runs = {}
+        for method in ('dp', 'lagrangian'):
+            result, _ = portfolio.optimize({'budget_cap': cap, 'method': method, 'buildings': buildings})
+            if result['total_cost'] > cap:
+                failures.append(f'{method} with {n} buildings breaks the cap')
+            runs[method] = {key: result['solver'][key] for key in ('precompute_ms', 'solve_ms', 'optimality_gap')}
+            runs[method]['total_sustainability_index'] = result['total_sustainability_index']
+        results[str(n)] = runs
+
+    print(json.dumps({'exhaustive_trials': args.trials, 'cap_share': args.share, 'runs': results}, indent=2))
+    for failure in failures:
+        print(f"✗ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✓ Allocations fit the cap and match exhaustive search")
+
+
+if __name__ == '__main__':
+    main()
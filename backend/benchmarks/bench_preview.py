@@ -0,0 +1,118 @@
+"""
+Preview latency benchmark
+
+Measures server-side time of GET /api/designs/preview (the whole WSGI
+app: admission, instrumentation, validation, ETag and JSON) along a slider
+drag of area and budget at the InputPanel's step sizes, with environs built
+before timing. Reports cold (first visit) and warm (memoized) percentiles
+next to POST /api/designs/generate, and checks that preview metrics equal
+the full pipeline's.
+
+    python -m benchmarks.bench_preview --passes 3
+
+Admission control stays on, with the preview and generate rate limits
+lifted. Exits non-zero if the warm median exceeds PREVIEW_TARGET_US
+(preview.py) or the metrics disagree.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from werkzeug.test import EnvironBuilder
+
+from benchmarks.fixtures import CLIMATES, PRIORITIES
+
+# InputPanel slider steps
+AREAS = range(300, 2001, 50)
+BUDGETS = range(0, 101, 10)
+
+
+def _drag():
+    for climate in CLIMATES:
+        for priority in PRIORITIES:
+            for area in AREAS[::5]:
+                for budget in BUDGETS:
+                    yield {'area': area, 'budget': budget, 'climate': climate, 'priority': priority}
+
+
+def _time_request(app, environ):
+    start = time.perf_counter()
+    body = b''.join(app.wsgi_app(environ, lambda status, headers, exc_info=None: None))
+    return (time.perf_counter() - start) * 1e6, body
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    return {'p50_us': round(statistics.median(ordered), 1),
+            'p95_us': round(ordered[int(0.95 * (len(ordered) - 1))], 1),
+            'n': len(ordered)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Preview latency benchmark')
+    parser.add_argument('--passes', type=int, default=3, help='warm passes over the drag')
+    parser.add_argument('--generate-samples', type=int, default=30)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tmpdir.name, 'bench.db')
+    os.environ['RETENTION_ENABLED'] = 'false'
+    os.environ['ADMISSION_RULES'] = json.dumps({
+        route: {'rate': 1e9, 'burst': 1e9} for route in ('/api/designs/preview', '/api/designs/generate')
+    })
+    import app as app_module
+    import pipeline
+    import preview
+
+    app = app_module.app
+    steps = list(_drag())
+    environs = [EnvironBuilder(path='/api/designs/preview', query_string=c).get_environ() for c in steps]
+
+    cold = []
+    failures = []
+    for constraints, environ in zip(steps, environs):
+        elapsed, body = _time_request(app, environ)
+        cold.append(elapsed)
+        full = pipeline.build_generation(constraints, app_module.models, None)
+        expected = [{'id': d['id'], 'metrics': d['metrics']} for d in full['designs']]
+        if json.loads(body)['designs'] != json.loads(json.dumps(expected)):
+            failures.append(f'preview metrics differ from generate for {constraints}')
+
+    warm = []
+    for _ in range(args.passes):
+        for constraints in steps:
+            environ = EnvironBuilder(path='/api/designs/preview', query_string=constraints).get_environ()
+            warm.append(_time_request(app, environ)[0])
+
+    generate = []
+    for constraints in steps[:args.generate_samples]:
+        environ = EnvironBuilder(path='/api/designs/generate', method='POST', json=constraints).get_environ()
+        generate.append(_time_request(app, environ)[0])
+
+    result = {
+        'target_us': preview.TARGET_US,
+        'preview_cold': _percentiles(cold),
+        'preview_warm': _percentiles(warm),
+        'generate': _percentiles(generate),
+    }
+    print(json.dumps(result, indent=2))
+    tmpdir.cleanup()
+
+    if result['preview_warm']['p50_us'] > preview.TARGET_US:
+        failures.append(f"warm preview median {result['preview_warm']['p50_us']}us exceeds the "
+                        f"{preview.TARGET_US}us target")
+    for failure in failures[:20]:
+        print(f"✗ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✓ Preview within target and consistent with generate")
+
+
+if __name__ == '__main__':
+    main()
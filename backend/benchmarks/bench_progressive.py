@@ -0,0 +1,147 @@
+"""
+Progressive generation benchmark
+
+Measures, through the whole WSGI app, time to the first byte of a plain
+POST /api/designs/generate against time to the designs event and to the
+last event of ?stream=ndjson for the same constraint sets. It checks that
+the progressive events add up to the plain result. It then re-runs with a
+recommender slowed past its deadline to check that the stage is reported
+as timed out without holding back the other events.
+
+    python -m benchmarks.bench_progressive --samples 30
+
+Exits non-zero if the events disagree with the plain result or a deadline
+is not honoured.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from werkzeug.test import EnvironBuilder
+
+from benchmarks.fixtures import constraint_samples
+
+IGNORED = ('generated_at', 'project_id')
+
+
+def _timed_chunks(app, environ):
+    """[(ms since start, chunk)] as the WSGI iterator yields them"""
+    start = time.perf_counter()
+    result = app.wsgi_app(environ, lambda status, headers, exc_info=None: None)
+    chunks = []
+    try:
+        for chunk in result:
+            chunks.append(((time.perf_counter() - start) * 1000, chunk))
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return chunks
+
+
+def _events(chunks):
+    return [(ms, json.loads(line)) for ms, chunk in chunks for line in chunk.splitlines() if line]
+
+
+def _assembled(events):
+    """A plain generate result rebuilt from progressive events"""
+    by_name = {event['event']: event['data'] for _, event in events}
+    result = dict(by_name['designs'])
+    costs = by_name.get('ml_predicted_cost') or {}
+    for design in result['designs']:
+        if design['id'] in costs:
+            design['ml_predicted_cost'] = costs[design['id']]
+    result['ml_rankings'] = by_name.get('ml_rankings')
+    result['recommendations'] = by_name.get('recommendations')
+    return {key: value for key, value in result.items() if key not in IGNORED}
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    return {'p50_ms': round(statistics.median(ordered), 2),
+            'p95_ms': round(ordered[int(0.95 * (len(ordered) - 1))], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Progressive generation benchmark')
+    parser.add_argument('--samples', type=int, default=30)
+    parser.add_argument('--slow-ms', type=int, default=400, help='recommender delay for the deadline check')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tmpdir.name, 'bench.db')
+    os.environ['RETENTION_ENABLED'] = 'false'
+    os.environ['ADMISSION_ENABLED'] = 'false'
+    import app as app_module
+    import progressive
+
+    app = app_module.app
+    failures = []
+    plain, first, last = [], [], []
+    for constraints in constraint_samples(args.samples):
+        environ = EnvironBuilder(path='/api/designs/generate', method='POST', json=constraints).get_environ()
+        chunks = _timed_chunks(app, environ)
+        plain.append(chunks[0][0])
+        expected = {key: value for key, value in json.loads(b''.join(c for _, c in chunks)).items()
+                    if key not in IGNORED}
+
+        environ = EnvironBuilder(path='/api/designs/generate', method='POST', json=constraints,
+                                 query_string={'stream': 'ndjson'}).get_environ()
+        events = _events(_timed_chunks(app, environ))
+        first.append(events[0][0])
+        last.append(events[-1][0])
+        if events[0][1]['event'] != 'designs' or events[-1][1]['event'] != 'done':
+            failures.append(f'unexpected event order for {constraints}')
+        elif _assembled(events) != expected:
+            failures.append(f'progressive events differ from the plain result for {constraints}')
+
+    # Deadline check: a recommender slower than its deadline
+    recommender = app_module.models.design_recommender
+    original = recommender.recommend_design
+
+    def slow(constraints):
+        time.sleep(args.slow_ms / 1000)
+        return original(constraints)
+
+    deadline_ms = progressive.DEADLINES_MS['recommendations']
+    progressive.DEADLINES_MS['recommendations'] = args.slow_ms // 4
+    recommender.recommend_design = slow
+    try:
+        constraints = constraint_samples(1)[0]
+        environ = EnvironBuilder(path='/api/designs/generate', method='POST', json=constraints,
+                                 query_string={'stream': 'ndjson'}).get_environ()
+        events = _events(_timed_chunks(app, environ))
+    finally:
+        recommender.recommend_design = original
+        progressive.DEADLINES_MS['recommendations'] = deadline_ms
+    names = [event['event'] for _, event in events]
+    slow_total = events[-1][0]
+    if 'stage_timeout' not in names or 'recommendations' in names:
+        failures.append(f'slow recommender not reported as timed out: {names}')
+    if slow_total >= args.slow_ms:
+        failures.append(f'stream waited {slow_total:.0f}ms for a stage past its deadline')
+
+    print(json.dumps({
+        'samples': args.samples,
+        'plain_first_byte': _summary(plain),
+        'progressive_designs_event': _summary(first),
+        'progressive_done_event': _summary(last),
+        'slow_recommender': {'delay_ms': args.slow_ms, 'deadline_ms': args.slow_ms // 4,
+                             'events': names, 'done_ms': round(slow_total, 2)},
+    }, indent=2))
+    tmpdir.cleanup()
+
+    for failure in failures[:20]:
+        print(f"✗ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✓ Progressive events match the plain result and deadlines hold")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Project cache benchmark and invalidation check (SQLite backend)
+
+Replays a skewed "re-open recent projects" trace to report hit rate and
+get_project latency, then verifies that cleared projects never come back
+from the cache, including from a second cache standing in for another
+gunicorn worker, and when a clear lands between a save's INSERT and its
+write-through put.
+
+    python -m benchmarks.bench_project_cache --projects 500 --reads 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import db
+from benchmarks.fixtures import project_samples
+from project_cache import ProjectCache
+
+
+def _timed_reads(trace):
+    latencies = []
+    for project_id in trace:
+        t0 = time.perf_counter()
+        db.get_project(project_id)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(latencies), 4)
+
+
+def check_invalidation(ids_by_scope, other_worker):
+    """Every cleared scope must miss in this worker and in the other one"""
+    failures = []
+    for scope, ids in ids_by_scope.items():
+        for project_id in ids:
+            other_worker.put(project_id, db.get_project(project_id), epoch=other_worker.epoch())
+        if scope == 'guest':
+            db.clear_projects(guest=True)
+        else:
+            db.clear_projects(user_id=scope)
+        for project_id in ids:
+            if db.get_project(project_id) is not None:
+                failures.append(f"{scope}:{project_id} returned by this worker")
+            if other_worker.get(project_id) is not None:
+                failures.append(f"{scope}:{project_id} returned by other worker")
+    return failures
+
+
+class _RacingCache(ProjectCache):
+    """Cache whose write-through put is preceded by a clear of the same user"""
+
+    def put(self, project_id, project, epoch=None):
+        db.clear_projects(user_id=project['user_id'])
+        super().put(project_id, project, epoch=epoch)
+
+
+def check_save_clear_race(projects, epoch_file, user_id=3):
+    """A clear committed after a save's INSERT must not be undone by its put"""
+    failures = []
+    cache = db.project_cache = _RacingCache(len(projects) + 1, epoch_file)
+    saved = [db.save_project(projects[0]['constraints'], projects[0]['designs'], projects[0]['ml'],
+                             user_id=user_id)]
+    saved += db.save_projects([(p['constraints'], p['designs'], p['ml'], user_id) for p in projects[1:]])
+    for project_id in saved:
+        if cache.get(project_id) is not None or db.get_project(project_id) is not None:
+            failures.append(f"race:{project_id} returned after clear_projects")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Project cache benchmark')
+    parser.add_argument('--projects', type=int, default=500)
+    parser.add_argument('--reads', type=int, default=5000)
+    parser.add_argument('--cache-size', type=int, default=256)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    projects = project_samples(args.projects)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, 'bench.db')
+        epoch_file = os.path.join(tmp, 'cache.epoch')
+        db.initialize_db()
+
+        owners = [1, 2, None]
+        ids_by_scope = {1: [], 2: [], 'guest': []}
+        db.project_cache = ProjectCache(0, epoch_file)
+        for i, p in enumerate(projects):
+            owner = owners[i % 3]
+            project_id = db.save_project(p['constraints'], p['designs'], p['ml'], user_id=owner)
+            ids_by_scope[owner if owner is not None else 'guest'].append(project_id)
+        all_ids = sorted(sum(ids_by_scope.values(), []))
+
+        # Dashboard-like trace: mostly the newest projects
+        trace = [all_ids[-1 - min(len(all_ids) - 1, int(rng.expovariate(1 / 20.0)))]
+                 for _ in range(args.reads)]
+
+        uncached_ms = _timed_reads(trace)
+        db.project_cache = ProjectCache(args.cache_size, epoch_file)
+        cached_ms = _timed_reads(trace)
+        stats = db.project_cache.stats()
+
+        failures = check_invalidation(ids_by_scope, ProjectCache(args.cache_size, epoch_file))
+        failures += check_save_clear_race(projects[:5], epoch_file)
+
+    print(json.dumps({
+        'reads': args.reads,
+        'get_project_ms_p50_uncached': uncached_ms,
+        'get_project_ms_p50_cached': cached_ms,
+        'cache': stats,
+        'invalidation_failures': failures,
+    }, indent=2))
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Project storage benchmark (SQLite backend)
+
+Reports bytes per project, insert rate and read latency for plain JSON
+versus compressed payloads.
+
+    python -m benchmarks.bench_storage --projects 2000
+    python -m benchmarks.bench_storage --train-dictionary data/payload_zdict_v2.txt
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import db
+import payload_codec
+from benchmarks.fixtures import project_samples
+from project_cache import ProjectCache
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_mode(projects, compress, reads):
+    """Insert all projects into a fresh database and time reads back"""
+    payload_codec.COMPRESSION_ENABLED = compress
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "bench.db")
+        # A fresh, disabled cache per mode: reads must decode from SQLite
+        db.project_cache = ProjectCache(0, os.path.join(tmp, "cache.epoch"))
+        db.initialize_db()
+
+        start = time.perf_counter()
+        ids = [
+            db.save_project(p['constraints'], p['designs'], p['ml'])
+            for p in projects
+        ]
+        insert_seconds = time.perf_counter() - start
+
+        with db._connect() as conn:
+            payload_bytes = conn.execute(
+                "SELECT SUM(LENGTH(designs_json) + LENGTH(ml_json)) FROM projects"
+            ).fetchone()[0]
+            conn.execute("VACUUM")
+        file_bytes = os.path.getsize(db.DB_PATH)
+
+        get_latencies = []
+        for i in range(reads):
+            project_id = ids[i % len(ids)]
+            t0 = time.perf_counter()
+            db.get_project(project_id)
+            get_latencies.append((time.perf_counter() - t0) * 1000)
+
+        list_latencies = []
+        for _ in range(max(1, reads // 10)):
+            t0 = time.perf_counter()
+            db.list_projects(50)
+            list_latencies.append((time.perf_counter() - t0) * 1000)
+
+    return {
+        'mode': 'zlib-dict' if compress else 'json',
+        'projects': len(projects),
+        'payload_bytes_per_project': round(payload_bytes / len(projects), 1),
+        'file_bytes_per_project': round(file_bytes / len(projects), 1),
+        'inserts_per_sec': round(len(projects) / insert_seconds, 1),
+        'get_project_ms_p50': round(statistics.median(get_latencies), 4),
+        'get_project_ms_p99': round(_percentile(get_latencies, 99), 4),
+        'list_projects_ms_p50': round(statistics.median(list_latencies), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--projects', type=int, default=1000)
+    parser.add_argument('--reads', type=int, default=2000)
+    parser.add_argument('--train-dictionary', metavar='PATH',
+                        help='write a dictionary trained on the sample projects and exit')
+    args = parser.parse_args()
+
+    projects = project_samples(args.projects)
+
+    if args.train_dictionary:
+        samples = [p['designs'] for p in projects] + [p['ml'] for p in projects]
+        with open(args.train_dictionary, 'wb') as f:
+            f.write(payload_codec.train_dictionary(samples))
+        print(f"✓ Wrote dictionary to {args.train_dictionary}")
+        return
+
+    results = [run_mode(projects, False, args.reads), run_mode(projects, True, args.reads)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Monte Carlo uncertainty benchmark and consistency check
+
+Checks that the vectorized twins in uncertainty.py agree with the scalar
+SustainabilityEvaluator and SimpleCostPredictor on every sample of a wide
+input distribution, then reports median uncertainty.analyze latency per
+sample count (and the pure-Python fallback for comparison).
+
+    python -m benchmarks.bench_uncertainty --samples 10000 100000 200000
+
+Exits non-zero on any disagreement.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from benchmarks.fixtures import constraint_samples
+from evaluator import SustainabilityEvaluator
+from generator import DesignGenerator
+from simple_ml import SimpleCostPredictor, generate_synthetic_cost_data
+import uncertainty
+
+WIDE = {'area_tolerance': 0.5, 'budget_range': 50, 'cost_per_sqft_cv': 0.2,
+        'climate_mix': {'cold': 1, 'moderate': 1, 'hot': 1}}
+
+
+def check_consistency(predictor, constraints_list, samples):
+    evaluator = SustainabilityEvaluator()
+    generator = DesignGenerator()
+    failures = []
+    for constraints in constraints_list:
+        params, _ = uncertainty.parse_params(dict(constraints, samples=samples, **WIDE))
+        drawn = uncertainty.sample_inputs(constraints, params)
+        area, budget, climate = drawn['area'], drawn['budget'], drawn['climate']
+        energy0 = uncertainty.energy_base(area, budget, climate, constraints['priority'])
+        ml0 = uncertainty.ml_cost_base(predictor, area, budget, climate)
+        cost = uncertainty.estimated_cost(area, budget)
+        for index, design in enumerate(generator.generate(constraints)):
+            energy = uncertainty.energy_score(design, energy0)
+            payback = uncertainty.payback_years(energy, budget)
+            carbon = uncertainty.operational_carbon(area, energy)
+            predicted = uncertainty.ml_cost(predictor, index, ml0)
+            for i in range(samples):
+                sample = dict(constraints, area=float(area[i]), budget=int(budget[i]),
+                              climate=uncertainty.CLIMATES[climate[i]])
+                scalar_energy = evaluator._evaluate_energy(design, sample)
+                expected = {
+                    'energy': scalar_energy,
+                    'cost': evaluator._estimate_cost(sample['area'], sample['budget']),
+                    'payback': evaluator._estimate_payback(scalar_energy, sample['budget']),
+                    'carbon': evaluator._estimate_operational_carbon(sample['area'], scalar_energy),
+                    'ml': predictor.predict(sample['area'], sample['budget'], sample['climate'],
+                                            sample['priority'], index),
+                }
+                got = {'energy': energy[i], 'cost': cost[i], 'payback': payback[i],
+                       'carbon': round(float(carbon[i]), 1), 'ml': predicted[i]}
+                for name, value in expected.items():
+                    if abs(float(got[name]) - value) > 1e-6 * max(1.0, abs(value)) + (0.05 if name == 'carbon' else 0):
+                        failures.append(f"{design['id']} {name}: vectorized {got[name]} != scalar {value} for {sample}")
+    return failures
+
+
+def _median_ms(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monte Carlo uncertainty benchmark')
+    parser.add_argument('--samples', type=int, nargs='+', default=[10000, 100000, 200000])
+    parser.add_argument('--repeats', type=int, default=9)
+    parser.add_argument('--check-samples', type=int, default=2000)
+    args = parser.parse_args()
+
+    predictor = SimpleCostPredictor().train(generate_synthetic_cost_data(200))
+    constraints_list = constraint_samples(6)
+
+    failures = check_consistency(predictor, constraints_list, args.check_samples)
+
+    constraints = constraints_list[0]
+    results = {'consistency_checks': len(constraints_list) * 3 * args.check_samples, 'latency_ms': {}}
+    for samples in args.samples:
+        params, _ = uncertainty.parse_params(dict(constraints, samples=samples))
+        results['latency_ms'][str(samples)] = _median_ms(
+            lambda: uncertainty.analyze(constraints, predictor, params), args.repeats
+        )
+
+    saved, uncertainty.np = uncertainty.np, None
+    try:
+        params, _ = uncertainty.parse_params(dict(constraints, samples=uncertainty.FALLBACK_MAX_SAMPLES))
+        results['python_fallback_ms'] = {
+            str(params['samples']): _median_ms(lambda: uncertainty.analyze(constraints, predictor, params), 3)
+        }
+    finally:
+        uncertainty.np = saved
+
+    print(json.dumps(results, indent=2))
+    for failure in failures[:20]:
+        print(f"✗ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✓ Vectorized evaluation matches the scalar evaluator")
+
+
+if __name__ == '__main__':
+    main()
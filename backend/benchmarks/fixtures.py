@@ -0,0 +1,67 @@
+"""
+Deterministic inputs shared by the benchmark scripts
+"""
+
+import random
+from typing import Any, Dict, List
+
+from constraints import ConstraintEngine
+from generator import DesignGenerator
+from evaluator import SustainabilityEvaluator
+from simple_ml import (
+    SimpleDesignRanker, SimpleDesignRecommender,
+    generate_synthetic_preference_data, generate_synthetic_historical_projects
+)
+
+SEED = 1234
+CLIMATES = ['cold', 'moderate', 'hot']
+PRIORITIES = ['energy', 'water', 'materials']
+
+
+def constraint_samples(n: int, seed: int = SEED) -> List[Dict[str, Any]]:
+    """Return n valid constraint dicts drawn from a fixed seed"""
+    rng = random.Random(seed)
+    return [
+        {
+            'area': rng.randint(300, 2000),
+            'budget': rng.randint(0, 100),
+            'climate': rng.choice(CLIMATES),
+            'priority': rng.choice(PRIORITIES),
+        }
+        for _ in range(n)
+    ]
+
+
+def project_samples(n: int, seed: int = SEED) -> List[Dict[str, Any]]:
+    """
+    Build n projects shaped like the ones /api/designs/generate persists:
+    constraints, evaluated designs and the ML payload.
+    """
+    random.seed(seed)
+    engine = ConstraintEngine()
+    generator = DesignGenerator()
+    evaluator = SustainabilityEvaluator()
+    ranker = SimpleDesignRanker().train(generate_synthetic_preference_data(20))
+    recommender = SimpleDesignRecommender().learn_from_history(
+        generate_synthetic_historical_projects(50)
+    )
+
+    projects = []
+    for constraints in constraint_samples(n, seed):
+        engine.validate(constraints)
+        designs = generator.generate(constraints)
+        for design in designs:
+            design['metrics'] = evaluator.evaluate(design, constraints)
+        ml_rankings = [
+            {'id': d.get('id'), 'ml_score': round(score, 2)}
+            for d, score in ranker.rank_designs(designs, constraints)
+        ]
+        projects.append({
+            'constraints': constraints,
+            'designs': designs,
+            'ml': {
+                'ml_rankings': ml_rankings,
+                'recommendations': recommender.recommend_design(constraints),
+            },
+        })
+    return projects
@@ -0,0 +1,487 @@
+"""
+API load generator and trace replay
+
+Drives a weighted request mix against the Flask app and writes a JSON
+report (throughput, latency percentiles and status counts per operation)
+that can be compared across commits.
+
+Modes:
+    inprocess  Flask test client inside this process
+    gunicorn   starts gunicorn on a local port with a throwaway SQLite file
+    uvicorn    same, serving the ASGI entry point (asgi.py)
+    url        an already running server (--url)
+
+Examples:
+    python -m benchmarks.loadgen --mode inprocess --seconds 10 --output base.json
+    python -m benchmarks.loadgen --mode gunicorn --workers 4 --concurrency 16
+    python -m benchmarks.loadgen --mode uvicorn --workers 4 --concurrency 16
+    python -m benchmarks.loadgen --mix generate=1,get_project=4 --record trace.jsonl
+    python -m benchmarks.loadgen --replay trace.jsonl --replay-speed 2
+    python -m benchmarks.loadgen --compare base.json new.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import Counter, defaultdict
+
+from benchmarks.fixtures import constraint_samples
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = {
+    'generate': 4,
+    'list_projects': 2,
+    'get_project': 4,
+    'rankings': 1,
+    'cost_prediction': 2,
+    'recommendations': 2,
+    'login': 1,
+}
+
+BENCH_USER = {'name': 'loadgen', 'email': 'loadgen@example.com', 'password': 'loadgen-pass'}
+
+
+# ==================== TRANSPORTS ====================
+
+class InProcessTransport:
+    """Flask test client against a temporary SQLite file; one client per thread"""
+
+    def __init__(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.environ.pop('DATABASE_URL', None)
+        os.environ['SQLITE_PATH'] = os.path.join(self.tmpdir.name, 'loadgen.db')
+        os.environ.setdefault('ADMISSION_ENABLED', 'false')
+        from app import app
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        resp = client.open(path, method=method, json=body)
+        return resp.status_code, resp.get_json(silent=True)
+
+    def close(self):
+        self.tmpdir.cleanup()
+
+
+class HttpTransport:
+    """Keep-alive HTTP connection per thread"""
+
+    def __init__(self, base_url):
+        parsed = urllib.parse.urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        payload = json.dumps(body) if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            resp = conn.getresponse()
+            data = resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            return 0, None
+        try:
+            return resp.status, json.loads(data) if data else None
+        except ValueError:
+            return resp.status, None
+
+    def close(self):
+        pass
+
+
+class ServerTransport(HttpTransport):
+    """Starts a private server process against a temporary SQLite file"""
+
+    name = 'server'
+
+    def __init__(self, cmd, port):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        env = dict(os.environ)
+        env.pop('DATABASE_URL', None)
+        env['SQLITE_PATH'] = os.path.join(self.tmpdir.name, 'loadgen.db')
+        # Every simulated user shares 127.0.0.1; opt back in to measure shedding
+        env.setdefault('ADMISSION_ENABLED', 'false')
+        self.proc = subprocess.Popen(
+            cmd, cwd=BACKEND_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        super().__init__(f'http://127.0.0.1:{port}')
+        self._wait_ready()
+
+    def _wait_ready(self, timeout=120):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f'{self.name} exited during startup')
+            status, _ = self.request('GET', '/api/health')
+            if status == 200:
+                return
+            time.sleep(0.5)
+        raise RuntimeError(f'{self.name} did not become ready')
+
+    def close(self):
+        self.proc.send_signal(signal.SIGTERM)
+        try:
+            self.proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self.tmpdir.cleanup()
+
+
+class GunicornTransport(ServerTransport):
+    """gunicorn serving the WSGI app"""
+
+    name = 'gunicorn'
+
+    def __init__(self, workers, worker_class, port, threads=1):
+        super().__init__([
+            sys.executable, '-m', 'gunicorn',
+            '--workers', str(workers),
+            '--worker-class', worker_class,
+            '--threads', str(threads),
+            '--bind', f'127.0.0.1:{port}',
+            'app:app',
+        ], port)
+
+
+class UvicornTransport(ServerTransport):
+    """uvicorn serving the ASGI app (asgi.py)"""
+
+    name = 'uvicorn'
+
+    def __init__(self, workers, port):
+        super().__init__([
+            sys.executable, '-m', 'uvicorn',
+            '--workers', str(workers),
+            '--host', '127.0.0.1',
+            '--port', str(port),
+            '--no-access-log',
+            'asgi:app',
+        ], port)
+
+
+# ==================== WORKLOAD ====================
+
+class Workload:
+    """Builds requests for each operation from fixed-seed inputs"""
+
+    def __init__(self, seed):
+        self.constraints = constraint_samples(512, seed)
+        self.project_ids = []
+        self.sample_designs = None
+        self._lock = threading.Lock()
+
+    def prepare(self, transport):
+        """Create the login user and a pool of projects to read back"""
+        transport.request('POST', '/api/auth/signup', BENCH_USER)
+        for constraints in self.constraints[:20]:
+            status, body = transport.request('POST', '/api/designs/generate', constraints)
+            if status == 200 and body:
+                self.observe('generate', body)
+
+    def observe(self, op, body):
+        if op == 'generate' and body:
+            with self._lock:
+                if body.get('project_id') is not None:
+                    self.project_ids.append(body['project_id'])
+                    del self.project_ids[:-200]
+                if self.sample_designs is None:
+                    self.sample_designs = {'designs': body.get('designs'), 'constraints': body.get('constraints')}
+
+    def build(self, op, rng):
+        constraints = rng.choice(self.constraints)
+        if op == 'generate':
+            return 'POST', '/api/designs/generate', constraints
+        if op == 'list_projects':
+            return 'GET', '/api/projects?limit=50', None
+        if op == 'get_project':
+            with self._lock:
+                project_id = rng.choice(self.project_ids) if self.project_ids else 1
+            return 'GET', f'/api/projects/{project_id}', None
+        if op == 'rankings':
+            return 'POST', '/api/comparison/rankings', self.sample_designs or {'designs': []}
+        if op == 'cost_prediction':
+            return 'POST', '/api/ml/cost-prediction', dict(constraints, design_id=rng.randint(0, 2))
+        if op == 'recommendations':
+            return 'POST', '/api/ml/recommendations', constraints
+        if op == 'login':
+            return 'POST', '/api/auth/login', {'email': BENCH_USER['email'], 'password': BENCH_USER['password']}
+        raise ValueError(f'Unknown operation: {op}')
+
+
+def _classify(path):
+    """Map a replayed path back to an operation name"""
+    path = path.split('?')[0]
+    if path == '/api/designs/generate':
+        return 'generate'
+    if path == '/api/projects':
+        return 'list_projects'
+    if path.startswith('/api/projects/'):
+        return 'get_project'
+    if path == '/api/comparison/rankings':
+        return 'rankings'
+    if path == '/api/ml/cost-prediction':
+        return 'cost_prediction'
+    if path == '/api/ml/recommendations':
+        return 'recommendations'
+    if path == '/api/auth/login':
+        return 'login'
+    return path
+
+
+# ==================== RUNNERS ====================
+
+class Recorder:
+    def __init__(self, trace_path=None):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._trace = open(trace_path, 'w') if trace_path else None
+        self._t0 = time.time()
+
+    def record(self, op, method, path, body, status, seconds):
+        with self._lock:
+            self.latencies[op].append(seconds * 1000)
+            self.statuses[op][status] += 1
+            if self._trace:
+                self._trace.write(json.dumps({
+                    'ts': time.time(), 'method': method, 'path': path, 'body': body, 'status': status,
+                }) + '\n')
+
+    def close(self):
+        if self._trace:
+            self._trace.close()
+
+
+def _timed(transport, method, path, body):
+    t0 = time.perf_counter()
+    status, resp = transport.request(method, path, body)
+    return status, resp, time.perf_counter() - t0
+
+
+def run_mix(transport, workload, mix, concurrency, seconds, max_requests, recorder, seed):
+    ops = list(mix)
+    weights = [mix[op] for op in ops]
+    stop_at = time.monotonic() + seconds
+    issued = [0]
+    issued_lock = threading.Lock()
+
+    def worker(n):
+        rng = random.Random(seed + n)
+        while time.monotonic() < stop_at:
+            if max_requests:
+                with issued_lock:
+                    if issued[0] >= max_requests:
+                        return
+                    issued[0] += 1
+            op = rng.choices(ops, weights)[0]
+            method, path, body = workload.build(op, rng)
+            status, resp, elapsed = _timed(transport, method, path, body)
+            workload.observe(op, resp)
+            recorder.record(op, method, path, body, status, elapsed)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def run_replay(transport, trace_path, concurrency, speed, recorder):
+    """Replay a trace, preserving inter-arrival gaps scaled by speed (0 = as fast as possible)"""
+    with open(trace_path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if not entries:
+        return 0.0
+    base_ts = entries[0]['ts']
+    cursor = [0]
+    cursor_lock = threading.Lock()
+    start_wall = time.monotonic()
+
+    def worker():
+        while True:
+            with cursor_lock:
+                if cursor[0] >= len(entries):
+                    return
+                entry = entries[cursor[0]]
+                cursor[0] += 1
+            if speed > 0:
+                due = start_wall + (entry['ts'] - base_ts) / speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            status, _, elapsed = _timed(transport, entry['method'], entry['path'], entry.get('body'))
+            recorder.record(_classify(entry['path']), entry['method'], entry['path'],
+                            entry.get('body'), status, elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+# ==================== REPORTING ====================
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(latencies, elapsed):
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(_percentile(latencies, 50), 3),
+        'p90_ms': round(_percentile(latencies, 90), 3),
+        'p99_ms': round(_percentile(latencies, 99), 3),
+        'max_ms': round(max(latencies), 3),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(recorder, elapsed, meta):
+    operations = {}
+    for op, latencies in sorted(recorder.latencies.items()):
+        operations[op] = _summary(latencies, elapsed)
+        operations[op]['status_counts'] = {str(k): v for k, v in sorted(recorder.statuses[op].items())}
+    all_latencies = [ms for values in recorder.latencies.values() for ms in values]
+    return {
+        'meta': dict(meta, commit=_git_commit(), timestamp=time.strftime('%Y-%m-%dT%H:%M:%S')),
+        'elapsed_seconds': round(elapsed, 3),
+        'overall': _summary(all_latencies, elapsed) if all_latencies else {},
+        'operations': operations,
+    }
+
+
+def compare_reports(base_path, new_path):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    rows = []
+    for op in sorted(set(base['operations']) | set(new['operations'])):
+        b = base['operations'].get(op)
+        n = new['operations'].get(op)
+        if not b or not n:
+            rows.append({'operation': op, 'note': 'missing in one report'})
+            continue
+        rows.append({
+            'operation': op,
+            'throughput_change_pct': round((n['throughput_rps'] / b['throughput_rps'] - 1) * 100, 1)
+            if b['throughput_rps'] else None,
+            'p50_change_pct': round((n['p50_ms'] / b['p50_ms'] - 1) * 100, 1) if b['p50_ms'] else None,
+            'p99_change_pct': round((n['p99_ms'] / b['p99_ms'] - 1) * 100, 1) if b['p99_ms'] else None,
+        })
+    return {'base': base['meta'], 'new': new['meta'], 'operations': rows}
+
+
+def _parse_mix(text):
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f'Unknown operation in --mix: {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API load generator and trace replay')
+    parser.add_argument('--mode', choices=['inprocess', 'gunicorn', 'uvicorn', 'url'], default='inprocess')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--workers', type=int, default=4, help='server worker processes')
+    parser.add_argument('--worker-class', default='sync', help='gunicorn worker class')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--port', type=int, default=8765, help='server port')
+    parser.add_argument('--mix', help='weights, e.g. generate=4,get_project=4,login=1')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--requests', type=int, default=0, help='stop after this many requests')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--record', metavar='TRACE', help='write issued requests as JSON lines')
+    parser.add_argument('--replay', metavar='TRACE', help='replay a recorded or captured trace')
+    parser.add_argument('--replay-speed', type=float, default=0, help='0 replays as fast as possible')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='compare two reports')
+    args = parser.parse_args()
+
+    if args.compare:
+        print(json.dumps(compare_reports(*args.compare), indent=2))
+        return
+
+    if args.mode == 'inprocess':
+        transport = InProcessTransport()
+    elif args.mode == 'gunicorn':
+        transport = GunicornTransport(args.workers, args.worker_class, args.port, args.threads)
+    elif args.mode == 'uvicorn':
+        transport = UvicornTransport(args.workers, args.port)
+    else:
+        transport = HttpTransport(args.url)
+
+    recorder = Recorder(args.record)
+    mix = _parse_mix(args.mix)
+    try:
+        if args.replay:
+            elapsed = run_replay(transport, args.replay, args.concurrency, args.replay_speed, recorder)
+        else:
+            workload = Workload(args.seed)
+            workload.prepare(transport)
+            elapsed = run_mix(transport, workload, mix, args.concurrency, args.seconds,
+                              args.requests, recorder, args.seed)
+    finally:
+        recorder.close()
+        transport.close()
+
+    report = build_report(recorder, elapsed, {
+        'mode': args.mode,
+        'workers': args.workers if args.mode in ('gunicorn', 'uvicorn') else None,
+        'worker_class': args.worker_class if args.mode == 'gunicorn' else None,
+        'concurrency': args.concurrency,
+        'mix': None if args.replay else mix,
+        'replay': args.replay,
+        'seed': args.seed,
+    })
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+"""
+Micro-benchmarks for the core modules, with stored baselines
+
+Covers ConstraintEngine, DesignGenerator, SustainabilityEvaluator, the
+simple_ml models, the scikit-learn ml_models (skipped when scikit-learn is
+not installed) and every data_loader loader. Inputs come from fixed seeds
+and generated fixture files, so runs are comparable across commits.
+
+    python -m benchmarks.micro run                     # print results
+    python -m benchmarks.micro run --save-baseline     # refresh baselines.json
+    python -m benchmarks.micro compare                 # flag slowdowns vs baseline
+    python -m benchmarks.micro compare --filter evaluator
+
+compare runs a Mann-Whitney U test per case on the per-sample timings and
+flags cases whose median is slower by more than --threshold with p < --alpha.
+Baselines are only meaningful on the machine that recorded them; refresh
+them when the benchmark hardware changes.
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+
+from constraints import ConstraintEngine
+from generator import DesignGenerator
+from evaluator import SustainabilityEvaluator
+import data_loader
+import simple_ml
+from benchmarks.fixtures import constraint_samples, project_samples
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+SEED = 1234
+
+
+# ==================== FIXTURES ====================
+
+def _write_uci_csv(path, rows, rng):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['X1', 'X2', 'X3', 'X4', 'X5', 'X6', 'X7', 'X8', 'Y1', 'Y2'])
+        for _ in range(rows):
+            writer.writerow([
+                round(rng.uniform(0.6, 1.0), 2), round(rng.uniform(500, 800), 1),
+                round(rng.uniform(240, 420), 1), round(rng.uniform(110, 220), 2),
+                rng.choice([3.5, 7.0]), rng.randint(2, 5), rng.choice([0, 0.1, 0.25, 0.4]),
+                rng.randint(0, 5), round(rng.uniform(6, 43), 2), round(rng.uniform(10, 48), 2),
+            ])
+
+
+def _write_nyc_csv(path, rows, rng):
+    columns = [
+        'Property GFA - Self-Reported (ft²)', 'Site EUI (kBtu/ft²)',
+        'Water Use (All Water Sources) (kgal)', 'Total GHG Emissions (Metric Tons CO2e)',
+        'ENERGY STAR Score',
+    ]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for _ in range(rows):
+            writer.writerow([
+                f"{rng.randint(3000, 40000):,}", round(rng.uniform(40, 250), 1),
+                f"{rng.uniform(100, 9000):,.1f}", f"{rng.uniform(50, 3000):,.1f}", rng.randint(1, 100),
+            ])
+
+
+class Fixtures:
+    def __init__(self, tmpdir):
+        rng = random.Random(SEED)
+        self.constraints = constraint_samples(100, SEED)
+        self.projects = project_samples(100, SEED)
+        self.designs = [(d, p['constraints']) for p in self.projects for d in p['designs']]
+
+        self.uci_csv = os.path.join(tmpdir, 'energy_efficiency.csv')
+        _write_uci_csv(self.uci_csv, 768, rng)
+        self.nyc_csv = os.path.join(tmpdir, 'nyc_buildings.csv')
+        _write_nyc_csv(self.nyc_csv, 2000, rng)
+        self.custom_csv = os.path.join(DATA_DIR, 'sample_training_data.csv')
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.raw = data_loader.load_custom_csv(self.custom_csv) * 20
+        random.seed(SEED)
+        self.cost_data = simple_ml.generate_synthetic_cost_data(200)
+        self.preference_data = simple_ml.generate_synthetic_preference_data(150)
+        self.history = simple_ml.generate_synthetic_historical_projects(100)
+
+
+# ==================== CASES ====================
+
+def build_cases(fx):
+    """Return {name: (callable, calls_per_sample)}"""
+    engine = ConstraintEngine()
+    generator = DesignGenerator()
+    evaluator = SustainabilityEvaluator()
+    cost = simple_ml.SimpleCostPredictor().train(fx.cost_data)
+    ranker = simple_ml.SimpleDesignRanker().train(fx.preference_data)
+    recommender = simple_ml.SimpleDesignRecommender().learn_from_history(fx.history)
+    evaluated = [p['designs'] for p in fx.projects]
+
+    def quiet(fn):
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn()
+        return run
+
+    cases = {
+        'constraints.validate': (lambda: [engine.validate(c) for c in fx.constraints], len(fx.constraints)),
+        'constraints.process': (lambda: [engine.process(c) for c in fx.constraints], len(fx.constraints)),
+        'generator.generate': (lambda: [generator.generate(c) for c in fx.constraints], len(fx.constraints)),
+        # No batch case: SustainabilityEvaluator has no batch API, and bulk
+        # scoring (batch_score.py) calls evaluate() once per design
+        'evaluator.evaluate': (lambda: [evaluator.evaluate(d, c) for d, c in fx.designs], len(fx.designs)),
+        'evaluator.rank_designs': (lambda: [evaluator.rank_designs(list(ds)) for ds in evaluated], len(evaluated)),
+        'simple_ml.cost.train': (lambda: simple_ml.SimpleCostPredictor().train(fx.cost_data), 1),
+        'simple_ml.cost.predict': (
+            lambda: [cost.predict(c['area'], c['budget'], c['climate'], c['priority'], i % 3)
+                     for i, c in enumerate(fx.constraints)], len(fx.constraints)),
+        'simple_ml.ranker.train': (lambda: simple_ml.SimpleDesignRanker().train(fx.preference_data), 1),
+        'simple_ml.ranker.rank': (
+            lambda: [ranker.rank_designs(p['designs'], p['constraints']) for p in fx.projects], len(fx.projects)),
+        'simple_ml.recommender.learn': (
+            lambda: simple_ml.SimpleDesignRecommender().learn_from_history(fx.history), 1),
+        'simple_ml.recommender.recommend': (
+            lambda: [recommender.recommend_design(c) for c in fx.constraints], len(fx.constraints)),
+        'data_loader.load_uci_energy_data': (quiet(lambda: data_loader.load_uci_energy_data(fx.uci_csv)), 1),
+        'data_loader.load_nyc_building_data': (quiet(lambda: data_loader.load_nyc_building_data(fx.nyc_csv)), 1),
+        'data_loader.load_custom_csv': (quiet(lambda: data_loader.load_custom_csv(fx.custom_csv)), 1),
+        'data_loader.prepare_cost_training_data': (lambda: data_loader.prepare_cost_training_data(fx.raw), 1),
+        'data_loader.prepare_preference_training_data': (
+            lambda: data_loader.prepare_preference_training_data(fx.raw), 1),
+        'data_loader.prepare_historical_training_data': (
+            lambda: data_loader.prepare_historical_training_data(fx.raw), 1),
+    }
+
+    try:
+        from ml_models import CostPredictor, DesignRanker, DesignRecommender
+    except ImportError:
+        return cases
+
+    cost_ml = CostPredictor().train(fx.cost_data)
+    ranker_ml = DesignRanker().train(fx.preference_data)
+    recommender_ml = DesignRecommender().learn_from_history(fx.history)
+    cases.update({
+        'ml_models.cost.train': (lambda: CostPredictor().train(fx.cost_data), 1),
+        'ml_models.cost.predict': (
+            lambda: [cost_ml.predict(c['area'], c['budget'], c['climate'], c['priority'], 0)
+                     for c in fx.constraints[:20]], 20),
+        'ml_models.ranker.train': (lambda: DesignRanker().train(fx.preference_data), 1),
+        'ml_models.ranker.rank': (
+            lambda: [ranker_ml.rank_designs(p['designs'], p['constraints']) for p in fx.projects[:20]], 20),
+        'ml_models.recommender.learn': (lambda: DesignRecommender().learn_from_history(fx.history), 1),
+        'ml_models.recommender.recommend': (
+            lambda: [recommender_ml.recommend_design(c) for c in fx.constraints[:20]], 20),
+    })
+    return cases
+
+
+# ==================== RUNNER ====================
+
+def _measure(fn, calls, samples, min_sample_seconds):
+    """Per-call seconds for each sample; loops enough to beat timer noise"""
+    fn()  # warm-up
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - t0 >= min_sample_seconds or loops >= 1 << 16:
+            break
+        loops *= 2
+
+    timings = []
+    for _ in range(samples):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - t0) / (loops * calls))
+    return timings
+
+
+def run(name_filter=None, samples=15, min_sample_seconds=0.02):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fx = Fixtures(tmpdir)
+        cases = build_cases(fx)
+        results = {}
+        for name, (fn, calls) in cases.items():
+            if name_filter and name_filter not in name:
+                continue
+            timings = _measure(fn, calls, samples, min_sample_seconds)
+            results[name] = {
+                'median_us': round(statistics.median(timings) * 1e6, 3),
+                'stdev_us': round(statistics.pstdev(timings) * 1e6, 3),
+                'samples_us': [round(t * 1e6, 3) for t in timings],
+            }
+    return results
+
+
+def _mann_whitney_p(a, b):
+    """Two-sided p-value of the Mann-Whitney U test (normal approximation)"""
+    n1, n2 = len(a), len(b)
+    combined = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    ranks = [0.0] * len(combined)
+    i = 0
+    tie_term = 0.0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        avg_rank = (i + j) / 2.0 + 1
+        for k in range(i, j + 1):
+            ranks[k] = avg_rank
+        tied = j - i + 1
+        tie_term += tied ** 3 - tied
+        i = j + 1
+    rank_sum_a = sum(r for r, (_, group) in zip(ranks, combined) if group == 0)
+    u = rank_sum_a - n1 * (n1 + 1) / 2.0
+    mean_u = n1 * n2 / 2.0
+    n = n1 + n2
+    var_u = n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1)))
+    if var_u <= 0:
+        return 1.0
+    z = (abs(u - mean_u) - 0.5) / math.sqrt(var_u)
+    return math.erfc(max(z, 0.0) / math.sqrt(2))
+
+
+def compare(results, baseline, threshold, alpha):
+    rows = []
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            rows.append((name, current['median_us'], None, None, None, 'new'))
+            continue
+        change = current['median_us'] / base['median_us'] - 1 if base['median_us'] else 0.0
+        p_value = _mann_whitney_p(base['samples_us'], current['samples_us'])
+        if change > threshold and p_value < alpha:
+            verdict = 'SLOWER'
+            regressions.append(name)
+        elif change < -threshold and p_value < alpha:
+            verdict = 'faster'
+        else:
+            verdict = 'ok'
+        rows.append((name, current['median_us'], base['median_us'], change, p_value, verdict))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Core module micro-benchmarks')
+    parser.add_argument('command', choices=['run', 'compare'])
+    parser.add_argument('--filter', help='only run cases containing this text')
+    parser.add_argument('--samples', type=int, default=15)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative slowdown to flag')
+    parser.add_argument('--alpha', type=float, default=0.01, help='significance level')
+    args = parser.parse_args()
+
+    results = run(args.filter, args.samples)
+
+    if args.command == 'run':
+        if args.save_baseline:
+            with open(args.baseline, 'w') as f:
+                json.dump({
+                    'machine': {'python': platform.python_version(), 'platform': platform.platform()},
+                    'results': results,
+                }, f, indent=1, sort_keys=True)
+                f.write('\n')
+            print(f"✓ Baseline written to {args.baseline}")
+        for name, r in results.items():
+            print(f"{name:48s} {r['median_us']:>14.3f} µs  ±{r['stdev_us']:.3f}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows, regressions = compare(results, baseline, args.threshold, args.alpha)
+    print(f"{'case':48s} {'now µs':>12s} {'base µs':>12s} {'change':>8s} {'p':>8s}")
+    for name, now, base, change, p_value, verdict in rows:
+        if base is None:
+            print(f"{name:48s} {now:>12.3f} {'-':>12s} {'-':>8s} {'-':>8s}  {verdict}")
+        else:
+            print(f"{name:48s} {now:>12.3f} {base:>12.3f} {change:>+8.1%} {p_value:>8.4f}  {verdict}")
+    if regressions:
+        print(f"✗ {len(regressions)} significant slowdown(s): {', '.join(regressions)}")
+        raise SystemExit(1)
+    print("✓ No significant slowdowns")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Concurrency stress check for threaded workers (gthread)
+
+Runs a fixed set of API requests serially to record the expected responses,
+then fires the same requests from many threads at one app instance while
+another thread keeps swapping the model set, and checks every concurrent
+response is identical to its serial twin. It also checks that the ranking
+endpoints leave the designs they are given untouched.
+
+    python -m benchmarks.stress_concurrency --threads 32 --rounds 20
+
+Exits non-zero on any mismatch.
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fixtures import constraint_samples
+
+# Fields that legitimately differ between two runs of the same request
+VOLATILE_FIELDS = ('generated_at', 'project_id', 'evaluation_timestamp')
+
+
+def _normalize(payload):
+    if isinstance(payload, dict):
+        return {k: _normalize(v) for k, v in payload.items() if k not in VOLATILE_FIELDS}
+    if isinstance(payload, list):
+        return [_normalize(v) for v in payload]
+    return payload
+
+
+def build_requests(app_module, count):
+    """(method, path, body) covering every stateless pipeline route"""
+    client = app_module.app.test_client()
+    requests = []
+    for constraints in constraint_samples(count):
+        designs = client.post('/api/designs/generate', json=constraints).get_json()['designs']
+        requests.extend([
+            ('POST', '/api/constraints/validate', constraints),
+            ('POST', '/api/designs/generate', constraints),
+            ('POST', f"/api/designs/{designs[0]['id']}/evaluate", {'design': designs[0], 'constraints': constraints}),
+            ('POST', '/api/comparison/rankings', {'designs': designs, 'constraints': constraints}),
+            ('POST', '/api/ml/cost-prediction', dict(constraints, design_id=1)),
+            ('POST', '/api/ml/recommendations', constraints),
+        ])
+    return requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Threaded worker stress check')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=20, help='times each request is repeated')
+    parser.add_argument('--constraints', type=int, default=10)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tmpdir.name, 'stress.db')
+    os.environ['RETENTION_ENABLED'] = 'false'
+    os.environ['ADMISSION_ENABLED'] = 'false'
+    import app as app_module
+
+    requests = build_requests(app_module, args.constraints)
+    serial_client = app_module.app.test_client()
+    expected = []
+    for method, path, body in requests:
+        resp = serial_client.open(path, method=method, json=copy.deepcopy(body))
+        expected.append((resp.status_code, _normalize(resp.get_json())))
+
+    # Model sets trained identically, so swapping must not change any answer
+    model_sets = [app_module.models, copy.deepcopy(app_module.models)]
+    stop = threading.Event()
+    swaps = 0
+
+    def swapper():
+        nonlocal swaps
+        while not stop.is_set():
+            app_module.models = model_sets[swaps % 2]
+            swaps += 1
+            time.sleep(0.001)
+
+    local = threading.local()
+    failures = []
+
+    def run(index):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app_module.app.test_client()
+        method, path, body = requests[index]
+        sent = copy.deepcopy(body)
+        resp = client.open(path, method=method, json=sent)
+        got = (resp.status_code, _normalize(resp.get_json()))
+        if got != expected[index]:
+            failures.append(f"{method} {path}: response differs from serial run")
+        if sent != body:
+            failures.append(f"{method} {path}: request payload was mutated")
+
+    order = [i for i in range(len(requests)) for _ in range(args.rounds)]
+    random.Random(1234).shuffle(order)
+
+    swap_thread = threading.Thread(target=swapper, daemon=True)
+    swap_thread.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(run, order))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    swap_thread.join()
+
+    # The evaluator must not annotate the designs it ranks
+    designs = requests[3][2]['designs']
+    snapshot = copy.deepcopy(designs)
+    app_module.evaluator.rank_designs(designs)
+    if designs != snapshot:
+        failures.append("SustainabilityEvaluator.rank_designs mutated its input")
+
+    print(json.dumps({
+        'requests': len(order),
+        'threads': args.threads,
+        'model_swaps': swaps,
+        'seconds': round(elapsed, 2),
+        'failures': len(failures),
+    }, indent=2))
+    for failure in sorted(set(failures))[:20]:
+        print(f"✗ {failure}")
+    tmpdir.cleanup()
+    if failures:
+        sys.exit(1)
+    print("✓ Concurrent responses match serial runs")
+
+
+if __name__ == '__main__':
+    main()
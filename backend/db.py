@@ -2,78 +2,33 @@
 SQLite database helper for sustainable design projects.
 """
 
+import os
 import sqlite3
-import json
-import hashlib
-import secrets
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 
-DB_PATH = "database.db"
+from migrations import apply_sqlite
+from password_hasher import hash_password, verify_password
+from payload_codec import encode_payload, decode_payload
+from project_cache import project_cache
+
+DB_PATH = os.getenv("SQLITE_PATH", "database.db")
 
 
 def _connect():
     return sqlite3.connect(DB_PATH)
 
 
-def _ensure_column(conn, table: str, column: str, col_type: str):
-    cur = conn.cursor()
-    cur.execute(f"PRAGMA table_info({table})")
-    columns = [row[1] for row in cur.fetchall()]
-    if column not in columns:
-        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
-        conn.commit()
-
-
-def _hash_password(password: str) -> str:
-    salt = secrets.token_hex(16)
-    hash_bytes = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), 100000)
-    return f"{salt}${hash_bytes.hex()}"
-
-
-def _verify_password(password: str, stored: str) -> bool:
-    try:
-        salt, hash_hex = stored.split("$")
-        new_hash = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), 100000)
-        return new_hash.hex() == hash_hex
-    except Exception:
-        return False
-
-
 def initialize_db():
     with _connect() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                email TEXT UNIQUE,
-                password_hash TEXT,
-                created_at TEXT
-            )
-            """
-        )
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS projects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                area INTEGER,
-                budget INTEGER,
-                climate TEXT,
-                priority TEXT,
-                designs_json TEXT,
-                ml_json TEXT,
-                created_at TEXT
-            )
-            """
-        )
-        _ensure_column(conn, "projects", "user_id", "INTEGER")
-        conn.commit()
+        apply_sqlite(conn)
 
 
 def save_project(constraints: Dict[str, Any], designs: List[Dict[str, Any]], ml_data: Optional[Dict[str, Any]] = None, user_id: Optional[int] = None) -> int:
+    created_at = datetime.now().isoformat()
+    # Taken before the INSERT, so a clear_projects committed in between
+    # keeps the write-through put below from re-adding the project
+    epoch = project_cache.epoch()
     with _connect() as conn:
         cur = conn.cursor()
         cur.execute(
@@ -87,13 +42,69 @@ def save_project(constraints: Dict[str, Any], designs: List[Dict[str, Any]], ml_
                 constraints.get("budget"),
                 constraints.get("climate"),
                 constraints.get("priority"),
-                json.dumps(designs),
-                json.dumps(ml_data or {}),
-                datetime.now().isoformat(),
+                encode_payload(designs),
+                encode_payload(ml_data or {}),
+                created_at,
             ),
         )
         conn.commit()
-        return cur.lastrowid
+        project_id = cur.lastrowid
+
+    # Write-through: the decoded project is already in hand
+    project_cache.put(project_id, {
+        "id": project_id,
+        "user_id": user_id,
+        "area": constraints.get("area"),
+        "budget": constraints.get("budget"),
+        "climate": constraints.get("climate"),
+        "priority": constraints.get("priority"),
+        "designs": designs,
+        "ml": ml_data or {},
+        "created_at": created_at,
+    }, epoch=epoch)
+    return project_id
+
+
+def save_projects(projects: List[Tuple[Dict[str, Any], List[Dict[str, Any]], Optional[Dict[str, Any]], Optional[int]]]) -> List[int]:
+    """Save (constraints, designs, ml_data, user_id) tuples in one transaction"""
+    created_at = datetime.now().isoformat()
+    project_ids = []
+    epoch = project_cache.epoch()
+    with _connect() as conn:
+        cur = conn.cursor()
+        for constraints, designs, ml_data, user_id in projects:
+            cur.execute(
+                """
+                INSERT INTO projects (user_id, area, budget, climate, priority, designs_json, ml_json, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    user_id,
+                    constraints.get("area"),
+                    constraints.get("budget"),
+                    constraints.get("climate"),
+                    constraints.get("priority"),
+                    encode_payload(designs),
+                    encode_payload(ml_data or {}),
+                    created_at,
+                ),
+            )
+            project_ids.append(cur.lastrowid)
+        conn.commit()
+
+    for project_id, (constraints, designs, ml_data, user_id) in zip(project_ids, projects):
+        project_cache.put(project_id, {
+            "id": project_id,
+            "user_id": user_id,
+            "area": constraints.get("area"),
+            "budget": constraints.get("budget"),
+            "climate": constraints.get("climate"),
+            "priority": constraints.get("priority"),
+            "designs": designs,
+            "ml": ml_data or {},
+            "created_at": created_at,
+        }, epoch=epoch)
+    return project_ids
 
 
 def list_projects(limit: int = 50, user_id: Optional[int] = None, guest: bool = False) -> List[Dict[str, Any]]:
@@ -147,6 +158,11 @@ def list_projects(limit: int = 50, user_id: Optional[int] = None, guest: bool =
 
 
 def get_project(project_id: int) -> Optional[Dict[str, Any]]:
+    cached = project_cache.get(project_id)
+    if cached is not None:
+        return cached
+
+    epoch = project_cache.epoch()
     with _connect() as conn:
         cur = conn.cursor()
         cur.execute(
@@ -160,17 +176,19 @@ def get_project(project_id: int) -> Optional[Dict[str, Any]]:
         row = cur.fetchone()
         if not row:
             return None
-        return {
+        project = {
             "id": row[0],
             "user_id": row[1],
             "area": row[2],
             "budget": row[3],
             "climate": row[4],
             "priority": row[5],
-            "designs": json.loads(row[6] or "[]"),
-            "ml": json.loads(row[7] or "{}"),
+            "designs": decode_payload(row[6], []),
+            "ml": decode_payload(row[7], {}),
             "created_at": row[8],
         }
+    project_cache.put(project_id, project, epoch=epoch)
+    return project
 
 
 def clear_projects(user_id: Optional[int] = None, guest: bool = False) -> int:
@@ -183,21 +201,104 @@ def clear_projects(user_id: Optional[int] = None, guest: bool = False) -> int:
         else:
             cur.execute("DELETE FROM projects WHERE user_id = ?", (user_id,))
         conn.commit()
-        return cur.rowcount
+        deleted = cur.rowcount
+    project_cache.invalidate(user_id=user_id, guest=guest)
+    return deleted
+
+
+def delete_project_batch(
+    guest: bool = True,
+    user_id: Optional[int] = None,
+    created_before: Optional[datetime] = None,
+    keep_latest: Optional[int] = None,
+    batch_size: int = 500,
+) -> List[int]:
+    """
+    Delete at most batch_size of the oldest projects in one scope that are
+    older than created_before or beyond the newest keep_latest rows.
+
+    Returns:
+        Ids of the deleted projects (empty once the scope is within policy)
+    """
+    scope_sql = "user_id IS NULL" if guest else "user_id = ?"
+    scope_args = () if guest else (user_id,)
+    with _connect() as conn:
+        cur = conn.cursor()
+        conditions = []
+        args: List[Any] = []
+        if created_before is not None:
+            conditions.append("created_at < ?")
+            args.append(created_before.isoformat())
+        if keep_latest is not None:
+            cur.execute(
+                f"SELECT id FROM projects WHERE {scope_sql} ORDER BY id DESC LIMIT 1 OFFSET ?",
+                scope_args + (keep_latest,),
+            )
+            row = cur.fetchone()
+            if row:
+                conditions.append("id <= ?")
+                args.append(row[0])
+        if not conditions:
+            return []
+
+        cur.execute(
+            f"""
+            SELECT id FROM projects
+            WHERE {scope_sql} AND ({' OR '.join(conditions)})
+            ORDER BY id
+            LIMIT ?
+            """,
+            scope_args + tuple(args) + (batch_size,),
+        )
+        ids = [r[0] for r in cur.fetchall()]
+        if ids:
+            placeholders = ", ".join("?" * len(ids))
+            cur.execute(f"DELETE FROM projects WHERE id IN ({placeholders})", ids)
+        conn.commit()
+    if ids:
+        project_cache.invalidate_ids(ids)
+    return ids
+
+
+def users_over_project_limit(max_rows: int) -> List[int]:
+    """Ids of users holding more than max_rows projects"""
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT user_id FROM projects
+            WHERE user_id IS NOT NULL
+            GROUP BY user_id
+            HAVING COUNT(*) > ?
+            """,
+            (max_rows,),
+        )
+        return [r[0] for r in cur.fetchall()]
+
+
+def database_size() -> Dict[str, int]:
+    """File size and reclaimable free pages of the SQLite database"""
+    with _connect() as conn:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return {"bytes": page_size * page_count, "free_bytes": page_size * freelist}
+
+
+def compact_storage(max_pages: int = 256) -> int:
+    """Return up to max_pages free pages to the OS (incremental auto-vacuum)"""
+    with _connect() as conn:
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})").fetchall()
+        after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return before - after
 
 
 def create_user(name: str, email: str, password: str = None, oauth_provider: str = None, oauth_id: str = None) -> Dict[str, Any]:
     """Create a new user with optional OAuth credentials"""
     with _connect() as conn:
         cur = conn.cursor()
-        # Add oauth columns if they don't exist (backward compatibility)
-        try:
-            cur.execute("ALTER TABLE users ADD COLUMN oauth_provider TEXT")
-            cur.execute("ALTER TABLE users ADD COLUMN oauth_id TEXT")
-        except:
-            pass  # Columns already exist
-        
-        password_hash = _hash_password(password) if password else None
+        password_hash = hash_password(password) if password else None
         cur.execute(
             """
             INSERT INTO users (name, email, password_hash, oauth_provider, oauth_id, created_at)
@@ -230,22 +331,36 @@ def verify_user(email: str, password: str) -> Optional[Dict[str, Any]]:
     user = get_user_by_email(email)
     if not user:
         return None
-    if _verify_password(password, user["password_hash"]):
-        return {"id": user["id"], "name": user["name"], "email": user["email"]}
-    return None
+    is_valid, needs_rehash = verify_password(password, user["password_hash"])
+    if not is_valid:
+        return None
+    if needs_rehash:
+        # Upgrade to the current hash parameters while we hold the plaintext
+        try:
+            update_password_hash(user["id"], hash_password(password))
+        except Exception:
+            pass  # Keep the old hash; retried on next login
+    return {"id": user["id"], "name": user["name"], "email": user["email"]}
+
+
+def update_password_hash(user_id: int, password_hash: str) -> None:
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE users
+            SET password_hash = ?
+            WHERE id = ?
+            """,
+            (password_hash, user_id),
+        )
+        conn.commit()
 
 
 def update_user_oauth(user_id: int, provider: str, oauth_id: str) -> None:
     """Update user's OAuth information"""
     with _connect() as conn:
         cur = conn.cursor()
-        # Add oauth columns if they don't exist (backward compatibility)
-        try:
-            cur.execute("ALTER TABLE users ADD COLUMN oauth_provider TEXT")
-            cur.execute("ALTER TABLE users ADD COLUMN oauth_id TEXT")
-        except:
-            pass  # Columns already exist
-        
         cur.execute(
             """
             UPDATE users
@@ -255,3 +370,260 @@ def update_user_oauth(user_id: int, provider: str, oauth_id: str) -> None:
             (provider, oauth_id, user_id),
         )
         conn.commit()
+
+
+# ==================== JOBS ====================
+
+JOB_COLUMNS = (
+    "id", "kind", "status", "priority", "user_id", "params_json", "result_json", "error", "progress",
+    "attempts", "worker", "cancel_requested", "created_at", "started_at", "updated_at", "finished_at",
+    "expires_at",
+)
+
+
+def _timestamp(offset_seconds: float = 0.0) -> str:
+    # Fixed precision so stored timestamps compare correctly as text
+    return (datetime.now() + timedelta(seconds=offset_seconds)).isoformat(timespec="microseconds")
+
+
+def _job(row, include_result: bool = True) -> Dict[str, Any]:
+    job = dict(zip(JOB_COLUMNS, row))
+    job["params"] = decode_payload(job.pop("params_json"), {})
+    result = job.pop("result_json")
+    if include_result:
+        job["result"] = decode_payload(result, None)
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+
+def create_job(job_id: str, kind: str, params: Dict[str, Any], priority: int = 0, user_id: Optional[int] = None) -> Dict[str, Any]:
+    now = _timestamp()
+    with _connect() as conn:
+        conn.execute(
+            """
+            INSERT INTO jobs (id, kind, status, priority, user_id, params_json, created_at, updated_at)
+            VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)
+            """,
+            (job_id, kind, priority, user_id, encode_payload(params, compress=False), now, now),
+        )
+        conn.commit()
+    return {"id": job_id, "kind": kind, "status": "queued", "priority": priority, "created_at": now}
+
+
+def count_jobs(status: str = "queued") -> int:
+    with _connect() as conn:
+        return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+
+def get_job(job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+    """A job unless it is unknown or its result has expired"""
+    with _connect() as conn:
+        row = conn.execute(
+            f"""
+            SELECT {', '.join(JOB_COLUMNS)} FROM jobs
+            WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)
+            """,
+            (job_id, _timestamp()),
+        ).fetchone()
+    return _job(row, include_result) if row else None
+
+
+def claim_job(worker: str, limits: Dict[str, Optional[int]]) -> Optional[Dict[str, Any]]:
+    """
+    Move the highest-priority queued job to running for worker.
+
+    Args:
+        limits: kind -> most jobs of that kind running at once (None: no
+            limit); only these kinds are claimed
+
+    Returns:
+        The claimed job, or None if nothing is runnable
+    """
+    now = _timestamp()
+    conn = _connect()
+    conn.isolation_level = None
+    try:
+        # Idle polls stay read-only instead of taking the write lock
+        if not conn.execute("SELECT 1 FROM jobs WHERE status = 'queued' LIMIT 1").fetchone():
+            return None
+        # The write lock makes the limit check and the claim one step
+        conn.execute("BEGIN IMMEDIATE")
+        running = dict(conn.execute("SELECT kind, COUNT(*) FROM jobs WHERE status = 'running' GROUP BY kind"))
+        kinds = [kind for kind, limit in limits.items() if limit is None or running.get(kind, 0) < limit]
+        row = None
+        if kinds:
+            row = conn.execute(
+                f"""
+                SELECT {', '.join(JOB_COLUMNS)} FROM jobs
+                WHERE status = 'queued' AND kind IN ({', '.join('?' * len(kinds))})
+                ORDER BY priority DESC, created_at, id
+                LIMIT 1
+                """,
+                kinds,
+            ).fetchone()
+        if row:
+            conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', worker = ?, started_at = ?, updated_at = ?, progress = 0,
+                    attempts = attempts + 1
+                WHERE id = ?
+                """,
+                (worker, now, now, row[0]),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        # The pre-check runs outside a transaction; rolling back there would
+        # raise and hide the real error
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    if not row:
+        return None
+    job = _job(row)
+    job.update(status="running", worker=worker, started_at=now, attempts=job["attempts"] + 1)
+    return job
+
+
+def update_job_progress(job_id: str, progress: float) -> None:
+    """Record progress (0-1); also serves as the running job's heartbeat"""
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+            (progress, _timestamp(), job_id),
+        )
+        conn.commit()
+
+
+def finish_job(job_id: str, status: str, result: Any = None, error: Optional[str] = None, ttl_seconds: float = 86400) -> bool:
+    """Settle a running job; False if it was no longer running"""
+    now = _timestamp()
+    with _connect() as conn:
+        cur = conn.execute(
+            """
+            UPDATE jobs
+            SET status = ?, result_json = ?, error = ?, progress = CASE WHEN ? = 'succeeded' THEN 1 ELSE progress END,
+                finished_at = ?, updated_at = ?, expires_at = ?
+            WHERE id = ? AND status = 'running'
+            """,
+            (status, None if result is None else encode_payload(result), error, status, now, now,
+             _timestamp(ttl_seconds), job_id),
+        )
+        conn.commit()
+        return cur.rowcount > 0
+
+
+def cancel_job(job_id: str, ttl_seconds: float = 86400) -> Optional[str]:
+    """
+    Cancel a job: queued ones at once, running ones are flagged for their
+    worker pool to stop.
+
+    Returns:
+        'cancelled', 'cancelling', the final status of a finished job, or
+        None if the job is unknown
+    """
+    now = _timestamp()
+    with _connect() as conn:
+        cur = conn.execute(
+            """
+            UPDATE jobs SET status = 'cancelled', finished_at = ?, updated_at = ?, expires_at = ?
+            WHERE id = ? AND status = 'queued'
+            """,
+            (now, now, _timestamp(ttl_seconds), job_id),
+        )
+        if cur.rowcount:
+            conn.commit()
+            return "cancelled"
+        cur = conn.execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'",
+            (job_id,),
+        )
+        conn.commit()
+        if cur.rowcount:
+            return "cancelling"
+        row = conn.execute(
+            "SELECT status FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (job_id, now),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def running_jobs(workers: List[str]) -> List[Dict[str, Any]]:
+    """Running jobs held by the given workers"""
+    if not workers:
+        return []
+    with _connect() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT id, kind, worker, started_at, cancel_requested FROM jobs
+            WHERE status = 'running' AND worker IN ({', '.join('?' * len(workers))})
+            """,
+            workers,
+        ).fetchall()
+    now = datetime.now()
+    return [
+        {"id": r[0], "kind": r[1], "worker": r[2], "elapsed_seconds": (now - datetime.fromisoformat(r[3])).total_seconds(),
+         "cancel_requested": bool(r[4])}
+        for r in rows
+    ]
+
+
+def requeue_jobs(workers: Optional[List[str]] = None, stale_seconds: Optional[float] = None, max_attempts: int = 3, ttl_seconds: float = 86400) -> int:
+    """
+    Put running jobs back in the queue: those of the given workers, or those
+    without a heartbeat for stale_seconds. Jobs flagged for cancellation
+    are cancelled instead, and jobs out of attempts fail.
+
+    Returns:
+        Number of jobs moved
+    """
+    if workers is not None:
+        if not workers:
+            return 0
+        condition = f"worker IN ({', '.join('?' * len(workers))})"
+        args: List[Any] = list(workers)
+    elif stale_seconds is not None:
+        condition = "updated_at < ?"
+        args = [_timestamp(-stale_seconds)]
+    else:
+        return 0
+    now, expires_at = _timestamp(), _timestamp(ttl_seconds)
+    moved = 0
+    with _connect() as conn:
+        for status, error, extra in (
+            ("cancelled", None, "cancel_requested = 1"),
+            ("failed", "Worker lost too many times", f"attempts >= {int(max_attempts)}"),
+        ):
+            moved += conn.execute(
+                f"""
+                UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ?, expires_at = ?
+                WHERE status = 'running' AND {condition} AND {extra}
+                """,
+                [status, error, now, now, expires_at] + args,
+            ).rowcount
+        moved += conn.execute(
+            f"""
+            UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL, progress = NULL, updated_at = ?
+            WHERE status = 'running' AND {condition}
+            """,
+            [now] + args,
+        ).rowcount
+        conn.commit()
+    return moved
+
+
+def delete_expired_jobs(batch_size: int = 500) -> int:
+    """Delete up to batch_size jobs whose results have expired"""
+    with _connect() as conn:
+        cur = conn.execute(
+            """
+            DELETE FROM jobs WHERE id IN (
+                SELECT id FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ? LIMIT ?
+            )
+            """,
+            (_timestamp(), batch_size),
+        )
+        conn.commit()
+        return cur.rowcount
@@ -0,0 +1,57 @@
+"""
+Async Database Access
+Awaitable wrappers around the active database backend for the ASGI server
+
+Both backends (db for SQLite, db_supabase for PostgreSQL) are blocking
+DB-API modules. Each call runs on a bounded thread pool reserved for
+database work, the same model aiosqlite uses, so the event loop never
+blocks on a round-trip and the number of concurrent connections stays
+capped at ASGI_DB_THREADS. Going through the existing modules keeps the
+payload codec, project cache and password upgrade logic in one place.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+DB_THREADS = int(os.getenv('ASGI_DB_THREADS', 8))
+
+
+class AsyncDB:
+    """
+    Async facade over a db module.
+
+    Args:
+        backend: db or db_supabase module
+        threads: maximum concurrent database calls
+    """
+
+    def __init__(self, backend, threads=DB_THREADS):
+        self.backend = backend
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='db')
+
+    async def _call(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    async def save_project(self, constraints, designs, ml_data=None, user_id=None):
+        return await self._call(self.backend.save_project, constraints, designs, ml_data, user_id=user_id)
+
+    async def list_projects(self, limit=50, user_id=None, guest=False):
+        return await self._call(self.backend.list_projects, limit, user_id=user_id, guest=guest)
+
+    async def get_project(self, project_id):
+        return await self._call(self.backend.get_project, project_id)
+
+    async def clear_projects(self, user_id=None, guest=False):
+        return await self._call(self.backend.clear_projects, user_id=user_id, guest=guest)
+
+    async def create_user(self, name, email, password=None):
+        return await self._call(self.backend.create_user, name, email, password)
+
+    async def verify_user(self, email, password):
+        return await self._call(self.backend.verify_user, email, password)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -3,11 +3,17 @@ Supabase PostgreSQL Database Module
 Uses psycopg2 to connect to Supabase PostgreSQL
 """
 import os
+import hmac
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from datetime import datetime
 import json
 
+from migrations import apply_postgres
+from password_hasher import hash_password, verify_password, is_password_hash
+from payload_codec import encode_payload, decode_payload, is_compressed
+from project_cache import project_cache
+
 # Get connection string from environment
 DATABASE_URL = os.getenv('DATABASE_URL')
 
@@ -49,93 +55,67 @@ def get_connection():
 
 
 def initialize_db():
-    """Initialize database tables"""
+    """Initialize database tables by applying pending schema migrations"""
     conn = get_connection()
-    cursor = conn.cursor()
     
     try:
-        # Create users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255),
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password VARCHAR(255),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Add missing columns if they don't exist (for existing tables)
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS name VARCHAR(255)")
-            cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS oauth_provider VARCHAR(50)")
-            cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS oauth_id VARCHAR(255)")
-        except Exception as e:
-            # PostgreSQL versions before 9.6 don't support IF NOT EXISTS in ALTER TABLE
-            # Try without IF NOT EXISTS
-            try:
-                cursor.execute("ALTER TABLE users ADD COLUMN name VARCHAR(255)")
-            except:
-                pass  # Column already exists
-            try:
-                cursor.execute("ALTER TABLE users ADD COLUMN oauth_provider VARCHAR(50)")
-            except:
-                pass  # Column already exists
-            try:
-                cursor.execute("ALTER TABLE users ADD COLUMN oauth_id VARCHAR(255)")
-            except:
-                pass  # Column already exists
-        
-        # Create projects table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS projects (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id),
-                constraints JSONB,
-                designs JSONB,
-                ml_data JSONB,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                guest BOOLEAN DEFAULT FALSE
-            )
-        """)
-        
-        # Create indexes
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_created ON projects(created_at DESC)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_user ON projects(user_id)")
-        
-        conn.commit()
-        print("✓ Supabase PostgreSQL connected and tables initialized")
+        applied = apply_postgres(conn)
+        print(f"✓ Supabase PostgreSQL connected and schema current ({applied} migration(s) applied)")
         
     except Exception as e:
-        conn.rollback()
         print(f"⚠ Database initialization warning: {e}")
     finally:
-        cursor.close()
         conn.close()
 
 
 def save_project(constraints, designs, ml_data=None, user_id=None):
     """Save a project to database"""
-    import json
+    designs_encoded = encode_payload(designs)
+    ml_encoded = encode_payload(ml_data or {})
+    
+    # Compressed payloads go to the BYTEA columns and leave the JSONB ones NULL
+    if is_compressed(designs_encoded):
+        designs_json, designs_z = None, psycopg2.Binary(designs_encoded)
+        ml_json, ml_z = None, psycopg2.Binary(ml_encoded)
+    else:
+        designs_json, designs_z = designs_encoded, None
+        ml_json, ml_z = ml_encoded, None
     
+    # Taken before the INSERT, so a clear_projects committed in between
+    # keeps the write-through put below from re-adding the project
+    epoch = project_cache.epoch()
     conn = get_connection()
     cursor = conn.cursor()
     
     try:
         cursor.execute("""
-            INSERT INTO projects (user_id, constraints, designs, ml_data, guest)
-            VALUES (%s, %s, %s, %s, %s)
-            RETURNING id
+            INSERT INTO projects (user_id, constraints, designs, ml_data, designs_z, ml_data_z, guest)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            RETURNING id, created_at
         """, (
             user_id,
             json.dumps(constraints),
-            json.dumps(designs),
-            json.dumps(ml_data or {}),
+            designs_json,
+            ml_json,
+            designs_z,
+            ml_z,
             user_id is None
         ))
         
-        project_id = cursor.fetchone()[0]
+        project_id, created_at = cursor.fetchone()
         conn.commit()
+        
+        # Write-through: the decoded project is already in hand
+        project_cache.put(project_id, {
+            'id': project_id,
+            '_id': project_id,
+            'user_id': user_id,
+            'constraints': constraints,
+            'designs': designs,
+            'ml_data': ml_data or {},
+            'created_at': created_at,
+            'guest': user_id is None
+        }, epoch=epoch)
         return str(project_id)
         
     except Exception as e:
@@ -147,10 +127,71 @@ def save_project(constraints, designs, ml_data=None, user_id=None):
         conn.close()
 
 
+def save_projects(projects):
+    """Save (constraints, designs, ml_data, user_id) tuples in one transaction"""
+    rows = []
+    for constraints, designs, ml_data, user_id in projects:
+        designs_encoded = encode_payload(designs)
+        ml_encoded = encode_payload(ml_data or {})
+        if is_compressed(designs_encoded):
+            columns = (None, None, psycopg2.Binary(designs_encoded), psycopg2.Binary(ml_encoded))
+        else:
+            columns = (designs_encoded, ml_encoded, None, None)
+        rows.append((user_id, json.dumps(constraints), *columns, user_id is None))
+    
+    epoch = project_cache.epoch()
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # One statement for the whole batch; RETURNING rows follow the VALUES order
+        returned = execute_values(cursor, """
+            INSERT INTO projects (user_id, constraints, designs, ml_data, designs_z, ml_data_z, guest)
+            VALUES %s
+            RETURNING id, created_at
+        """, rows, page_size=len(rows) or 1, fetch=True)
+        conn.commit()
+        
+        project_ids = []
+        for (project_id, created_at), (constraints, designs, ml_data, user_id) in zip(returned, projects):
+            project_cache.put(project_id, {
+                'id': project_id,
+                '_id': project_id,
+                'user_id': user_id,
+                'constraints': constraints,
+                'designs': designs,
+                'ml_data': ml_data or {},
+                'created_at': created_at,
+                'guest': user_id is None
+            }, epoch=epoch)
+            project_ids.append(str(project_id))
+        return project_ids
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error saving projects: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _decode_project(project):
+    """Parse JSON fields in place, preferring compressed columns when set"""
+    designs_z = project.pop('designs_z', None)
+    ml_data_z = project.pop('ml_data_z', None)
+    project['constraints'] = decode_payload(project['constraints'], {})
+    project['designs'] = decode_payload(
+        designs_z if designs_z is not None else project['designs'], []
+    )
+    project['ml_data'] = decode_payload(
+        ml_data_z if ml_data_z is not None else project['ml_data'], {}
+    )
+    return project
+
+
 def list_projects(limit=50, user_id=None, guest=False):
     """List recent projects"""
-    import json
-    
     conn = get_connection()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
     
@@ -182,13 +223,7 @@ def list_projects(limit=50, user_id=None, guest=False):
         for row in rows:
             project = dict(row)
             project['_id'] = project['id']
-            # Parse JSON fields
-            if isinstance(project['constraints'], str):
-                project['constraints'] = json.loads(project['constraints'])
-            if isinstance(project['designs'], str):
-                project['designs'] = json.loads(project['designs'])
-            if isinstance(project['ml_data'], str):
-                project['ml_data'] = json.loads(project['ml_data'])
+            _decode_project(project)
             result.append(project)
         
         return result
@@ -200,8 +235,11 @@ def list_projects(limit=50, user_id=None, guest=False):
 
 def get_project(project_id):
     """Get a specific project by ID"""
-    import json
+    cached = project_cache.get(project_id)
+    if cached is not None:
+        return cached
     
+    epoch = project_cache.epoch()
     conn = get_connection()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
     
@@ -212,13 +250,8 @@ def get_project(project_id):
         if row:
             project = dict(row)
             project['_id'] = project['id']
-            # Parse JSON fields
-            if isinstance(project['constraints'], str):
-                project['constraints'] = json.loads(project['constraints'])
-            if isinstance(project['designs'], str):
-                project['designs'] = json.loads(project['designs'])
-            if isinstance(project['ml_data'], str):
-                project['ml_data'] = json.loads(project['ml_data'])
+            _decode_project(project)
+            project_cache.put(project_id, project, epoch=epoch)
             return project
         
         return None
@@ -243,6 +276,7 @@ def clear_projects(user_id=None, guest=False):
         
         deleted_count = cursor.rowcount
         conn.commit()
+        project_cache.invalidate(user_id=user_id or None, guest=guest)
         return deleted_count
         
     except Exception as e:
@@ -254,8 +288,101 @@ def clear_projects(user_id=None, guest=False):
         conn.close()
 
 
+def delete_project_batch(guest=True, user_id=None, created_before=None, keep_latest=None, batch_size=500):
+    """Delete at most batch_size of the oldest out-of-policy projects in one scope"""
+    scope_sql = "guest = TRUE" if guest else "user_id = %s"
+    scope_args = () if guest else (user_id,)
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        conditions = []
+        args = []
+        if created_before is not None:
+            conditions.append("created_at < %s")
+            args.append(created_before)
+        if keep_latest is not None:
+            cursor.execute(
+                f"SELECT id FROM projects WHERE {scope_sql} ORDER BY id DESC LIMIT 1 OFFSET %s",
+                scope_args + (keep_latest,)
+            )
+            row = cursor.fetchone()
+            if row:
+                conditions.append("id <= %s")
+                args.append(row[0])
+        if not conditions:
+            return []
+        
+        cursor.execute(f"""
+            DELETE FROM projects
+            WHERE id IN (
+                SELECT id FROM projects
+                WHERE {scope_sql} AND ({' OR '.join(conditions)})
+                ORDER BY id
+                LIMIT %s
+            )
+            RETURNING id
+        """, scope_args + tuple(args) + (batch_size,))
+        
+        ids = [r[0] for r in cursor.fetchall()]
+        conn.commit()
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error deleting projects: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    
+    if ids:
+        project_cache.invalidate_ids(ids)
+    return ids
+
+
+def users_over_project_limit(max_rows):
+    """Ids of users holding more than max_rows projects"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT user_id FROM projects
+            WHERE user_id IS NOT NULL
+            GROUP BY user_id
+            HAVING COUNT(*) > %s
+        """, (max_rows,))
+        return [r[0] for r in cursor.fetchall()]
+        
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def database_size():
+    """On-disk size of the projects table including indexes and TOAST"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT pg_total_relation_size('projects')")
+        return {'bytes': cursor.fetchone()[0], 'free_bytes': 0}
+        
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def compact_storage(max_pages=256):
+    """No-op: PostgreSQL autovacuum reclaims space from deleted rows"""
+    return 0
+
+
 def create_user(name, email, password=None, oauth_provider=None, oauth_id=None):
     """Create a new user with optional OAuth credentials"""
+    password_hash = hash_password(password) if password else None
+    
     conn = get_connection()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
     
@@ -264,7 +391,7 @@ def create_user(name, email, password=None, oauth_provider=None, oauth_id=None):
             INSERT INTO users (name, username, password, oauth_provider, oauth_id)
             VALUES (%s, %s, %s, %s, %s)
             RETURNING id, name, username as email
-        """, (name, email, password, oauth_provider, oauth_id))
+        """, (name, email, password_hash, oauth_provider, oauth_id))
         
         user = dict(cursor.fetchone())
         conn.commit()
@@ -289,16 +416,52 @@ def verify_user(email, password):
     
     try:
         cursor.execute("""
-            SELECT id, name, username as email FROM users 
-            WHERE username = %s AND password = %s
-        """, (email, password))
+            SELECT id, name, username as email, password FROM users 
+            WHERE username = %s
+        """, (email,))
         
         user = cursor.fetchone()
         
-        if user:
-            return dict(user)
-        
+    finally:
+        cursor.close()
+        conn.close()
+    
+    if not user or not user['password']:
         return None
+    
+    stored = user['password']
+    if is_password_hash(stored):
+        is_valid, needs_rehash = verify_password(password, stored)
+    else:
+        # Rows written before hashing was introduced hold the plaintext
+        is_valid, needs_rehash = hmac.compare_digest(stored.encode(), password.encode()), True
+    
+    if not is_valid:
+        return None
+    
+    if needs_rehash:
+        # Upgrade to the current hash parameters while we hold the plaintext
+        try:
+            update_password_hash(user['id'], hash_password(password))
+        except Exception as e:
+            print(f"⚠ Password rehash skipped: {e}")
+    
+    return {'id': user['id'], 'name': user['name'], 'email': user['email']}
+
+
+def update_password_hash(user_id, password_hash):
+    """Replace a user's stored password hash"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            UPDATE users
+            SET password = %s
+            WHERE id = %s
+        """, (password_hash, user_id))
+        
+        conn.commit()
         
     finally:
         cursor.close()
@@ -345,3 +508,269 @@ def update_user_oauth(user_id, provider, oauth_id):
     finally:
         cursor.close()
         conn.close()
+
+
+# ==================== JOBS ====================
+
+JOB_COLUMNS = (
+    'id', 'kind', 'status', 'priority', 'user_id', 'params', 'result', 'result_z', 'error', 'progress',
+    'attempts', 'worker', 'cancel_requested', 'created_at', 'started_at', 'updated_at', 'finished_at',
+    'expires_at',
+)
+# Arbitrary key for pg_advisory_xact_lock, serializing claims so per-kind limits hold
+_JOB_CLAIM_LOCK_KEY = 727002
+
+
+def _decode_job(job, include_result=True):
+    """Parse JSON fields in place, preferring the compressed result when set"""
+    result_z = job.pop('result_z', None)
+    result = job.pop('result', None)
+    job['params'] = decode_payload(job['params'], {})
+    if include_result:
+        job['result'] = decode_payload(bytes(result_z) if result_z is not None else result, None)
+    return job
+
+
+def _job_update(sql, args):
+    """Run one job UPDATE and return its row count"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(sql, args)
+        conn.commit()
+        return cursor.rowcount
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error updating jobs: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def create_job(job_id, kind, params, priority=0, user_id=None):
+    """Queue a job"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            INSERT INTO jobs (id, kind, status, priority, user_id, params, updated_at)
+            VALUES (%s, %s, 'queued', %s, %s, %s, NOW())
+            RETURNING created_at
+        """, (job_id, kind, priority, user_id, json.dumps(params)))
+        created_at = cursor.fetchone()[0]
+        conn.commit()
+        return {'id': job_id, 'kind': kind, 'status': 'queued', 'priority': priority, 'created_at': created_at}
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error creating job: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def count_jobs(status='queued'):
+    """Number of jobs in a status"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT COUNT(*) FROM jobs WHERE status = %s", (status,))
+        return cursor.fetchone()[0]
+        
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def get_job(job_id, include_result=True):
+    """A job unless it is unknown or its result has expired"""
+    conn = get_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    
+    try:
+        cursor.execute(f"""
+            SELECT {', '.join(JOB_COLUMNS)} FROM jobs
+            WHERE id = %s AND (expires_at IS NULL OR expires_at > NOW())
+        """, (job_id,))
+        row = cursor.fetchone()
+        return _decode_job(dict(row), include_result) if row else None
+        
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def claim_job(worker, limits):
+    """Move the highest-priority queued job of a kind under its limit to running"""
+    conn = get_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    
+    try:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (_JOB_CLAIM_LOCK_KEY,))
+        cursor.execute("SELECT kind, COUNT(*) AS running FROM jobs WHERE status = 'running' GROUP BY kind")
+        running = {r['kind']: r['running'] for r in cursor.fetchall()}
+        kinds = [kind for kind, limit in limits.items() if limit is None or running.get(kind, 0) < limit]
+        row = None
+        if kinds:
+            cursor.execute(f"""
+                UPDATE jobs
+                SET status = 'running', worker = %s, started_at = NOW(), updated_at = NOW(), progress = 0,
+                    attempts = attempts + 1
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE status = 'queued' AND kind = ANY(%s)
+                    ORDER BY priority DESC, created_at, id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {', '.join(JOB_COLUMNS)}
+            """, (worker, kinds))
+            row = cursor.fetchone()
+        conn.commit()
+        return _decode_job(dict(row)) if row else None
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error claiming job: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def update_job_progress(job_id, progress):
+    """Record progress (0-1); also serves as the running job's heartbeat"""
+    _job_update(
+        "UPDATE jobs SET progress = %s, updated_at = NOW() WHERE id = %s AND status = 'running'",
+        (progress, job_id)
+    )
+
+
+def finish_job(job_id, status, result=None, error=None, ttl_seconds=86400):
+    """Settle a running job; False if it was no longer running"""
+    encoded = None if result is None else encode_payload(result)
+    if encoded is not None and is_compressed(encoded):
+        result_json, result_z = None, psycopg2.Binary(encoded)
+    else:
+        result_json, result_z = encoded, None
+    return _job_update("""
+        UPDATE jobs
+        SET status = %s, result = %s, result_z = %s, error = %s,
+            progress = CASE WHEN %s = 'succeeded' THEN 1 ELSE progress END,
+            finished_at = NOW(), updated_at = NOW(), expires_at = NOW() + %s * INTERVAL '1 second'
+        WHERE id = %s AND status = 'running'
+    """, (status, result_json, result_z, error, status, ttl_seconds, job_id)) > 0
+
+
+def cancel_job(job_id, ttl_seconds=86400):
+    """Cancel queued jobs at once and flag running ones; see db.cancel_job"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            UPDATE jobs SET status = 'cancelled', finished_at = NOW(), updated_at = NOW(),
+                expires_at = NOW() + %s * INTERVAL '1 second'
+            WHERE id = %s AND status = 'queued'
+        """, (ttl_seconds, job_id))
+        if cursor.rowcount:
+            conn.commit()
+            return 'cancelled'
+        cursor.execute(
+            "UPDATE jobs SET cancel_requested = TRUE WHERE id = %s AND status = 'running'", (job_id,)
+        )
+        conn.commit()
+        if cursor.rowcount:
+            return 'cancelling'
+        cursor.execute(
+            "SELECT status FROM jobs WHERE id = %s AND (expires_at IS NULL OR expires_at > NOW())", (job_id,)
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error cancelling job: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def running_jobs(workers):
+    """Running jobs held by the given workers"""
+    if not workers:
+        return []
+    conn = get_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    
+    try:
+        cursor.execute("""
+            SELECT id, kind, worker, EXTRACT(EPOCH FROM NOW() - started_at) AS elapsed_seconds, cancel_requested
+            FROM jobs
+            WHERE status = 'running' AND worker = ANY(%s)
+        """, (list(workers),))
+        # EXTRACT returns a Decimal
+        return [dict(r, elapsed_seconds=float(r['elapsed_seconds'])) for r in cursor.fetchall()]
+        
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def requeue_jobs(workers=None, stale_seconds=None, max_attempts=3, ttl_seconds=86400):
+    """Put running jobs of lost workers back in the queue; see db.requeue_jobs"""
+    if workers is not None:
+        if not workers:
+            return 0
+        condition, args = "worker = ANY(%s)", (list(workers),)
+    elif stale_seconds is not None:
+        condition, args = "updated_at < NOW() - %s * INTERVAL '1 second'", (stale_seconds,)
+    else:
+        return 0
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        moved = 0
+        for status, error, extra in (
+            ('cancelled', None, "cancel_requested"),
+            ('failed', 'Worker lost too many times', f"attempts >= {int(max_attempts)}"),
+        ):
+            cursor.execute(f"""
+                UPDATE jobs SET status = %s, error = %s, finished_at = NOW(), updated_at = NOW(),
+                    expires_at = NOW() + %s * INTERVAL '1 second'
+                WHERE status = 'running' AND {condition} AND {extra}
+            """, (status, error, ttl_seconds) + args)
+            moved += cursor.rowcount
+        cursor.execute(f"""
+            UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL, progress = NULL, updated_at = NOW()
+            WHERE status = 'running' AND {condition}
+        """, args)
+        moved += cursor.rowcount
+        conn.commit()
+        return moved
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error requeueing jobs: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def delete_expired_jobs(batch_size=500):
+    """Delete up to batch_size jobs whose results have expired"""
+    return _job_update("""
+        DELETE FROM jobs WHERE id IN (
+            SELECT id FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= NOW() LIMIT %s
+        )
+    """, (batch_size,))
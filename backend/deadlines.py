@@ -0,0 +1,201 @@
+"""
+Request Deadlines
+A time budget per request, and optional pipeline stages that give way
+when it runs short
+
+Every API request gets a deadline: the X-Request-Deadline-Ms header
+(milliseconds the client is willing to wait, capped at REQUEST_DEADLINE_MAX_MS)
+or REQUEST_DEADLINE_MS. It is measured from the moment the request reached
+Flask, so time spent queued by admission control counts against it.
+
+Required work (validation, generation, evaluation) always runs. Optional
+stages (ML cost prediction, ML ranking, recommendations, Monte Carlo
+intervals, persistence) go through Deadline.run, which keeps a moving
+estimate of each stage's duration. When the remaining budget cannot cover
+the estimate, the stage is served from its last result for the same inputs
+if there is one, and otherwise skipped. A stage that raises or returns None
+falls back the same way. Each fallback ({stage, reason: skipped|failed,
+cached}) is listed in the response body ("degraded") and the
+X-Degraded-Stages header, and such responses are never marked cacheable.
+
+Stages are not interrupted once started; the estimates keep a slow stage
+from being started once it no longer fits. Such a stage is still tried once
+every DEADLINE_PROBE_SECONDS so that a recovered dependency is noticed.
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, has_request_context, request
+
+HEADER = 'X-Request-Deadline-Ms'
+DEFAULT_MS = float(os.getenv('REQUEST_DEADLINE_MS', 2000))
+MAX_MS = float(os.getenv('REQUEST_DEADLINE_MAX_MS', 10000))
+# Kept back for encoding and sending the response
+RESERVE_MS = float(os.getenv('REQUEST_DEADLINE_RESERVE_MS', 5))
+CACHE_SIZE = int(os.getenv('DEADLINE_CACHE_SIZE', 1024))
+# A stage that does not fit still runs once per interval, so its estimate
+# recovers after the slowdown ends
+PROBE_SECONDS = float(os.getenv('DEADLINE_PROBE_SECONDS', 5))
+
+# Weight of the latest run in a stage's estimate
+ALPHA = 0.2
+
+_lock = threading.Lock()
+_estimates = {}
+_last_run = {}
+_results = OrderedDict()
+
+
+def _remember(name, key, value):
+    with _lock:
+        _results[(name, key)] = value
+        _results.move_to_end((name, key))
+        while len(_results) > CACHE_SIZE:
+            _results.popitem(last=False)
+
+
+def _recall(name, key):
+    with _lock:
+        value = _results.get((name, key))
+    # Copies, so one response can never alter another's
+    return copy.deepcopy(value)
+
+
+def estimate_ms(name):
+    """Recent duration of a stage in milliseconds (0 until it has run)"""
+    return _estimates.get(name, 0.0) * 1000
+
+
+def observe(name, seconds):
+    """Fold one run of a stage into its estimate"""
+    with _lock:
+        _last_run[name] = time.monotonic()
+        previous = _estimates.get(name)
+        _estimates[name] = seconds if previous is None else previous + ALPHA * (seconds - previous)
+
+
+class Deadline:
+    """
+    Time budget of one request.
+
+    Args:
+        budget_ms: milliseconds from start; None means unbounded
+        start: perf_counter() the budget counts from (default now)
+    """
+
+    __slots__ = ('expires', 'degraded')
+
+    def __init__(self, budget_ms=None, start=None):
+        start = time.perf_counter() if start is None else start
+        self.expires = None if budget_ms is None else start + budget_ms / 1000
+        self.degraded = []
+
+    @classmethod
+    def from_header(cls, value, start=None):
+        """Deadline for a header value, falling back to REQUEST_DEADLINE_MS"""
+        try:
+            budget_ms = float(value) if value else DEFAULT_MS
+        except ValueError:
+            budget_ms = DEFAULT_MS
+        return cls(min(max(budget_ms, 0.0), MAX_MS), start)
+
+    def remaining_ms(self):
+        if self.expires is None:
+            return float('inf')
+        return (self.expires - time.perf_counter()) * 1000
+
+    def degrade(self, name, reason, cached=False):
+        self.degraded.append({'stage': name, 'reason': reason, 'cached': cached})
+
+    def allows(self, name):
+        """Whether stage name is expected to finish in time (or is due a probe)"""
+        spare_ms = self.remaining_ms() - RESERVE_MS
+        if spare_ms >= estimate_ms(name):
+            return True
+        with _lock:
+            if spare_ms > 0 and time.monotonic() - _last_run.get(name, 0.0) >= PROBE_SECONDS:
+                # Claimed here so concurrent requests do not all probe at once
+                _last_run[name] = time.monotonic()
+                return True
+        return False
+
+    def run(self, name, compute, *args, key=None, fallback=None):
+        """
+        Run an optional stage within the budget.
+
+        Args:
+            name: stage name for estimates and the degraded list
+            compute: callable; raising or returning None counts as a failure
+            key: hashable inputs of the stage; enables serving its last result
+            fallback: value when the stage neither runs nor has a cached result
+
+        Returns:
+            The stage result, its cached result, or fallback
+        """
+        if self.allows(name):
+            start = time.perf_counter()
+            try:
+                value = compute(*args)
+            except Exception:
+                # The stage's own instrumentation counts and logs the error
+                value = None
+            observe(name, time.perf_counter() - start)
+            if value is not None:
+                if key is not None:
+                    _remember(name, key, value)
+                return value
+            reason = 'failed'
+        else:
+            reason = 'skipped'
+
+        cached = _recall(name, key) if key is not None else None
+        if cached is not None:
+            self.degrade(name, reason, cached=True)
+            return cached
+        self.degrade(name, reason)
+        return fallback
+
+
+def current():
+    """Deadline of the current request, or an unbounded one outside requests"""
+    if has_request_context() and 'deadline' in g:
+        return g.deadline
+    return Deadline()
+
+
+def _before_request():
+    g.deadline = Deadline.from_header(request.headers.get(HEADER), g.get('request_start'))
+
+
+def degraded_header(degraded):
+    """X-Degraded-Stages value, e.g. 'ml_rank;skipped;cached, save_project;skipped'"""
+    return ', '.join(
+        f"{entry['stage']};{entry['reason']}" + (';cached' if entry['cached'] else '') for entry in degraded
+    )
+
+
+def _after_request(response):
+    deadline = g.get('deadline')
+    if deadline is not None and deadline.degraded:
+        response.headers['X-Degraded-Stages'] = degraded_header(deadline.degraded)
+        # A partial result must not be reused as the full one
+        response.headers.pop('ETag', None)
+        response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def stats():
+    """Stage estimates for /api/metrics"""
+    with _lock:
+        return {f'estimate_ms_{name}': round(seconds * 1000, 3) for name, seconds in _estimates.items()}
+
+
+def init_deadlines(app):
+    """Give every request a deadline and report degraded stages"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    return app
@@ -3,6 +3,20 @@ Sustainability Evaluation Module
 Calculates sustainability metrics and impact scores
 """
 
+# Inputs of each evaluate() metric: constraint fields, design fields
+# (generator.FIELD_INPUTS) or other metrics. incremental.py recomputes a
+# metric only when one of these changes.
+METRIC_INPUTS = {
+    'energyEfficiency': ('area', 'budget', 'climate', 'priority'),
+    'waterEfficiency': ('area', 'budget', 'climate', 'priority'),
+    'materialsEfficiency': ('budget', 'priority'),
+    'carbonFootprint': ('energyEfficiency', 'budget', 'estimated_embodied_carbon'),
+    'sustainabilityIndex': ('energyEfficiency', 'waterEfficiency', 'materialsEfficiency', 'priority'),
+    'estimatedCost': ('area', 'budget'),
+    'payback_period_years': ('energyEfficiency', 'budget'),
+    'lifecycle_analysis': ('estimated_embodied_carbon', 'area', 'energyEfficiency'),
+}
+
 
 class SustainabilityEvaluator:
     """
@@ -63,6 +77,40 @@ class SustainabilityEvaluator:
             }
         }
     
+    def evaluate_metric(self, name, design, constraints, metrics):
+        """
+        One entry of evaluate(), reusing the metrics it depends on
+        
+        Args:
+            name: key of METRIC_INPUTS
+            design: design fields (id, flags, estimated_embodied_carbon)
+            constraints: User constraints
+            metrics: already evaluated metrics this one depends on
+        """
+        if name == 'energyEfficiency':
+            return self._evaluate_energy(design, constraints)
+        if name == 'waterEfficiency':
+            return self._evaluate_water(design, constraints)
+        if name == 'materialsEfficiency':
+            return self._evaluate_materials(design, constraints)
+        if name == 'carbonFootprint':
+            return self._evaluate_carbon(design, constraints)
+        if name == 'sustainabilityIndex':
+            return self._calculate_sustainability_index(
+                metrics['energyEfficiency'], metrics['waterEfficiency'],
+                metrics['materialsEfficiency'], constraints['priority']
+            )
+        if name == 'estimatedCost':
+            return self._estimate_cost(constraints['area'], constraints['budget'])
+        if name == 'payback_period_years':
+            return self._estimate_payback(metrics['energyEfficiency'], constraints['budget'])
+        if name == 'lifecycle_analysis':
+            return {
+                'embodied': design.get('estimated_embodied_carbon', 0),
+                'operational': self._estimate_operational_carbon(constraints['area'], metrics['energyEfficiency'])
+            }
+        raise KeyError(name)
+    
     def _evaluate_energy(self, design, constraints):
         """
         Calculate energy efficiency score (0-100)
@@ -299,11 +347,12 @@ class SustainabilityEvaluator:
             designs: List of design objects with metrics
         
         Returns:
-            List of ranked designs with ranking information
+            New list of ranked design copies with ranking information;
+            the designs passed in are left untouched
         """
         # Sort by sustainability index (descending)
         ranked = sorted(
-            designs,
+            (dict(design) for design in designs),
             key=lambda d: d.get('metrics', {}).get('sustainabilityIndex', 0),
             reverse=True
         )
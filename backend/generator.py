@@ -3,6 +3,120 @@ Design Generation Module
 Simulates Generative AI output for sustainable design alternatives
 """
 
+# Fields every design of a template shares. The description is a format
+# string filled from description_args(), so compact responses can send the
+# arguments and let clients render it from /api/templates.
+DESIGN_TEMPLATES = {
+    'design-a': {
+        'template': 'eco-efficient',
+        'name': 'Eco-Efficient Design',
+        'description': "A {area} sq ft sustainable design optimized for energy efficiency. "
+                       "Features passive solar design, high-performance insulation, and integrated renewable "
+                       "energy infrastructure. Ideal for {climate} climates with focus on long-term operational sustainability.",
+        'color': 'from-green-600 to-green-400',
+        'icon': '🌱',
+        'design_approach': 'Performance-first passive systems',
+    },
+    'design-b': {
+        'template': 'carbon-optimized',
+        'name': 'Carbon-Optimized Design',
+        'description': "A climate-responsive design emphasizing {emphasis}. "
+                       "Leverages local materials, modular construction, and adaptive systems to minimize embodied "
+                       "and operational carbon. Suitable for projects with environmental impact as primary metric.",
+        'color': 'from-blue-600 to-blue-400',
+        'icon': '♻️',
+        'design_approach': 'Circular economy with material transparency',
+    },
+    'design-c': {
+        'template': 'regenerative',
+        'name': 'Regenerative Design',
+        'description': "A holistic design that goes beyond sustainability to create positive environmental impact. "
+                       "Integrates water management, biodiversity support, and community resilience. "
+                       "Combines traditional ecological wisdom with modern sustainable principles.",
+        'color': 'from-emerald-600 to-teal-400',
+        'icon': '🌿',
+        'design_approach': 'Net-positive environmental systems',
+    },
+}
+
+# Template fields copied verbatim into each design
+STATIC_TEMPLATE_FIELDS = ('name', 'color', 'icon', 'design_approach')
+
+# Constraint-dependent fields of each design and the constraint fields each
+# one actually reads (several helpers take arguments they ignore).
+# incremental.py recomputes a field only when one of these changes;
+# benchmarks/bench_incremental.py checks them against full generation.
+FIELD_INPUTS = {
+    'design-a': {
+        'description': ('area', 'climate'),
+        'materials': ('budget', 'climate'),
+        'keyFeatures': ('budget',),
+        'strategies': ('climate', 'priority'),
+        'estimated_embodied_carbon': ('area', 'budget'),
+    },
+    'design-b': {
+        'description': ('priority',),
+        'materials': ('budget',),
+        'keyFeatures': (),
+        'strategies': ('priority',),
+        'estimated_embodied_carbon': ('area', 'budget'),
+    },
+    'design-c': {
+        'description': (),
+        'materials': ('budget',),
+        'keyFeatures': ('area',),
+        'strategies': (),
+        'estimated_embodied_carbon': ('area', 'budget'),
+    },
+}
+
+# Helper computing each list field, and the constraint fields it is called with
+FIELD_HELPERS = {
+    'design-a': {
+        'materials': ('_select_materials_eco', ('budget', 'climate')),
+        'keyFeatures': ('_get_features_eco', ('area', 'budget', 'climate')),
+        'strategies': ('_get_strategies_eco', ('climate', 'priority')),
+    },
+    'design-b': {
+        'materials': ('_select_materials_carbon', ('budget', 'climate')),
+        'keyFeatures': ('_get_features_carbon', ('area', 'budget', 'climate')),
+        'strategies': ('_get_strategies_carbon', ('climate', 'priority')),
+    },
+    'design-c': {
+        'materials': ('_select_materials_regenerative', ('budget',)),
+        'keyFeatures': ('_get_features_regenerative', ('area', 'budget', 'climate')),
+        'strategies': ('_get_strategies_regenerative', ('climate', 'priority')),
+    },
+}
+
+# Boolean traits of each design (the evaluator reads renewable_ready)
+DESIGN_FLAGS = {
+    'design-a': {'renewable_ready': True},
+    'design-b': {'modular_design': True},
+    'design-c': {'biodiversity_positive': True},
+}
+
+# Share of the budget level that reduces each design's embodied carbon
+EMBODIED_BUDGET_FACTOR = {'design-a': 1.0, 'design-b': 0.8, 'design-c': 0.9}
+
+
+def description_args(design_id, constraints):
+    """Values substituted into a template's description"""
+    if design_id == 'design-a':
+        return {'area': constraints['area'], 'climate': constraints['climate']}
+    if design_id == 'design-b':
+        emphasis = 'material selection' if constraints['priority'] == 'materials' else 'lifecycle carbon reduction'
+        return {'emphasis': emphasis}
+    return {}
+
+
+def template_fields(design_id, constraints):
+    """Static template fields plus the rendered description"""
+    template = DESIGN_TEMPLATES[design_id]
+    fields = {name: template[name] for name in STATIC_TEMPLATE_FIELDS}
+    fields['description'] = template['description'].format(**description_args(design_id, constraints))
+    return fields
+
 
 class DesignGenerator:
     """
@@ -62,6 +176,18 @@ class DesignGenerator:
         designs.append(self._generate_regenerative(constraints))
         
         return designs
+
+    def generate_field(self, design_id, field, constraints):
+        """One FIELD_INPUTS field of one design, exactly as generate() builds it"""
+        if field == 'description':
+            template = DESIGN_TEMPLATES[design_id]['description']
+            return template.format(**description_args(design_id, constraints))
+        if field == 'estimated_embodied_carbon':
+            return self._estimate_embodied_carbon(
+                constraints['area'], constraints['budget'] * EMBODIED_BUDGET_FACTOR[design_id]
+            )
+        method, args = FIELD_HELPERS[design_id][field]
+        return getattr(self, method)(*(constraints[arg] for arg in args))
     
     def _generate_eco_efficient(self, constraints):
         """Generate eco-efficient design alternative"""
@@ -76,18 +202,14 @@ class DesignGenerator:
         
         return {
             'id': 'design-a',
-            'name': 'Eco-Efficient Design',
-            'description': f"A {area} sq ft sustainable design optimized for energy efficiency. "
-                          f"Features passive solar design, high-performance insulation, and integrated renewable "
-                          f"energy infrastructure. Ideal for {climate} climates with focus on long-term operational sustainability.",
+            **template_fields('design-a', constraints),
             'materials': materials,
             'keyFeatures': features,
             'strategies': strategies,
-            'color': 'from-green-600 to-green-400',
-            'icon': '🌱',
-            'design_approach': 'Performance-first passive systems',
-            'estimated_embodied_carbon': self._estimate_embodied_carbon(area, budget),
-            'renewable_ready': True
+            'estimated_embodied_carbon': self._estimate_embodied_carbon(
+                area, budget * EMBODIED_BUDGET_FACTOR['design-a']
+            ),
+            **DESIGN_FLAGS['design-a']
         }
     
     def _generate_carbon_optimized(self, constraints):
@@ -103,19 +225,14 @@ class DesignGenerator:
         
         return {
             'id': 'design-b',
-            'name': 'Carbon-Optimized Design',
-            'description': f"A climate-responsive design emphasizing "
-                          f"{'material selection' if priority == 'materials' else 'lifecycle carbon reduction'}. "
-                          f"Leverages local materials, modular construction, and adaptive systems to minimize embodied "
-                          f"and operational carbon. Suitable for projects with environmental impact as primary metric.",
+            **template_fields('design-b', constraints),
             'materials': materials,
             'keyFeatures': features,
             'strategies': strategies,
-            'color': 'from-blue-600 to-blue-400',
-            'icon': '♻️',
-            'design_approach': 'Circular economy with material transparency',
-            'estimated_embodied_carbon': self._estimate_embodied_carbon(area, budget * 0.8),
-            'modular_design': True
+            'estimated_embodied_carbon': self._estimate_embodied_carbon(
+                area, budget * EMBODIED_BUDGET_FACTOR['design-b']
+            ),
+            **DESIGN_FLAGS['design-b']
         }
     
     def _generate_regenerative(self, constraints):
@@ -131,18 +248,14 @@ class DesignGenerator:
         
         return {
             'id': 'design-c',
-            'name': 'Regenerative Design',
-            'description': f"A holistic design that goes beyond sustainability to create positive environmental impact. "
-                          f"Integrates water management, biodiversity support, and community resilience. "
-                          f"Combines traditional ecological wisdom with modern sustainable principles.",
+            **template_fields('design-c', constraints),
             'materials': materials,
             'keyFeatures': features,
             'strategies': strategies,
-            'color': 'from-emerald-600 to-teal-400',
-            'icon': '🌿',
-            'design_approach': 'Net-positive environmental systems',
-            'estimated_embodied_carbon': self._estimate_embodied_carbon(area, budget * 0.9),
-            'biodiversity_positive': True
+            'estimated_embodied_carbon': self._estimate_embodied_carbon(
+                area, budget * EMBODIED_BUDGET_FACTOR['design-c']
+            ),
+            **DESIGN_FLAGS['design-c']
         }
     
     # ==================== MATERIAL SELECTION ====================
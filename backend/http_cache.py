@@ -0,0 +1,139 @@
+"""
+HTTP Conditional Caching
+ETags and Cache-Control for endpoints that are pure functions of
+their input and the model version
+
+The ETag is a hash of the route, the canonical JSON of the input and the
+model fingerprint, so it is known before anything is computed: a matching
+If-None-Match returns 304 straight away.
+
+Each of these endpoints also answers GET on the same path, so browsers and
+caching proxies (which never cache POST) can absorb repeats:
+
+    GET /api/ml/cost-prediction?area=1200&budget=60&climate=hot&priority=energy
+    GET /api/comparison/rankings?input=<base64url(zlib(canonical JSON))>
+
+Scalar inputs may be plain query parameters; structured ones go in the
+"input" parameter. POST responses carry the canonical GET URL in
+Content-Location.
+"""
+
+import base64
+import hashlib
+import inspect
+import json
+import os
+import zlib
+from urllib.parse import urlencode
+
+from flask import jsonify, request, Response
+from werkzeug.exceptions import BadRequest
+
+MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', 300))
+METADATA_MAX_AGE = int(os.getenv('HTTP_CACHE_METADATA_MAX_AGE', 3600))
+# Query strings longer than this are not advertised as canonical URLs
+MAX_URL_INPUT = 6000
+
+
+def source_version(*objects):
+    """Hash of the source files defining the given classes or modules"""
+    digest = hashlib.sha256()
+    for obj in objects:
+        with open(inspect.getsourcefile(obj), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def canonical_json(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def encode_input(value):
+    """Query-string form of a structured input"""
+    packed = zlib.compress(canonical_json(value).encode('utf-8'), 9)
+    return base64.urlsafe_b64encode(packed).rstrip(b'=').decode('ascii')
+
+
+def decode_input(text):
+    padded = text + '=' * (-len(text) % 4)
+    try:
+        return json.loads(zlib.decompress(base64.urlsafe_b64decode(padded)))
+    except (ValueError, zlib.error) as e:
+        raise BadRequest(f"Invalid input parameter: {e}")
+
+
+def coerce(text):
+    """int, float or the text itself, for a query parameter value"""
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def request_input():
+    """The computation input: JSON body for POST, query string for GET"""
+    if request.method != 'GET':
+        return request.json
+    if 'input' in request.args:
+        return decode_input(request.args['input'])
+    return {key: coerce(value) for key, value in request.args.items()}
+
+
+def etag_for(route, value, model_version):
+    digest = hashlib.sha256()
+    digest.update(route.encode())
+    digest.update(b'\0')
+    digest.update(canonical_json(value).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(model_version.encode())
+    return digest.hexdigest()[:32]
+
+
+def _canonical_url(value):
+    if not isinstance(value, dict):
+        return None
+    if value and all(isinstance(v, (int, float, str)) and not isinstance(v, bool) for v in value.values()):
+        query = urlencode(sorted(value.items()))
+    else:
+        query = f"input={encode_input(value)}"
+    if len(query) > MAX_URL_INPUT:
+        return None
+    return f"{request.path}?{query}" if query else request.path
+
+
+def conditional(value, model_version, compute, max_age=MAX_AGE, weak=False):
+    """
+    Serve a deterministic computation with an ETag.
+
+    Args:
+        value: canonical input (already decoded from body or query)
+        model_version: fingerprint of the models the result depends on
+        compute: callable returning (body, status); only run on a miss
+        max_age: Cache-Control max-age for successful responses
+        weak: use a weak ETag, for bodies that are equivalent but not
+            byte-identical between runs (e.g. carry a timestamp)
+    """
+    etag = etag_for(request.path, value, model_version)
+
+    # If-None-Match always uses the weak comparison (RFC 7232 3.2)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        body, status = compute()
+        response = body if isinstance(body, Response) else jsonify(body)
+        response.status_code = status
+        if status != 200:
+            return response
+
+    response.set_etag(etag, weak=weak)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if request.method != 'GET':
+        location = _canonical_url(value)
+        if location:
+            response.headers['Content-Location'] = location
+    return response
@@ -0,0 +1,241 @@
+"""
+Incremental Re-evaluation
+Update a /api/designs/generate result for a constraint change by
+recomputing only the outputs the change can affect
+
+Every constraint-dependent output is a node of a static dependency graph:
+the generator fields of each design (generator.FIELD_INPUTS), each
+evaluator metric (evaluator.METRIC_INPUTS), the ML cost prediction per
+design, the ML ranking and the recommendation. Nodes are addressed by their
+JSON path in the response, so the previous result itself carries every
+node's old value and no server-side state is needed.
+
+A node is recomputed only when one of its inputs changed, and its
+dependents only when its value actually differs: a budget nudge from 55 to
+56 crosses no threshold and recomputes a handful of nodes without changing
+any of them. The result is an RFC 6902 JSON Patch against the previous
+result; applying it gives exactly what a full regeneration would return
+(apart from generated_at and project_id), which
+benchmarks/bench_incremental.py verifies along slider-drag traces.
+"""
+
+from collections import namedtuple
+from functools import partial
+
+from evaluator import METRIC_INPUTS
+from generator import DESIGN_TEMPLATES, FIELD_INPUTS
+from instrumentation import stage
+from pipeline import build_generation, constraint_engine, design_generator, evaluator
+
+CONSTRAINT_FIELDS = ('area', 'budget', 'climate', 'priority')
+DESIGN_IDS = tuple(DESIGN_TEMPLATES)
+# Metrics the ML ranker reads
+RANKING_METRICS = ('energyEfficiency', 'waterEfficiency', 'carbonFootprint')
+
+# Marks an output that is absent (build_generation omits a falsy ML cost)
+MISSING = object()
+
+Node = namedtuple('Node', ['path', 'pointer', 'inputs', 'compute', 'ml'])
+
+
+# ==================== NODE FUNCTIONS ====================
+
+class _State:
+    """Node values: recomputed ones, falling back to the previous result"""
+
+    def __init__(self, previous, constraints, m):
+        self.previous = previous
+        self.constraints = constraints
+        self.m = m
+        self.updates = {}
+
+    def get(self, path):
+        if path in self.updates:
+            return self.updates[path]
+        return lookup(self.previous, path)
+
+    def design(self, index):
+        design = dict(self.previous['designs'][index])
+        design['estimated_embodied_carbon'] = self.get(('designs', index, 'estimated_embodied_carbon'))
+        return design
+
+    def metrics(self, index, names):
+        return {name: self.get(('designs', index, 'metrics', name)) for name in names if name in METRIC_INPUTS}
+
+
+def _generate(design_id, field, state):
+    return design_generator.generate_field(design_id, field, state.constraints)
+
+
+def _evaluate(index, metric, state):
+    return evaluator.evaluate_metric(
+        metric, state.design(index), state.constraints, state.metrics(index, METRIC_INPUTS[metric])
+    )
+
+
+def _predict(index, state):
+    c = state.constraints
+    predicted = state.m.cost_predictor.predict(c['area'], c['budget'], c['climate'], c['priority'], index)
+    return predicted if predicted else MISSING
+
+
+def _rank(state):
+    designs = [
+        {'id': design_id, 'metrics': state.metrics(index, RANKING_METRICS)}
+        for index, design_id in enumerate(DESIGN_IDS)
+    ]
+    ranked = state.m.design_ranker.rank_designs(designs, state.constraints)
+    return [{'id': d.get('id'), 'ml_score': round(score, 2)} for d, score in ranked]
+
+
+def _recommend(state):
+    return state.m.design_recommender.recommend_design(state.constraints)
+
+
+# ==================== GRAPH ====================
+
+def _node(path, inputs, compute, ml=False):
+    return Node(path, '/' + '/'.join(str(part) for part in path), tuple(inputs), compute, ml)
+
+
+def _build_graph():
+    """Nodes in dependency order"""
+    nodes = []
+    for index, design_id in enumerate(DESIGN_IDS):
+        fields = FIELD_INPUTS[design_id]
+
+        def resolve(name, index=index, fields=fields):
+            if name in CONSTRAINT_FIELDS:
+                return name
+            if name in fields:
+                return ('designs', index, name)
+            return ('designs', index, 'metrics', name)
+
+        for field, inputs in fields.items():
+            nodes.append(_node(('designs', index, field), inputs, partial(_generate, design_id, field)))
+        for metric, inputs in METRIC_INPUTS.items():
+            nodes.append(_node(('designs', index, 'metrics', metric), map(resolve, inputs),
+                               partial(_evaluate, index, metric)))
+        # SimpleCostPredictor ignores the priority
+        nodes.append(_node(('designs', index, 'ml_predicted_cost'), ('area', 'budget', 'climate'),
+                           partial(_predict, index), ml=True))
+
+    ranking_inputs = [('designs', index, 'metrics', metric)
+                      for index in range(len(DESIGN_IDS)) for metric in RANKING_METRICS]
+    nodes.append(_node(('ml_rankings',), ranking_inputs + ['priority'], _rank, ml=True))
+    # Recommendations depend only on the priority (SimpleDesignRecommender)
+    nodes.append(_node(('recommendations',), ('priority',), _recommend, ml=True))
+
+    known = set(CONSTRAINT_FIELDS)
+    for node in nodes:
+        assert known.issuperset(node.inputs), f'{node.pointer} depends on a later or unknown node'
+        known.add(node.path)
+    return nodes
+
+
+GRAPH = _build_graph()
+
+
+# ==================== PATCHES ====================
+
+def lookup(document, path):
+    """Value at a path tuple, or MISSING if the last key is absent"""
+    *parents, last = path
+    for part in parents:
+        document = document[part]
+    if isinstance(document, dict):
+        return document.get(last, MISSING)
+    return document[last]
+
+
+def _op(pointer, old, new):
+    if new is MISSING:
+        return {'op': 'remove', 'path': pointer}
+    return {'op': 'add' if old is MISSING else 'replace', 'path': pointer, 'value': new}
+
+
+def _parse_pointer(pointer):
+    parts = pointer.split('/')[1:]
+    return [part.replace('~1', '/').replace('~0', '~') for part in parts]
+
+
+def apply_patch(document, patch):
+    """Apply add/replace/remove operations in place; returns the document"""
+    for operation in patch:
+        parts = _parse_pointer(operation['path'])
+        if not parts:
+            document = operation['value']
+            continue
+        target = document
+        for part in parts[:-1]:
+            target = target[int(part)] if isinstance(target, list) else target[part]
+        last = int(parts[-1]) if isinstance(target, list) else parts[-1]
+        if operation['op'] == 'remove':
+            del target[last]
+        else:
+            target[last] = operation['value']
+    return document
+
+
+# ==================== ENTRY POINT ====================
+
+def _usable(previous, m, model_version):
+    """Whether previous is a full generation result this graph can patch"""
+    if not isinstance(previous, dict) or (model_version is not None and model_version != m.version):
+        return False
+    designs = previous.get('designs')
+    if not isinstance(designs, list) or [d.get('id') if isinstance(d, dict) else None for d in designs] != list(DESIGN_IDS):
+        return False
+    is_valid, _ = constraint_engine.validate(previous.get('constraints') or {})
+    if not is_valid:
+        return False
+    try:
+        for node in GRAPH:
+            if not node.ml or m.ready:
+                lookup(previous, node.path)
+    except (KeyError, IndexError, TypeError):
+        return False
+    return True
+
+
+def update(previous, constraints, m, model_version=None):
+    """
+    Patch a previous generation result for new constraints.
+
+    Args:
+        previous: earlier /api/designs/generate result (or a patched one)
+        constraints: validated new constraints
+        m: ModelSet the previous result was computed with
+        model_version: version the previous result was computed with, if
+            known; a different one forces a full regeneration
+
+    Returns:
+        Dict with the JSON Patch and recomputed/total node counts. When
+        previous cannot be patched the patch replaces the whole document.
+    """
+    if not _usable(previous, m, model_version):
+        with stage('generate'):
+            recommendation = m.design_recommender.recommend_design(constraints) if m.ready else None
+            full = build_generation(constraints, m, recommendation)
+        return {'patch': [{'op': 'replace', 'path': '', 'value': full}], 'recomputed': len(GRAPH),
+                'nodes': len(GRAPH), 'full': True}
+
+    old_constraints = previous['constraints']
+    dirty = {field for field in CONSTRAINT_FIELDS if old_constraints.get(field) != constraints[field]}
+    patch = [_op(f'/constraints/{field}', old_constraints.get(field, MISSING), constraints[field])
+             for field in CONSTRAINT_FIELDS if field in dirty]
+
+    state = _State(previous, constraints, m)
+    recomputed = 0
+    for node in GRAPH:
+        if (node.ml and not m.ready) or dirty.isdisjoint(node.inputs):
+            continue
+        recomputed += 1
+        value = node.compute(state)
+        old = lookup(previous, node.path)
+        if value != old:
+            state.updates[node.path] = value
+            dirty.add(node.path)
+            patch.append(_op(node.pointer, old, value))
+
+    return {'patch': patch, 'recomputed': recomputed, 'nodes': len(GRAPH), 'full': False}
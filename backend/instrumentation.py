@@ -0,0 +1,251 @@
+"""
+Request Instrumentation
+Per-route and per-stage latency histograms, per-route response sizes,
+Server-Timing headers and counters for failures that the pipeline
+deliberately swallows
+
+Usage inside a route:
+
+    with stage('ml_cost', swallow=True):
+        ...  # exceptions are counted, logged once and suppressed
+
+init_instrumentation(app) installs the request hooks and serves the
+Prometheus text format on /api/metrics. Histograms are per worker process;
+scrape each worker (the pid label tells them apart) or sum them downstream.
+
+Set REQUEST_TRACE_FILE to append every API request (auth routes excluded)
+as a JSON line that benchmarks/loadgen.py can replay.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+
+# Upper bounds in seconds; +Inf is implicit
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Upper bounds in bytes for response sizes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)"""
+
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+_lock = threading.Lock()
+_route_histograms = {}
+_stage_histograms = {}
+_size_histograms = {}
+_stage_failures = {}
+_status_counts = {}
+# Extra gauges/counters contributed by other modules: name -> callable
+_collectors = {}
+
+TRACE_FILE = os.getenv('REQUEST_TRACE_FILE')
+_TRACE_EXCLUDED_PREFIXES = ('/api/auth', '/api/metrics')
+_trace_lock = threading.Lock()
+_trace_handle = None
+
+
+def _observe(table, key, value, buckets=BUCKETS):
+    with _lock:
+        hist = table.get(key)
+        if hist is None:
+            hist = table[key] = Histogram(buckets)
+        hist.observe(value)
+
+
+def record_failure(name, error=None):
+    """Count a swallowed failure for a stage"""
+    with _lock:
+        count = _stage_failures[name] = _stage_failures.get(name, 0) + 1
+    if count == 1:
+        print(f"⚠ Stage '{name}' failed (further failures are only counted): {error}")
+    if has_request_context():
+        g.setdefault('stage_failures', []).append(name)
+
+
+class stage:
+    """
+    Time a pipeline stage.
+
+    Args:
+        name: stage label used in metrics and the Server-Timing header
+        swallow: count and suppress exceptions instead of propagating them
+    """
+
+    __slots__ = ('name', 'swallow', 'start', 'failed')
+
+    def __init__(self, name, swallow=False):
+        self.name = name
+        self.swallow = swallow
+        self.failed = False
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        _observe(_stage_histograms, self.name, elapsed)
+        if has_request_context():
+            g.setdefault('stage_timings', []).append((self.name, elapsed))
+        if exc_type is not None:
+            self.failed = True
+            record_failure(self.name, exc)
+            return self.swallow
+        return False
+
+
+def register_collector(name, collect):
+    """
+    Add values to /api/metrics.
+
+    collect() returns a flat dict of metric suffix -> number, exported as
+    sustainable_<name>_<suffix>.
+    """
+    _collectors[name] = collect
+
+
+def record_request(route, method, status, seconds, size=None):
+    """Count a finished request (used directly by servers that bypass Flask)"""
+    _observe(_route_histograms, (route, method), seconds)
+    if size is not None:
+        _observe(_size_histograms, (route, method), size, SIZE_BUCKETS)
+    with _lock:
+        key = (route, method, status)
+        _status_counts[key] = _status_counts.get(key, 0) + 1
+
+
+def _before_request():
+    g.request_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    size = None if response.is_streamed else response.content_length
+    record_request(route, request.method, response.status_code, elapsed, size)
+
+    # Stages that run once per design are summed into one entry
+    timings = {}
+    for name, seconds in g.get('stage_timings', []):
+        timings[name] = timings.get(name, 0.0) + seconds
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    parts.append(f"total;dur={elapsed * 1000:.2f}")
+    response.headers['Server-Timing'] = ', '.join(parts)
+
+    if TRACE_FILE and request.path.startswith('/api/') and not request.path.startswith(_TRACE_EXCLUDED_PREFIXES):
+        _write_trace(response.status_code)
+    return response
+
+
+def _write_trace(status):
+    global _trace_handle
+    line = json.dumps({
+        'ts': time.time(),
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'body': request.get_json(silent=True),
+        'status': status,
+    })
+    with _trace_lock:
+        if _trace_handle is None:
+            _trace_handle = open(TRACE_FILE, 'a', buffering=1)
+        _trace_handle.write(line + '\n')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _render_histogram(lines, metric, labels, hist):
+    cumulative = 0
+    for bound, count in zip(hist.buckets, hist.counts):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    cumulative += hist.counts[-1]
+    lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {cumulative}')
+    lines.append(f'{metric}_sum{{{labels}}} {hist.total:.6f}')
+    lines.append(f'{metric}_count{{{labels}}} {hist.count}')
+
+
+def render_metrics():
+    """Prometheus text exposition of everything recorded in this process"""
+    pid = os.getpid()
+    lines = []
+    with _lock:
+        routes = list(_route_histograms.items())
+        stages = list(_stage_histograms.items())
+        sizes = list(_size_histograms.items())
+        failures = list(_stage_failures.items())
+        statuses = list(_status_counts.items())
+
+    lines.append('# TYPE sustainable_http_request_duration_seconds histogram')
+    for (route, method), hist in sorted(routes):
+        labels = f'pid="{pid}",route="{_escape(route)}",method="{method}"'
+        _render_histogram(lines, 'sustainable_http_request_duration_seconds', labels, hist)
+
+    lines.append('# TYPE sustainable_http_response_size_bytes histogram')
+    for (route, method), hist in sorted(sizes):
+        labels = f'pid="{pid}",route="{_escape(route)}",method="{method}"'
+        _render_histogram(lines, 'sustainable_http_response_size_bytes', labels, hist)
+
+    lines.append('# TYPE sustainable_http_responses_total counter')
+    for (route, method, status), count in sorted(statuses):
+        lines.append(
+            f'sustainable_http_responses_total{{pid="{pid}",route="{_escape(route)}",'
+            f'method="{method}",status="{status}"}} {count}'
+        )
+
+    lines.append('# TYPE sustainable_stage_duration_seconds histogram')
+    for name, hist in sorted(stages):
+        _render_histogram(lines, 'sustainable_stage_duration_seconds', f'pid="{pid}",stage="{_escape(name)}"', hist)
+
+    lines.append('# TYPE sustainable_stage_failures_total counter')
+    for name, count in sorted(failures):
+        lines.append(f'sustainable_stage_failures_total{{pid="{pid}",stage="{_escape(name)}"}} {count}')
+
+    for name, collect in sorted(_collectors.items()):
+        try:
+            values = collect()
+        except Exception:
+            continue
+        for suffix, value in sorted(values.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            lines.append(f'sustainable_{name}_{suffix}{{pid="{pid}"}} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def init_instrumentation(app):
+    """Install timing hooks and the /api/metrics endpoint"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus metrics for this worker"""
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    return app
@@ -0,0 +1,487 @@
+"""
+Background Jobs
+Durable queue and local worker pool for analyses too heavy for a request
+
+    POST   /api/jobs            {"kind": "sweep", "params": {...}, "priority": 0}
+                                -> 202 {"job_id": ..., "status": "queued", ...}
+    GET    /api/jobs/<job_id>   status, progress and, once succeeded, result
+    DELETE /api/jobs/<job_id>   cancel
+
+Kinds (KINDS):
+    sweep         rule-based metrics over a grid of constraints, with the
+                  Pareto frontier of two objectives
+    monte_carlo   /api/analysis/uncertainty payload
+    lifecycle     /api/analysis/lifecycle payload
+    portfolio     /api/portfolio/optimize payload
+    batch_score   {"items": [constraints, ...]} scored like batch_score.py
+
+Jobs live in the jobs table of the project database (SQLite or
+PostgreSQL), so they survive restarts. The web workers only insert and read
+rows. The work itself runs in a separate local process pool:
+
+    python jobs.py --workers 2
+
+The supervisor forks JOB_WORKERS processes. Each claims the
+highest-priority queued job whose kind is under its JOB_KIND_LIMITS, runs it
+and stores the result with a JOB_RESULT_TTL_SECONDS expiry. Cancelling a
+running job, or running past JOB_TIMEOUT_SECONDS, terminates the process
+holding it, which is then replaced. Jobs of a crashed worker go back to
+the queue, up to JOB_MAX_ATTEMPTS runs.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import secrets
+import signal
+import socket
+import time
+from collections import namedtuple
+
+from pipeline import constraint_engine, preview_metrics, train_models
+import batch_score
+import lifecycle
+import portfolio
+import uncertainty
+
+WORKERS = int(os.getenv('JOB_WORKERS', 2))
+POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 0.5))
+TIMEOUT_SECONDS = float(os.getenv('JOB_TIMEOUT_SECONDS', 900))
+RESULT_TTL_SECONDS = float(os.getenv('JOB_RESULT_TTL_SECONDS', 86400))
+MAX_QUEUED = int(os.getenv('JOB_MAX_QUEUED', 1000))
+MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+# Running jobs not heard from for this long belong to a lost supervisor
+STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', TIMEOUT_SECONDS + 60))
+CLEANUP_SECONDS = 60.0
+PROGRESS_INTERVAL = 1.0
+PRIORITY_RANGE = (-100, 100)
+
+SWEEP_MAX_POINTS = int(os.getenv('JOB_SWEEP_MAX_POINTS', 20000))
+BATCH_MAX_ITEMS = int(os.getenv('JOB_BATCH_MAX_ITEMS', 100000))
+BATCH_CHUNK_SIZE = 500
+
+# Most jobs of each kind running at once across the pool; None: no limit
+DEFAULT_KIND_LIMITS = {'sweep': 2, 'monte_carlo': 2, 'lifecycle': 2, 'portfolio': 1, 'batch_score': 1}
+
+JobKind = namedtuple('JobKind', ['validate', 'run', 'needs_models'])
+
+
+class JobError(Exception):
+    """A job that cannot complete for a reason worth showing its submitter"""
+
+
+# ==================== KINDS ====================
+
+SWEEP_FIELDS = ('area', 'budget', 'climate', 'priority')
+# Objective -> (metric path, direction)
+OBJECTIVES = {
+    'estimatedCost': (('estimatedCost',), 'min'),
+    'sustainabilityIndex': (('sustainabilityIndex',), 'max'),
+    'energyEfficiency': (('energyEfficiency',), 'max'),
+    'payback_period_years': (('payback_period_years',), 'min'),
+    'operational_carbon': (('lifecycle_analysis', 'operational'), 'min'),
+}
+DEFAULT_OBJECTIVES = ['estimatedCost', 'sustainabilityIndex']
+
+
+def _axis(value):
+    """Values of one sweep axis: a list, a scalar, or {start, stop, step}"""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        start, stop, step = value.get('start'), value.get('stop'), value.get('step', 1)
+        if not all(isinstance(v, int) and not isinstance(v, bool) for v in (start, stop, step)) or step <= 0:
+            return None
+        # Left lazy, so an oversized range is rejected without being built
+        return range(start, stop + 1, step)
+    return value if isinstance(value, list) else [value]
+
+
+def _sweep_axes(params):
+    errors = []
+    axes = {}
+    for field in SWEEP_FIELDS:
+        values = _axis(params.get(field))
+        if not values:
+            errors.append(f'{field} must be a value, a non-empty list or {{start, stop, step}}')
+        axes[field] = values
+    if errors:
+        return None, errors
+
+    points = 1
+    for values in axes.values():
+        points *= len(values)
+    if points > SWEEP_MAX_POINTS:
+        return None, [f'The sweep has {points} points; at most {SWEEP_MAX_POINTS} are allowed']
+
+    # Constraint rules are per field: each value is checked against an
+    # otherwise valid set, so every error belongs to the value being varied
+    base = {
+        'area': constraint_engine.AREA_MIN,
+        'budget': constraint_engine.BUDGET_MIN,
+        'climate': constraint_engine.VALID_CLIMATES[0],
+        'priority': constraint_engine.VALID_PRIORITIES[0],
+    }
+    for field, values in axes.items():
+        for value in values:
+            is_valid, field_errors = constraint_engine.validate(dict(base, **{field: value}))
+            if not is_valid:
+                errors.extend(f'{field}={value!r}: {e}' for e in field_errors)
+
+    objectives = params.get('objectives', DEFAULT_OBJECTIVES)
+    if (not isinstance(objectives, list) or len(objectives) != 2 or len(set(objectives)) != 2
+            or any(o not in OBJECTIVES for o in objectives)):
+        errors.append(f'objectives must be two of: {", ".join(OBJECTIVES)}')
+    return axes, errors
+
+
+def _validate_sweep(params):
+    return _sweep_axes(params)[1]
+
+
+def _objective(metrics, name):
+    path, direction = OBJECTIVES[name]
+    value = metrics
+    for key in path:
+        value = value[key]
+    # Both objectives minimized internally
+    return value if direction == 'min' else -value
+
+
+def pareto_front(candidates):
+    """Candidates (a, b, payload) not dominated when minimizing both a and b"""
+    front = []
+    best_b = float('inf')
+    for a, b, payload in sorted(candidates, key=lambda c: (c[0], c[1])):
+        if b < best_b:
+            front.append(payload)
+            best_b = b
+    return front
+
+
+def _run_sweep(params, m, progress):
+    axes, _ = _sweep_axes(params)
+    objectives = params.get('objectives', DEFAULT_OBJECTIVES)
+    points = list(itertools.product(*(axes[field] for field in SWEEP_FIELDS)))
+    candidates = []
+    rows = [] if params.get('include_points') else None
+    for number, values in enumerate(points):
+        constraints = dict(zip(SWEEP_FIELDS, values))
+        for design in preview_metrics(constraints):
+            entry = {'constraints': constraints, 'design_id': design['id'], 'metrics': design['metrics']}
+            candidates.append((_objective(design['metrics'], objectives[0]),
+                               _objective(design['metrics'], objectives[1]), entry))
+            if rows is not None:
+                rows.append(entry)
+        progress((number + 1) / len(points))
+    result = {
+        'points': len(points),
+        'candidates': len(candidates),
+        'objectives': {name: OBJECTIVES[name][1] for name in objectives},
+        'pareto_front': pareto_front(candidates),
+    }
+    if rows is not None:
+        result['rows'] = rows
+    return result
+
+
+def _validate_monte_carlo(params):
+    is_valid, errors = constraint_engine.validate(params)
+    return (errors if not is_valid else []) + uncertainty.parse_params(params)[1]
+
+
+def _run_monte_carlo(params, m, progress):
+    return uncertainty.analyze(params, m.cost_predictor, uncertainty.parse_params(params)[0])
+
+
+def _validate_lifecycle(params):
+    is_valid, errors = constraint_engine.validate(params)
+    return (errors if not is_valid else []) + lifecycle.parse_params(params)[1]
+
+
+def _run_lifecycle(params, m, progress):
+    return lifecycle.analyze(params, lifecycle.parse_params(params)[0])
+
+
+def _validate_portfolio(params):
+    return portfolio.parse_request(params)[1]
+
+
+def _run_portfolio(params, m, progress):
+    result, status = portfolio.optimize(portfolio.parse_request(params)[0])
+    if status != 200:
+        raise JobError(result.get('error', f'Optimization failed ({status})'))
+    return result
+
+
+def _validate_batch_score(params):
+    items = params.get('items')
+    if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+        return ['items must be a non-empty list of constraint objects']
+    if len(items) > BATCH_MAX_ITEMS:
+        return [f'At most {BATCH_MAX_ITEMS} items per job']
+    return []
+
+
+def _run_batch_score(params, m, progress):
+    items = list(enumerate(params['items']))
+    rows, invalid = [], 0
+    for start in range(0, len(items), BATCH_CHUNK_SIZE):
+        chunk_rows, chunk_invalid = batch_score.score_items(items[start:start + BATCH_CHUNK_SIZE], m)
+        rows.extend(chunk_rows)
+        invalid += chunk_invalid
+        progress(min(1.0, (start + BATCH_CHUNK_SIZE) / len(items)))
+    return {'items': len(items), 'invalid': invalid, 'columns': batch_score.COLUMN_NAMES, 'rows': rows}
+
+
+KINDS = {
+    'sweep': JobKind(_validate_sweep, _run_sweep, False),
+    'monte_carlo': JobKind(_validate_monte_carlo, _run_monte_carlo, True),
+    'lifecycle': JobKind(_validate_lifecycle, _run_lifecycle, False),
+    'portfolio': JobKind(_validate_portfolio, _run_portfolio, False),
+    'batch_score': JobKind(_validate_batch_score, _run_batch_score, True),
+}
+
+
+def _kind_limits():
+    limits = {kind: DEFAULT_KIND_LIMITS.get(kind) for kind in KINDS}
+    overrides = os.getenv('JOB_KIND_LIMITS')
+    if overrides:
+        limits.update({kind: limit for kind, limit in json.loads(overrides).items() if kind in KINDS})
+    return limits
+
+
+KIND_LIMITS = _kind_limits()
+
+
+# ==================== WEB SIDE ====================
+
+def submit(backend, data, user_id=None):
+    """
+    Validate and queue a job.
+
+    Args:
+        user_id: the authenticated submitter, if any (never taken from data)
+
+    Returns:
+        (response dict, status code)
+    """
+    if not isinstance(data, dict):
+        return {'error': 'Expected a JSON object'}, 400
+    kind = data.get('kind')
+    if kind not in KINDS:
+        return {'error': f'kind must be one of: {", ".join(KINDS)}'}, 400
+    params = data.get('params', {})
+    priority = data.get('priority', 0)
+    if not isinstance(params, dict):
+        return {'error': 'params must be an object'}, 400
+    if isinstance(priority, bool) or not isinstance(priority, int) or not PRIORITY_RANGE[0] <= priority <= PRIORITY_RANGE[1]:
+        return {'error': f'priority must be an integer between {PRIORITY_RANGE[0]} and {PRIORITY_RANGE[1]}'}, 400
+
+    errors = KINDS[kind].validate(params)
+    if errors:
+        return {'error': 'Invalid params', 'errors': errors}, 400
+    if backend.count_jobs('queued') >= MAX_QUEUED:
+        return {'error': 'Job queue is full, retry later'}, 503
+
+    job = backend.create_job(secrets.token_urlsafe(16), kind, params, priority=priority, user_id=user_id)
+    return {
+        'job_id': job['id'],
+        'kind': kind,
+        'status': job['status'],
+        'priority': priority,
+        'created_at': job['created_at'],
+        'status_url': f"/api/jobs/{job['id']}",
+    }, 202
+
+
+def public_view(job):
+    """What GET /api/jobs/<job_id> returns"""
+    status = job['status']
+    if status == 'running' and job['cancel_requested']:
+        status = 'cancelling'
+    view = {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': status,
+        'priority': job['priority'],
+        'progress': job['progress'],
+        'attempts': job['attempts'],
+    }
+    for field in ('created_at', 'started_at', 'finished_at', 'expires_at'):
+        view[field] = job[field]
+    if job['error']:
+        view['error'] = job['error']
+    if job['status'] == 'succeeded':
+        view['result'] = job.get('result')
+    return view
+
+
+# ==================== WORKERS ====================
+
+_backend = None
+_models = None
+
+
+def _select_backend():
+    if os.getenv('DATABASE_URL'):
+        import db_supabase as backend
+    else:
+        import db as backend
+    return backend
+
+
+def run_job(backend, job, m):
+    """Run one claimed job and store its outcome"""
+    kind = KINDS[job['kind']]
+    last_report = [time.monotonic()]
+
+    def progress(fraction):
+        now = time.monotonic()
+        if now - last_report[0] >= PROGRESS_INTERVAL:
+            last_report[0] = now
+            backend.update_job_progress(job['id'], round(fraction, 4))
+
+    start = time.perf_counter()
+    try:
+        result = kind.run(job['params'], m, progress)
+    except JobError as e:
+        backend.finish_job(job['id'], 'failed', error=str(e), ttl_seconds=RESULT_TTL_SECONDS)
+        return 'failed'
+    except Exception as e:
+        print(f"⚠ Job {job['id']} ({job['kind']}) failed: {e}")
+        backend.finish_job(job['id'], 'failed', error=f'{type(e).__name__}: {e}', ttl_seconds=RESULT_TTL_SECONDS)
+        return 'failed'
+    backend.finish_job(job['id'], 'succeeded', result=result, ttl_seconds=RESULT_TTL_SECONDS)
+    print(f"✓ Job {job['id']} ({job['kind']}) done in {time.perf_counter() - start:.1f}s")
+    return 'succeeded'
+
+
+def _worker_main(worker_id):
+    """Claim and run jobs until terminated"""
+    global _models
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    backend = _backend or _select_backend()
+    while True:
+        job = backend.claim_job(worker_id, KIND_LIMITS)
+        if job is None:
+            time.sleep(POLL_SECONDS)
+            continue
+        if KINDS[job['kind']].needs_models and _models is None:
+            # Only reached with the spawn start method; forked workers inherit the models
+            _models = train_models()
+        run_job(backend, job, _models)
+
+
+class WorkerPool:
+    """Supervisor of the local worker processes"""
+
+    def __init__(self, backend, workers=WORKERS):
+        self.backend = backend
+        self.size = workers
+        self.processes = {}
+        self.stopping = False
+        self._spawned = 0
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+
+    def _spawn(self):
+        self._spawned += 1
+        worker_id = f"{self._prefix}:{self._spawned}"
+        process = self._context.Process(target=_worker_main, args=(worker_id,), name=f'job-worker-{self._spawned}',
+                                        daemon=True)
+        process.start()
+        self.processes[worker_id] = process
+
+    def _stop(self, worker_id):
+        process = self.processes.pop(worker_id)
+        process.terminate()
+        process.join(5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def check(self):
+        """Replace dead workers and stop cancelled or overdue jobs"""
+        for worker_id, process in list(self.processes.items()):
+            if not process.is_alive():
+                process.join()
+                del self.processes[worker_id]
+                moved = self.backend.requeue_jobs(workers=[worker_id], max_attempts=MAX_ATTEMPTS,
+                                                  ttl_seconds=RESULT_TTL_SECONDS)
+                print(f"⚠ Job worker {worker_id} exited ({process.exitcode}); {moved} job(s) released")
+
+        for job in self.backend.running_jobs(list(self.processes)):
+            overdue = job['elapsed_seconds'] > TIMEOUT_SECONDS
+            if not (job['cancel_requested'] or overdue):
+                continue
+            self._stop(job['worker'])
+            if job['cancel_requested']:
+                self.backend.finish_job(job['id'], 'cancelled', ttl_seconds=RESULT_TTL_SECONDS)
+                print(f"✓ Job {job['id']} cancelled")
+            else:
+                self.backend.finish_job(job['id'], 'failed', error=f'Timed out after {TIMEOUT_SECONDS:.0f}s',
+                                        ttl_seconds=RESULT_TTL_SECONDS)
+                print(f"⚠ Job {job['id']} ({job['kind']}) timed out")
+
+        while len(self.processes) < self.size and not self.stopping:
+            self._spawn()
+
+    def housekeeping(self):
+        """Expire old results and recover jobs of lost supervisors"""
+        self.backend.requeue_jobs(stale_seconds=STALE_SECONDS, max_attempts=MAX_ATTEMPTS,
+                                  ttl_seconds=RESULT_TTL_SECONDS)
+        while self.backend.delete_expired_jobs() > 0:
+            pass
+
+    def shutdown(self):
+        """Stop every worker and put their jobs back in the queue"""
+        self.stopping = True
+        workers = list(self.processes)
+        for worker_id in workers:
+            self._stop(worker_id)
+        self.backend.requeue_jobs(workers=workers, max_attempts=MAX_ATTEMPTS + 1, ttl_seconds=RESULT_TTL_SECONDS)
+
+    def run(self):
+        def stop(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        print(f"✓ Job worker pool: {self.size} worker(s), limits {KIND_LIMITS}")
+        last_cleanup = 0.0
+        try:
+            while not self.stopping:
+                if time.monotonic() - last_cleanup >= CLEANUP_SECONDS:
+                    self.housekeeping()
+                    last_cleanup = time.monotonic()
+                self.check()
+                time.sleep(POLL_SECONDS)
+        finally:
+            self.shutdown()
+            print("✓ Job worker pool stopped")
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Run the background job worker pool')
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    global _backend, _models
+    _backend = _select_backend()
+    _backend.initialize_db()
+    if any(kind.needs_models for kind in KINDS.values()):
+        # Trained once here; forked workers share the pages
+        _models = train_models()
+    WorkerPool(_backend, args.workers).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+JSON Provider
+Pluggable encoder behind jsonify and the ASGI server
+
+JSON_ENCODER selects the backend:
+    auto    orjson when installed, otherwise the standard library (default)
+    orjson  require orjson
+    std     Flask's default json.dumps path
+
+Both backends produce sorted keys with compact separators and format dates
+the way Flask does; orjson writes non-ASCII characters as raw UTF-8 instead
+of ASCII escapes. Serialization time is recorded as the "serialize" stage of
+each request.
+"""
+
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+from instrumentation import stage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENCODER = os.getenv('JSON_ENCODER', 'auto').lower()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with an optional orjson fast path"""
+
+    use_orjson = orjson is not None and ENCODER in ('auto', 'orjson')
+
+    def dumps_bytes(self, obj):
+        """Compact, key-sorted UTF-8 JSON"""
+        with stage('serialize'):
+            if self.use_orjson:
+                return orjson.dumps(
+                    obj,
+                    default=self.default,
+                    option=(orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+                            | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS),
+                )
+            return super().dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        # orjson covers the compact, sorted form; anything else (indent,
+        # custom separators) goes through the standard encoder
+        if (self.use_orjson and set(kwargs) <= {'separators', 'sort_keys'}
+                and kwargs.get('sort_keys', True) and kwargs.get('separators', (',', ':')) == (',', ':')):
+            return self.dumps_bytes(obj).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self._app.debug:
+            return super().response(obj)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Install the provider on the app"""
+    if ENCODER == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_ENCODER=orjson but orjson is not installed')
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
+    print(f"✓ JSON encoder: {'orjson' if FastJSONProvider.use_orjson else 'standard library'}")
+    return app
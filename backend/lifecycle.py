@@ -0,0 +1,268 @@
+"""
+Lifecycle Simulation
+Year-by-year cumulative carbon and cash flow over a 30-60 year horizon,
+for many designs under several scenarios at once
+
+Built on the evaluator outputs of each design (lifecycle_analysis.embodied
+is kg CO2e per sq ft, lifecycle_analysis.operational kg CO2e per year,
+estimatedCost and payback_period_years). For year t = 1..years:
+
+    operational_t  = operational * (1 + degradation)^(t-1) * grid_t
+    grid_t         = max(grid_floor, (1 - grid_decarbonization)^(t-1))
+    carbon(t)      = embodied * area + sum of operational_1..t
+
+    investment     = estimatedCost * green_premium
+    savings_t      = investment / payback
+                     * ((1 + energy_price_escalation) * (1 - degradation))^(t-1)
+    cash_flow(t)   = -investment + sum of savings_k / (1 + discount_rate)^k
+
+so with no degradation, escalation or discounting the cash flow crosses zero
+at the evaluator's simple payback.
+
+Both series are a per-design scalar times a per-scenario yearly factor, so
+the yearly factors are built once per scenario (scenarios x years) and the
+designs x scenarios x years result is a single outer product: cost is
+linear in designs * scenarios * years with no per-year Python loop. Without
+numpy the same factors are built in pure Python.
+"""
+
+import os
+from itertools import accumulate
+
+from evaluator import SustainabilityEvaluator
+from generator import DESIGN_TEMPLATES, DesignGenerator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_YEARS = int(os.getenv('LIFECYCLE_YEARS', 30))
+MAX_YEARS = int(os.getenv('LIFECYCLE_MAX_YEARS', 60))
+MAX_SCENARIOS = int(os.getenv('LIFECYCLE_MAX_SCENARIOS', 8))
+DEFAULT_GREEN_PREMIUM = float(os.getenv('LIFECYCLE_GREEN_PREMIUM', 0.08))
+
+# Parameter: (low, high) accepted for custom scenarios
+SCENARIO_FIELDS = {
+    'grid_decarbonization': (0, 0.5),
+    'grid_floor': (0, 1),
+    'degradation': (0, 0.1),
+    'discount_rate': (0, 0.2),
+    'energy_price_escalation': (-0.1, 0.2),
+}
+SCENARIOS = {
+    'static_grid': {'grid_decarbonization': 0.0, 'grid_floor': 1.0, 'degradation': 0.005,
+                    'discount_rate': 0.03, 'energy_price_escalation': 0.02},
+    'stated_policies': {'grid_decarbonization': 0.03, 'grid_floor': 0.3, 'degradation': 0.005,
+                        'discount_rate': 0.03, 'energy_price_escalation': 0.02},
+    'net_zero_2050': {'grid_decarbonization': 0.12, 'grid_floor': 0.05, 'degradation': 0.005,
+                      'discount_rate': 0.03, 'energy_price_escalation': 0.02},
+}
+DEFAULT_SCENARIOS = tuple(SCENARIOS)
+# Custom scenarios start from this preset
+BASE_SCENARIO = 'stated_policies'
+
+UNITS = {
+    'cumulative_carbon': 'kg CO2e',
+    'cumulative_cash_flow': 'USD, discounted',
+    'discounted_payback_year': 'year (null if beyond the horizon)',
+}
+
+_evaluator = SustainabilityEvaluator()
+_generator = DesignGenerator()
+
+
+def _scenario(spec, errors):
+    if isinstance(spec, str):
+        if spec not in SCENARIOS:
+            errors.append(f'unknown scenario {spec!r}; presets are {", ".join(SCENARIOS)}')
+            return None
+        return dict(SCENARIOS[spec], name=spec)
+    if not isinstance(spec, dict) or not isinstance(spec.get('name'), str):
+        errors.append('custom scenarios must be objects with a "name"')
+        return None
+    base = spec.get('base', BASE_SCENARIO)
+    if base not in SCENARIOS:
+        errors.append(f'unknown base scenario {base!r}')
+        return None
+    scenario = dict(SCENARIOS[base], name=spec['name'])
+    for field, (low, high) in SCENARIO_FIELDS.items():
+        if field not in spec:
+            continue
+        value = spec[field]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+            errors.append(f'{spec["name"]}: {field} must be a number between {low} and {high}')
+            return None
+        scenario[field] = float(value)
+    return scenario
+
+
+def parse_params(data):
+    """
+    Simulation parameters from a request payload.
+
+    Returns:
+        (params dict, errors list)
+    """
+    errors = []
+    years = data.get('years', DEFAULT_YEARS)
+    if isinstance(years, bool) or not isinstance(years, int) or not 1 <= years <= MAX_YEARS:
+        errors.append(f'years must be an integer between 1 and {MAX_YEARS}')
+
+    specs = data.get('scenarios', list(DEFAULT_SCENARIOS))
+    scenarios = []
+    if not isinstance(specs, list) or not 1 <= len(specs) <= MAX_SCENARIOS:
+        errors.append(f'scenarios must be a list of 1 to {MAX_SCENARIOS} preset names or objects')
+    else:
+        scenarios = [s for s in (_scenario(spec, errors) for spec in specs) if s is not None]
+        names = [s['name'] for s in scenarios]
+        if len(set(names)) != len(names):
+            errors.append('scenario names must be unique')
+
+    premium = data.get('green_premium', DEFAULT_GREEN_PREMIUM)
+    if isinstance(premium, bool) or not isinstance(premium, (int, float)) or not 0 < premium <= 1:
+        errors.append('green_premium must be a number between 0 and 1')
+
+    design_ids = data.get('design_ids')
+    if design_ids is not None and (not isinstance(design_ids, list)
+                                   or any(not isinstance(d, str) or d not in DESIGN_TEMPLATES for d in design_ids)):
+        errors.append(f'design_ids must be a list drawn from {", ".join(DESIGN_TEMPLATES)}')
+
+    return {'years': years, 'scenarios': scenarios, 'green_premium': premium,
+            'design_ids': design_ids}, errors
+
+
+# ==================== YEARLY FACTORS ====================
+
+def _factors_numpy(scenarios, years):
+    """(carbon, cash) cumulative yearly factors, each scenarios x years"""
+    column = {field: np.array([[s[field]] for s in scenarios]) for field in SCENARIO_FIELDS}
+    t = np.arange(years)
+    degradation = (1 + column['degradation']) ** t
+    grid = np.maximum((1 - column['grid_decarbonization']) ** t, column['grid_floor'])
+    growth = ((1 + column['energy_price_escalation']) * (1 - column['degradation'])) ** t
+    discount = (1 + column['discount_rate']) ** -(t + 1.0)
+    return np.cumsum(degradation * grid, axis=1), np.cumsum(growth * discount, axis=1)
+
+
+def _factors_python(scenarios, years):
+    carbon, cash = [], []
+    for s in scenarios:
+        carbon.append(list(accumulate(
+            (1 + s['degradation']) ** t * max(s['grid_floor'], (1 - s['grid_decarbonization']) ** t)
+            for t in range(years)
+        )))
+        cash.append(list(accumulate(
+            ((1 + s['energy_price_escalation']) * (1 - s['degradation'])) ** t
+            / (1 + s['discount_rate']) ** (t + 1)
+            for t in range(years)
+        )))
+    return carbon, cash
+
+
+# ==================== SIMULATION ====================
+
+def design_inputs(area, metrics, green_premium=DEFAULT_GREEN_PREMIUM):
+    """
+    Per-design simulation inputs from an evaluator result.
+
+    Returns:
+        (embodied kg CO2e, operational kg CO2e/year, investment USD,
+        first-year savings USD)
+    """
+    lifecycle = metrics.get('lifecycle_analysis') or {}
+    investment = metrics['estimatedCost'] * green_premium
+    payback = metrics.get('payback_period_years') or 0
+    return (
+        float(lifecycle.get('embodied', 0)) * area,
+        float(lifecycle.get('operational', 0)),
+        float(investment),
+        investment / payback if payback > 0 else 0.0,
+    )
+
+
+def simulate(inputs, scenarios, years):
+    """
+    Cumulative carbon and cash flow for every design under every scenario.
+
+    Args:
+        inputs: list of design_inputs tuples (or a designs x 4 array)
+        scenarios: scenario dicts (see SCENARIOS)
+        years: horizon
+
+    Returns:
+        Dict of designs x scenarios x years arrays (numpy arrays, or nested
+        lists without numpy) plus discounted_payback_year, designs x scenarios
+    """
+    if np is None:
+        return _simulate_python(inputs, scenarios, years)
+
+    embodied, operational, investment, savings = np.asarray(inputs, dtype=float).reshape(-1, 4).T
+    carbon_factor, cash_factor = _factors_numpy(scenarios, years)
+    carbon = embodied[:, None, None] + operational[:, None, None] * carbon_factor
+    cash = savings[:, None, None] * cash_factor - investment[:, None, None]
+
+    # Cash flow turns positive once cash_factor reaches investment / savings
+    with np.errstate(divide='ignore', invalid='ignore'):
+        threshold = np.where(savings > 0, investment / savings, np.inf)
+    crossing = np.stack([np.searchsorted(factor, threshold) for factor in cash_factor], axis=1)
+    payback = np.where(crossing < years, crossing + 1, 0)
+    return {'cumulative_carbon': carbon, 'cumulative_cash_flow': cash, 'discounted_payback_year': payback}
+
+
+def _simulate_python(inputs, scenarios, years):
+    carbon_factors, cash_factors = _factors_python(scenarios, years)
+    carbon, cash, payback = [], [], []
+    for embodied, operational, investment, savings in inputs:
+        carbon.append([[embodied + operational * f for f in factor] for factor in carbon_factors])
+        rows = [[savings * f - investment for f in factor] for factor in cash_factors]
+        cash.append(rows)
+        payback.append([next((t + 1 for t, value in enumerate(row) if value >= 0), 0) for row in rows])
+    return {'cumulative_carbon': carbon, 'cumulative_cash_flow': cash, 'discounted_payback_year': payback}
+
+
+def _compact(values):
+    """Nested lists of whole numbers"""
+    if np is not None:
+        return np.rint(values).astype(np.int64).tolist()
+    return [[[round(v) for v in row] for row in rows] for rows in values]
+
+
+def analyze(constraints, params):
+    """
+    Lifecycle trajectories for the designs generated from constraints.
+
+    Args:
+        constraints: validated constraints (area, budget, climate, priority)
+        params: output of parse_params
+
+    Returns:
+        Response dict; the series are nested lists indexed
+        [design][scenario][year - 1]
+    """
+    wanted = params.get('design_ids')
+    designs = [d for d in _generator.generate(constraints) if wanted is None or d['id'] in wanted]
+    metrics = [_evaluator.evaluate(design, constraints) for design in designs]
+    inputs = [design_inputs(constraints['area'], m, params['green_premium']) for m in metrics]
+
+    scenarios = params['scenarios']
+    result = simulate(inputs, scenarios, params['years'])
+    payback = result['discounted_payback_year']
+    payback = payback.tolist() if np is not None else payback
+
+    return {
+        'years': params['years'],
+        'designs': [
+            {'id': d['id'], 'name': d.get('name'), 'investment': round(inputs[i][2]),
+             'annual_savings': round(inputs[i][3]), 'embodied_carbon': round(inputs[i][0]),
+             'payback_period_years': m['payback_period_years']}
+            for i, (d, m) in enumerate(zip(designs, metrics))
+        ],
+        'scenarios': scenarios,
+        'green_premium': params['green_premium'],
+        'cumulative_carbon': _compact(result['cumulative_carbon']),
+        'cumulative_cash_flow': _compact(result['cumulative_cash_flow']),
+        'discounted_payback_year': [[year or None for year in row] for row in payback],
+        'engine': 'numpy' if np is not None else 'python',
+        'units': UNITS,
+    }
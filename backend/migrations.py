@@ -0,0 +1,369 @@
+"""
+Schema Migration Runner
+Versioned schema changes for the SQLite and PostgreSQL backends
+
+Each migration runs once and is recorded in the schema_version table, so
+request handlers only ever issue DML. Apply pending migrations at deploy
+time with:
+
+    python migrations.py
+
+initialize_db() also calls the runner, which costs a single SELECT once the
+schema is current.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+
+# ==================== SQLITE ====================
+
+
+def _sqlite_columns(cur, table):
+    cur.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cur.fetchall()]
+
+
+def _sqlite_001_initial_schema(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            email TEXT UNIQUE,
+            password_hash TEXT,
+            created_at TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            area INTEGER,
+            budget INTEGER,
+            climate TEXT,
+            priority TEXT,
+            designs_json TEXT,
+            ml_json TEXT,
+            created_at TEXT
+        )
+        """
+    )
+    # Databases created before per-user history lack this column
+    if "user_id" not in _sqlite_columns(cur, "projects"):
+        cur.execute("ALTER TABLE projects ADD COLUMN user_id INTEGER")
+
+
+def _sqlite_002_oauth_columns(cur):
+    # Older releases added these lazily from create_user/update_user_oauth
+    columns = _sqlite_columns(cur, "users")
+    if "oauth_provider" not in columns:
+        cur.execute("ALTER TABLE users ADD COLUMN oauth_provider TEXT")
+    if "oauth_id" not in columns:
+        cur.execute("ALTER TABLE users ADD COLUMN oauth_id TEXT")
+
+
+def _sqlite_003_indexes(cur):
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_projects_user_id ON projects(user_id, id)")
+    # email TEXT UNIQUE already carries an autoindex; only add one when missing
+    cur.execute("PRAGMA index_list(users)")
+    unique_indexes = [row[1] for row in cur.fetchall() if row[2]]
+    for index_name in unique_indexes:
+        cur.execute(f"PRAGMA index_info({index_name})")
+        if [row[2] for row in cur.fetchall()] == ["email"]:
+            return
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users(email)")
+
+
+def _outside_transaction(migrate):
+    """Mark a migration that must run in autocommit mode (e.g. VACUUM)"""
+    migrate.transactional = False
+    return migrate
+
+
+@_outside_transaction
+def _sqlite_004_incremental_auto_vacuum(cur):
+    # Lets retention hand freed pages back in small PRAGMA incremental_vacuum
+    # steps. Existing files only switch modes after a full VACUUM.
+    cur.execute("PRAGMA auto_vacuum")
+    if cur.fetchone()[0] != 2:
+        cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cur.execute("VACUUM")
+
+
+def _sqlite_005_jobs(cur):
+    # Background analyses run by jobs.py; ids are unguessable tokens
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            user_id INTEGER,
+            params_json TEXT,
+            result_json TEXT,
+            error TEXT,
+            progress REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT,
+            started_at TEXT,
+            updated_at TEXT,
+            finished_at TEXT,
+            expires_at TEXT
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, priority DESC, created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs(expires_at)")
+
+
+SQLITE_MIGRATIONS = [
+    (1, "initial schema", _sqlite_001_initial_schema),
+    (2, "oauth columns on users", _sqlite_002_oauth_columns),
+    (3, "indexes on projects(user_id, id) and users(email)", _sqlite_003_indexes),
+    (4, "incremental auto-vacuum", _sqlite_004_incremental_auto_vacuum),
+    (5, "jobs table", _sqlite_005_jobs),
+]
+
+
+def apply_sqlite(conn):
+    """
+    Apply pending SQLite migrations.
+
+    Each migration runs inside BEGIN IMMEDIATE so several workers booting
+    at once serialize on the write lock instead of racing each other.
+    Migrations marked with _outside_transaction must be idempotent.
+
+    Returns:
+        Number of migrations applied
+    """
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TEXT
+            )
+            """
+        )
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        if cur.fetchone()[0] >= SQLITE_MIGRATIONS[-1][0]:
+            return 0
+
+        applied = 0
+        for version, description, migrate in SQLITE_MIGRATIONS:
+            if not getattr(migrate, "transactional", True):
+                cur.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,))
+                if cur.fetchone():
+                    continue
+                migrate(cur)
+                cur.execute(
+                    "INSERT OR IGNORE INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                    (version, description, datetime.now().isoformat()),
+                )
+                applied += cur.rowcount
+                continue
+
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                cur.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,))
+                if cur.fetchone():
+                    cur.execute("COMMIT")
+                    continue
+                migrate(cur)
+                cur.execute(
+                    "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                    (version, description, datetime.now().isoformat()),
+                )
+                cur.execute("COMMIT")
+                applied += 1
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        return applied
+    finally:
+        cur.close()
+        conn.isolation_level = previous_isolation
+
+
+# ==================== POSTGRESQL ====================
+
+
+def _postgres_001_initial_schema(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255),
+            email VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS name VARCHAR(255)")
+    cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS oauth_provider VARCHAR(50)")
+    cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS oauth_id VARCHAR(255)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS projects (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id),
+            constraints JSONB,
+            designs JSONB,
+            ml_data JSONB,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            guest BOOLEAN DEFAULT FALSE
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_projects_created ON projects(created_at DESC)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_projects_user ON projects(user_id)")
+
+
+def _postgres_002_compressed_payloads(cur):
+    # JSONB cannot hold the binary payload encoding
+    cur.execute("ALTER TABLE projects ADD COLUMN IF NOT EXISTS designs_z BYTEA")
+    cur.execute("ALTER TABLE projects ADD COLUMN IF NOT EXISTS ml_data_z BYTEA")
+
+
+def _postgres_003_indexes(cur):
+    # (user_id, id) supersedes the single-column user index
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_projects_user_id ON projects(user_id, id)")
+    cur.execute("DROP INDEX IF EXISTS idx_projects_user")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
+    # Login lookups filter on username where that legacy column exists
+    cur.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'users' AND column_name = 'username'
+    """)
+    if cur.fetchone():
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)")
+
+
+def _postgres_004_guest_retention_index(cur):
+    # Retention scans guest rows oldest-first
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_projects_guest_id ON projects(id) WHERE guest = TRUE")
+
+
+def _postgres_005_jobs(cur):
+    # Background analyses run by jobs.py; ids are unguessable tokens
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id VARCHAR(64) PRIMARY KEY,
+            kind VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            user_id INTEGER,
+            params JSONB,
+            result JSONB,
+            result_z BYTEA,
+            error TEXT,
+            progress REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker VARCHAR(255),
+            cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            expires_at TIMESTAMP
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(priority DESC, created_at) WHERE status = 'queued'")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs(expires_at)")
+
+
+POSTGRES_MIGRATIONS = [
+    (1, "initial schema", _postgres_001_initial_schema),
+    (2, "compressed payload columns", _postgres_002_compressed_payloads),
+    (3, "indexes on projects(user_id, id) and users(email)", _postgres_003_indexes),
+    (4, "partial index for guest retention", _postgres_004_guest_retention_index),
+    (5, "jobs table", _postgres_005_jobs),
+]
+
+# Arbitrary key for pg_advisory_xact_lock, shared by every deploy
+_POSTGRES_LOCK_KEY = 727001
+
+
+def apply_postgres(conn):
+    """
+    Apply pending PostgreSQL migrations in one transaction.
+
+    An advisory lock keeps concurrent deploys from applying the same
+    migration twice.
+
+    Returns:
+        Number of migrations applied
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.commit()
+
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        if cur.fetchone()[0] >= POSTGRES_MIGRATIONS[-1][0]:
+            conn.commit()
+            return 0
+
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (_POSTGRES_LOCK_KEY,))
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        current = cur.fetchone()[0]
+        applied = 0
+        for version, description, migrate in POSTGRES_MIGRATIONS:
+            if version <= current:
+                continue
+            migrate(cur)
+            cur.execute(
+                "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                (version, description),
+            )
+            applied += 1
+        conn.commit()
+        return applied
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+# ==================== CLI ====================
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    if os.getenv("DATABASE_URL"):
+        import db_supabase
+        conn = db_supabase.get_connection()
+        try:
+            applied = apply_postgres(conn)
+        finally:
+            conn.close()
+        backend = "PostgreSQL"
+    else:
+        import db
+        conn = sqlite3.connect(db.DB_PATH)
+        try:
+            applied = apply_sqlite(conn)
+        finally:
+            conn.close()
+        backend = "SQLite"
+    print(f"✓ {backend} schema up to date ({applied} migration(s) applied)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Password Hashing Executor
+Runs PBKDF2 hashing in a bounded process pool, off the request workers
+
+Each login or signup needs one slot out of PASSWORD_HASH_MAX_CONCURRENCY.
+Slots are shared by every gunicorn worker on the machine (file locks), so a
+burst of logins can hold at most that many workers busy hashing; the rest
+wait up to PASSWORD_HASH_QUEUE_TIMEOUT seconds and then fail fast with
+HashingBusyError instead of starving /api/designs/generate.
+
+Stored format:  pbkdf2_sha256$<iterations>$<salt>$<hex digest>
+Legacy format:  <salt>$<hex digest>  (100,000 iterations)
+Hashes with fewer iterations than PASSWORD_HASH_ITERATIONS, or in the legacy
+format, are reported as needing a rehash so callers can upgrade them on the
+next successful login.
+"""
+
+import hmac
+import multiprocessing
+import os
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from password_worker import ignore_interrupts, pbkdf2
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to a per-process limit
+    fcntl = None
+
+ALGORITHM = "pbkdf2_sha256"
+LEGACY_ITERATIONS = 100000
+ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", LEGACY_ITERATIONS))
+POOL_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+MAX_CONCURRENCY = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", POOL_WORKERS))
+QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 0.25))
+SLOT_DIR = os.getenv(
+    "PASSWORD_HASH_SLOT_DIR", os.path.join(tempfile.gettempdir(), "sustainable-design-hash-slots")
+)
+
+_POLL_INTERVAL = 0.01
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_local_slots = threading.BoundedSemaphore(MAX_CONCURRENCY)
+
+stats = {"hashed": 0, "verified": 0, "rejected_busy": 0, "rehash_needed": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key):
+    with _stats_lock:
+        stats[key] += 1
+
+
+class HashingBusyError(Exception):
+    """Raised when no hashing slot frees up within the queue timeout"""
+
+
+def _get_pool():
+    """Create the process pool lazily, once per (forked) worker process"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            context = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=context,
+                                        initializer=ignore_interrupts)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _acquire_slot(deadline):
+    """Return a handle for a free slot, or None once the deadline passes"""
+    if fcntl is None:
+        remaining = max(0.0, deadline - time.monotonic())
+        return "local" if _local_slots.acquire(timeout=remaining) else None
+
+    os.makedirs(SLOT_DIR, exist_ok=True)
+    while True:
+        for slot in range(MAX_CONCURRENCY):
+            fd = os.open(os.path.join(SLOT_DIR, f"slot-{slot}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except OSError:
+                os.close(fd)
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(_POLL_INTERVAL)
+
+
+def _release_slot(handle):
+    if handle == "local":
+        _local_slots.release()
+    else:
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        os.close(handle)
+
+
+def _run(password, salt, iterations):
+    deadline = time.monotonic() + QUEUE_TIMEOUT
+    handle = _acquire_slot(deadline)
+    if handle is None:
+        _count("rejected_busy")
+        raise HashingBusyError("Password hashing is saturated, retry shortly")
+    try:
+        future = _get_pool().submit(pbkdf2, password, salt, iterations)
+    except Exception:
+        _release_slot(handle)
+        raise
+    # Freed when the hash finishes, not when a caller gives up waiting, so
+    # an abandoned hash still counts against the concurrency cap
+    future.add_done_callback(lambda _: _release_slot(handle))
+    try:
+        # The slot bounds concurrency, so the job starts right away; allow
+        # generous time for the hash itself before giving up on it
+        return future.result(timeout=QUEUE_TIMEOUT + 30)
+    except FutureTimeout:
+        raise HashingBusyError("Password hashing timed out")
+
+
+def hash_password(password):
+    """Hash a password with the current parameters"""
+    salt = secrets.token_hex(16)
+    digest = _run(password, salt, ITERATIONS)
+    _count("hashed")
+    return f"{ALGORITHM}${ITERATIONS}${salt}${digest}"
+
+
+def parse_hash(stored):
+    """Return (iterations, salt, digest) for either stored format"""
+    parts = stored.split("$")
+    if len(parts) == 4 and parts[0] == ALGORITHM:
+        return int(parts[1]), parts[2], parts[3]
+    if len(parts) == 2 and len(parts[0]) == 32 and len(parts[1]) == 64:
+        return LEGACY_ITERATIONS, parts[0], parts[1]
+    raise ValueError("Unrecognized password hash format")
+
+
+def is_password_hash(stored):
+    """True when stored looks like one of our hash formats"""
+    try:
+        parse_hash(stored or "")
+        return True
+    except ValueError:
+        return False
+
+
+def needs_rehash(stored):
+    """True when a stored hash uses an outdated format or too few iterations"""
+    iterations, _, _ = parse_hash(stored)
+    return not stored.startswith(ALGORITHM + "$") or iterations < ITERATIONS
+
+
+def verify_password(password, stored):
+    """
+    Check a password against a stored hash.
+
+    Returns:
+        (is_valid: bool, needs_rehash: bool)
+
+    Raises:
+        HashingBusyError when no hashing slot is available in time
+    """
+    try:
+        iterations, salt, digest = parse_hash(stored or "")
+    except ValueError:
+        return False, False
+
+    candidate = _run(password, salt, iterations)
+    _count("verified")
+    if not hmac.compare_digest(candidate, digest):
+        return False, False
+
+    rehash = needs_rehash(stored)
+    if rehash:
+        _count("rehash_needed")
+    return True, rehash
@@ -0,0 +1,20 @@
+"""
+Password Hashing Worker
+The function run inside the password hashing pool processes
+
+Kept free of application imports: spawned pool processes import only this
+module (and the standard library) to run a hash.
+"""
+
+import hashlib
+import signal
+
+
+def pbkdf2(password, salt, iterations):
+    """Hex PBKDF2-SHA256 digest of password"""
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations).hex()
+
+
+def ignore_interrupts():
+    """Pool initializer: Ctrl+C is handled by the server, which shuts the pool down"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
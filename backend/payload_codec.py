@@ -0,0 +1,121 @@
+"""
+Project Payload Codec
+Optional compressed encoding for stored design and ML payloads
+"""
+
+import json
+import os
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Every compressed payload starts with MAGIC followed by a one-byte format
+# version. Legacy rows are plain JSON text and carry no marker, so old and
+# new rows can live side by side in the same table.
+MAGIC = b"SDZ"
+FORMAT_ZLIB_DICT_V1 = 1
+CURRENT_FORMAT = FORMAT_ZLIB_DICT_V1
+
+# Opt in with PAYLOAD_COMPRESSION=zlib; anything else stores plain JSON
+COMPRESSION_ENABLED = os.getenv("PAYLOAD_COMPRESSION", "none").lower() == "zlib"
+
+ZLIB_LEVEL = 6
+MAX_DICTIONARY_SIZE = 32 * 1024
+
+_DICTIONARY_FILES = {
+    FORMAT_ZLIB_DICT_V1: os.path.join(os.path.dirname(__file__), "data", "payload_zdict_v1.txt"),
+}
+_dictionaries: Dict[int, bytes] = {}
+
+
+def _get_dictionary(version: int) -> bytes:
+    """Load (and memoize) the preset zlib dictionary for a format version"""
+    if version not in _dictionaries:
+        path = _DICTIONARY_FILES.get(version)
+        if path is None:
+            raise ValueError(f"Unknown payload format version: {version}")
+        with open(path, "rb") as f:
+            _dictionaries[version] = f.read()
+    return _dictionaries[version]
+
+
+def encode_payload(obj: Any, compress: Optional[bool] = None):
+    """
+    Encode a payload for storage.
+
+    Returns JSON text when compression is disabled, otherwise bytes with the
+    MAGIC + version header followed by the zlib stream.
+    """
+    text = json.dumps(obj, separators=(",", ":"))
+    if compress is None:
+        compress = COMPRESSION_ENABLED
+    if not compress:
+        return text
+
+    compressor = zlib.compressobj(ZLIB_LEVEL, zdict=_get_dictionary(CURRENT_FORMAT))
+    body = compressor.compress(text.encode("utf-8")) + compressor.flush()
+    return MAGIC + bytes([CURRENT_FORMAT]) + body
+
+
+def decode_payload(value: Any, default: Any = None) -> Any:
+    """Decode a stored payload in any known format (legacy JSON text included)"""
+    if value is None:
+        return default
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    if isinstance(value, (bytes, bytearray)):
+        value = bytes(value)
+        if value.startswith(MAGIC):
+            version = value[len(MAGIC)]
+            decompressor = zlib.decompressobj(zdict=_get_dictionary(version))
+            raw = decompressor.decompress(value[len(MAGIC) + 1:]) + decompressor.flush()
+            return json.loads(raw)
+        value = value.decode("utf-8")
+    if isinstance(value, str):
+        return json.loads(value) if value else default
+    # Already decoded (e.g. psycopg2 JSONB)
+    return value
+
+
+def is_compressed(value: Any) -> bool:
+    """True when a stored value carries the compressed format marker"""
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    return isinstance(value, (bytes, bytearray)) and bytes(value).startswith(MAGIC)
+
+
+def train_dictionary(samples: List[Any], size: int = MAX_DICTIONARY_SIZE) -> bytes:
+    """
+    Build a preset dictionary from representative payloads.
+
+    Collects JSON fragments (keys and scalar values) and orders them so the
+    most frequent ones sit at the end, where zlib finds them cheapest.
+    A trained dictionary must be frozen under a new format version once rows
+    have been written with it.
+    """
+    counts = Counter()
+
+    def collect(node):
+        if isinstance(node, dict):
+            for key, val in node.items():
+                counts[json.dumps(key) + ":"] += 1
+                collect(val)
+        elif isinstance(node, list):
+            for item in node:
+                collect(item)
+        else:
+            counts[json.dumps(node)] += 1
+
+    for sample in samples:
+        collect(sample)
+
+    fragments = []
+    total = 0
+    for fragment, _ in counts.most_common():
+        encoded = fragment.encode("utf-8")
+        if total + len(encoded) > size:
+            continue
+        fragments.append(encoded)
+        total += len(encoded)
+
+    return b"".join(reversed(fragments))
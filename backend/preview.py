@@ -0,0 +1,161 @@
+"""
+Design Preview
+Metrics-only design evaluation for live slider exploration
+
+    GET  /api/designs/preview?area=1200&budget=60&climate=hot&priority=energy
+    POST /api/designs/preview  {"area": 1200, "budget": 60, "climate": "hot", "priority": "energy"}
+
+Returns the evaluator metrics of every design: no descriptions, materials,
+ML scoring or persistence. Clients commit with /api/designs/generate once
+the user clicks Generate.
+
+The server-side target is PREVIEW_TARGET_US (benchmarks/bench_preview.py).
+A Flask request spends several hundred microseconds on the request context,
+session, CORS and hook dispatch before any work. So init_preview puts a
+WSGI wrapper in front of the app that answers this one path directly, and
+asgi.py does the same natively. Both still apply admission control, CORS
+and request metrics like the Flask routes do. The Flask route stays
+registered for OPTIONS preflight and as a fallback.
+
+Rendered responses (body bytes and strong ETag) are memoized per
+constraint set. They carry the same ETag and Cache-Control headers as
+http_cache.conditional, so browsers absorb revisited slider positions.
+"""
+
+import os
+import time
+from functools import lru_cache
+from http import HTTPStatus
+from urllib.parse import parse_qsl
+
+from werkzeug.http import parse_etags
+
+import admission
+import http_cache
+from instrumentation import record_request
+from pipeline import constraint_engine, preview_metrics
+
+ROUTE = '/api/designs/preview'
+METHODS = ('GET', 'HEAD', 'POST')
+FIELDS = ('area', 'budget', 'climate', 'priority')
+CACHE_SIZE = int(os.getenv('PREVIEW_CACHE_SIZE', 4096))
+TARGET_US = int(os.getenv('PREVIEW_TARGET_US', 300))
+
+# Set by init_preview
+_json = None
+_version = ''
+_allowed_origins = ()
+
+
+def _input(method, query_string, body):
+    if method == 'POST':
+        return _json.loads(body) if body else None
+    # Same coercion as http_cache.request_input for plain query parameters
+    return {key: http_cache.coerce(value) for key, value in parse_qsl(query_string)}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _rendered(area, budget, climate, priority):
+    """(ETag, JSON body) for one constraint set"""
+    constraints = {'area': area, 'budget': budget, 'climate': climate, 'priority': priority}
+    body = _json.dumps_bytes({'designs': preview_metrics(constraints), 'constraints': constraints,
+                              'preview': True}) + b'\n'
+    return http_cache.etag_for(ROUTE, constraints, _version), body
+
+
+def _json_headers(body):
+    return [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))]
+
+
+def respond(method, query_string, body, if_none_match):
+    """
+    Answer one preview request.
+
+    Returns:
+        (status, headers list, body bytes)
+    """
+    try:
+        data = _input(method, query_string, body)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        payload = _json.dumps_bytes({'error': 'Expected a JSON object'}) + b'\n'
+        return 400, _json_headers(payload), payload
+
+    is_valid, errors = constraint_engine.validate(data)
+    if not is_valid:
+        payload = _json.dumps_bytes({'error': 'Invalid constraints', 'errors': errors}) + b'\n'
+        return 400, _json_headers(payload), payload
+
+    etag, payload = _rendered(*(data[field] for field in FIELDS))
+    headers = [('ETag', f'"{etag}"'), ('Cache-Control', f'public, max-age={http_cache.MAX_AGE}')]
+    # Parsed, not substring-matched; If-None-Match uses the weak comparison
+    if if_none_match and parse_etags(if_none_match).contains_weak(etag):
+        return 304, headers, b''
+    return 200, _json_headers(payload) + headers, payload
+
+
+def cors_headers(origin):
+    """Same CORS answer flask-cors gives the Flask routes"""
+    if origin and origin in _allowed_origins:
+        return [('Access-Control-Allow-Origin', origin), ('Access-Control-Allow-Credentials', 'true'),
+                ('Vary', 'Origin')]
+    return []
+
+
+def handle(method, query_string, body, if_none_match, origin, client):
+    """respond() behind admission control, with CORS and request metrics"""
+    start = time.perf_counter()
+    try:
+        release = admission.admit(ROUTE, client)
+    except admission.AdmissionRejected as e:
+        payload = _json.dumps_bytes(admission.rejection_body(e)) + b'\n'
+        status, headers = e.status, _json_headers(payload) + [('Retry-After', admission.retry_after_header(e))]
+    else:
+        try:
+            status, headers, payload = respond(method, query_string, body, if_none_match)
+        finally:
+            release()
+    elapsed = time.perf_counter() - start
+    record_request(ROUTE, method, status, elapsed, len(payload))
+    headers.append(('Server-Timing', f"total;dur={elapsed * 1000:.2f}"))
+    headers.extend(cors_headers(origin))
+    return status, headers, b'' if method == 'HEAD' else payload
+
+
+def init_preview(app, code_version, allowed_origins):
+    """Register the preview route and serve it ahead of Flask"""
+    from flask import request
+
+    global _json, _version, _allowed_origins
+    _json, _version, _allowed_origins = app.json, code_version, tuple(allowed_origins)
+
+    @app.route(ROUTE, methods=['GET', 'POST'])
+    def preview_designs():
+        """Fallback when the WSGI fast path is bypassed; see preview.py"""
+        status, headers, body = respond(
+            request.method, request.query_string.decode('latin-1'), request.get_data(),
+            request.headers.get('If-None-Match'),
+        )
+        return app.response_class(body, status=status, headers=headers)
+
+    flask_app = app.wsgi_app
+
+    def wsgi_app(environ, start_response):
+        method = environ['REQUEST_METHOD']
+        if environ.get('PATH_INFO') != ROUTE or method not in METHODS:
+            return flask_app(environ, start_response)
+        body = b''
+        if method == 'POST':
+            length = environ.get('CONTENT_LENGTH')
+            body = environ['wsgi.input'].read(int(length)) if length else b''
+        client = admission.client_id(environ.get('REMOTE_ADDR'), environ.get('HTTP_X_FORWARDED_FOR'))
+        status, headers, payload = handle(
+            method, environ.get('QUERY_STRING', ''), body, environ.get('HTTP_IF_NONE_MATCH'),
+            environ.get('HTTP_ORIGIN'), client,
+        )
+        start_response(f"{status} {HTTPStatus(status).phrase}", headers)
+        return [payload]
+
+    app.wsgi_app = wsgi_app
+    return app
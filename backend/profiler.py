@@ -0,0 +1,352 @@
+"""
+Sampling Profiler
+On-demand, in-process stack sampling for a running worker
+
+Disabled unless ADMIN_TOKEN is set. Requests authenticate with
+"Authorization: Bearer <ADMIN_TOKEN>" (or X-Admin-Token).
+
+    POST /api/admin/profile?seconds=10
+        Start sampling this worker for N seconds in the background and
+        return 202 with a profile id. Only threads that are serving a
+        request are sampled, so idle accept loops and daemon threads stay out
+        of the picture. The worker keeps serving traffic while it runs.
+
+    GET /api/admin/profiles/<id>[?format=collapsed]
+        The finished profile: collapsed stacks (flamegraph.pl / speedscope
+        input) and a top-functions table. 202 while still sampling.
+
+    X-Profile: 1 (plus the admin token) on any request
+        Sample just that request at a finer interval; the response carries
+        X-Profile-Id to fetch it with the endpoint above.
+
+Profiles are written to PROFILE_DIR so any worker can serve them. Nothing
+runs while no profile is active: the request hooks only read one global and
+one header.
+"""
+
+import hmac
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import g, jsonify, request, Response
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+PROFILE_DIR = os.getenv(
+    'PROFILE_DIR',
+    os.path.join(tempfile.gettempdir(), 'sustainable-design-profiles'),
+)
+INTERVAL_SECONDS = float(os.getenv('PROFILE_INTERVAL_MS', 5)) / 1000
+REQUEST_INTERVAL_SECONDS = float(os.getenv('PROFILE_REQUEST_INTERVAL_MS', 1)) / 1000
+MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 60))
+KEEP_PROFILES = int(os.getenv('PROFILE_KEEP', 50))
+TOP_FUNCTIONS = 30
+MAX_STACK_DEPTH = 128
+
+_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# Window profile currently running in this process (at most one)
+_session = None
+_session_lock = threading.Lock()
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """
+    Background thread that snapshots Python stacks at a fixed interval.
+
+    Args:
+        interval: seconds between samples
+        thread_ids: callable returning the thread idents to sample
+    """
+
+    def __init__(self, interval, thread_ids):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample_once(self):
+        frames = sys._current_frames()
+        for ident in self.thread_ids():
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[';'.join(stack)] += 1
+            self.samples += 1
+
+    def _run(self, deadline):
+        while not self._stop.is_set():
+            self._sample_once()
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            self._stop.wait(self.interval)
+        self.elapsed = time.perf_counter() - self._start_clock
+
+    def start(self, seconds=None):
+        self.started = time.time()
+        self._start_clock = time.perf_counter()
+        deadline = self._start_clock + seconds if seconds else None
+        self._thread = threading.Thread(target=self._run, args=(deadline,), name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def report(self):
+        """Collapsed stacks plus self/total sample counts per function"""
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+
+        samples = self.samples or 1
+        top = [
+            {
+                'function': label,
+                'self_samples': self_counts[label],
+                'self_pct': round(100.0 * self_counts[label] / samples, 2),
+                'total_samples': total_counts[label],
+                'total_pct': round(100.0 * total_counts[label] / samples, 2),
+            }
+            for label, _ in self_counts.most_common(TOP_FUNCTIONS)
+        ]
+        collapsed = '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+        return {
+            'samples': self.samples,
+            'interval_ms': round(self.interval * 1000, 3),
+            'seconds': round(self.elapsed, 3),
+            'started': self.started,
+            'top': top,
+            'collapsed': collapsed,
+        }
+
+
+class _WindowSession:
+    """Samples every thread that is inside a request for a fixed window"""
+
+    def __init__(self, profile_id, seconds):
+        self.profile_id = profile_id
+        self.active_threads = set()
+        self._lock = threading.Lock()
+        self.sampler = Sampler(INTERVAL_SECONDS, self._thread_ids)
+        self.seconds = seconds
+
+    def _thread_ids(self):
+        with self._lock:
+            return list(self.active_threads)
+
+    def enter(self, ident):
+        with self._lock:
+            self.active_threads.add(ident)
+
+    def leave(self, ident):
+        with self._lock:
+            self.active_threads.discard(ident)
+
+
+# ==================== STORAGE ====================
+
+def _profile_path(profile_id):
+    return os.path.join(PROFILE_DIR, f"{profile_id}.json")
+
+
+def _write_profile(profile_id, document):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    tmp_path = f"{_profile_path(profile_id)}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(document, f)
+    os.replace(tmp_path, _profile_path(profile_id))
+    _prune()
+
+
+def _prune():
+    try:
+        names = [n for n in os.listdir(PROFILE_DIR) if n.endswith('.json')]
+    except OSError:
+        return
+    if len(names) <= KEEP_PROFILES:
+        return
+
+    def mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0
+
+    paths = sorted((os.path.join(PROFILE_DIR, n) for n in names), key=mtime)
+    for path in paths[:len(paths) - KEEP_PROFILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _read_profile(profile_id):
+    try:
+        with open(_profile_path(profile_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ==================== WINDOW PROFILES ====================
+
+def start_window_profile(seconds):
+    """
+    Start sampling request threads of this process in the background.
+
+    Returns:
+        Profile id, or None if a window profile is already running here
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            return None
+        profile_id = uuid.uuid4().hex
+        session = _WindowSession(profile_id, seconds)
+        _session = session
+
+    _write_profile(profile_id, {'id': profile_id, 'status': 'running', 'kind': 'window',
+                                'pid': os.getpid(), 'seconds_requested': seconds})
+
+    def finish():
+        global _session
+        session.sampler.join()
+        with _session_lock:
+            _session = None
+        document = session.sampler.report()
+        document.update({'id': profile_id, 'status': 'done', 'kind': 'window', 'pid': os.getpid()})
+        try:
+            _write_profile(profile_id, document)
+        except OSError as e:
+            print(f"⚠ Could not store profile {profile_id}: {e}")
+
+    session.sampler.start(seconds)
+    threading.Thread(target=finish, name='profiler-finish', daemon=True).start()
+    return profile_id
+
+
+# ==================== REQUEST HOOKS ====================
+
+def is_admin():
+    """True when the request carries the configured admin token"""
+    if not ADMIN_TOKEN:
+        return False
+    supplied = request.headers.get('X-Admin-Token', '')
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        supplied = auth[7:]
+    return bool(supplied) and hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode())
+
+
+def _before_request():
+    session = _session
+    if session is not None:
+        session.enter(threading.get_ident())
+        g.profile_session = session
+
+    if request.headers.get('X-Profile') == '1' and is_admin():
+        ident = threading.get_ident()
+        g.request_sampler = Sampler(REQUEST_INTERVAL_SECONDS, lambda: (ident,)).start(MAX_SECONDS)
+
+
+def _after_request(response):
+    sampler = g.pop('request_sampler', None)
+    if sampler is not None:
+        profile_id = uuid.uuid4().hex
+        document = sampler.stop().report()
+        document.update({'id': profile_id, 'status': 'done', 'kind': 'request', 'pid': os.getpid(),
+                         'request': f"{request.method} {request.path}"})
+        try:
+            _write_profile(profile_id, document)
+            response.headers['X-Profile-Id'] = profile_id
+        except OSError as e:
+            print(f"⚠ Could not store profile {profile_id}: {e}")
+    return response
+
+
+def _teardown_request(error=None):
+    sampler = g.pop('request_sampler', None)
+    if sampler is not None:
+        sampler.stop()
+    session = g.pop('profile_session', None)
+    if session is not None:
+        session.leave(threading.get_ident())
+
+
+def init_profiler(app):
+    """Install the profiling hooks and admin endpoints"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+    @app.route('/api/admin/profile', methods=['POST'])
+    def start_profile():
+        """Sample this worker's request threads for ?seconds=N"""
+        if not is_admin():
+            return jsonify({'error': 'Endpoint not found'}), 404
+        try:
+            seconds = float(request.args.get('seconds', 10))
+        except ValueError:
+            return jsonify({'error': 'seconds must be a number'}), 400
+        if not 0 < seconds <= MAX_SECONDS:
+            return jsonify({'error': f'seconds must be between 0 and {MAX_SECONDS:g}'}), 400
+
+        profile_id = start_window_profile(seconds)
+        if profile_id is None:
+            return jsonify({'error': 'A profile is already running in this worker'}), 409
+        return jsonify({
+            'id': profile_id,
+            'pid': os.getpid(),
+            'seconds': seconds,
+            'result': f"/api/admin/profiles/{profile_id}",
+        }), 202
+
+    @app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+    def get_profile(profile_id):
+        """Fetch a stored profile as JSON or collapsed stacks"""
+        if not is_admin():
+            return jsonify({'error': 'Endpoint not found'}), 404
+        if not _ID_PATTERN.match(profile_id):
+            return jsonify({'error': 'Profile not found'}), 404
+        document = _read_profile(profile_id)
+        if document is None:
+            return jsonify({'error': 'Profile not found'}), 404
+        if document.get('status') == 'running':
+            return jsonify(document), 202
+        if request.args.get('format') == 'collapsed':
+            return Response(document['collapsed'] + '\n', mimetype='text/plain')
+        return jsonify(document), 200
+
+    return app
@@ -0,0 +1,132 @@
+"""
+Progressive Generation
+Stream a /api/designs/generate result as its parts become ready
+
+    POST /api/designs/generate?stream=ndjson   (or Accept: application/x-ndjson)
+    POST /api/designs/generate?stream=sse      (or Accept: text/event-stream)
+
+Events, in the order they are sent:
+    designs            designs with rule-based metrics, count, constraints,
+                       generated_at: sent as soon as the evaluator is done
+    ml_predicted_cost  {design id: predicted cost}
+    ml_rankings        [{id, ml_score}] best first
+    recommendations    recommender output
+    stage_timeout      {stage, deadline_ms} for an ML stage past its deadline
+    stage_error        {stage, error} for an ML stage that raised
+    done               {project_id, stages: {stage: ms}, timed_out: [...]}
+
+The three ML stages start together on a shared thread pool once the designs
+event is out, each on its own copy of the designs. A stage that raises is
+reported as stage_error rather than sent as an empty result. Each stage has
+its own deadline (PROGRESSIVE_*_DEADLINE_MS), counted from that start, and
+is emitted as soon as it finishes. A stage past its deadline is reported and
+left out of the saved project. Its thread runs to completion, but nothing
+waits for it. The project is saved after the last stage, so done carries the
+same project_id as a plain generate.
+
+NDJSON lines are {"event": name, "data": ...}. SSE frames use the event
+name and a JSON data line.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from pipeline import evaluated_designs, predict_costs, rank_designs, recommend
+
+THREADS = int(os.getenv('PROGRESSIVE_THREADS', 8))
+DEADLINES_MS = {
+    'ml_predicted_cost': int(os.getenv('PROGRESSIVE_COST_DEADLINE_MS', 250)),
+    'ml_rankings': int(os.getenv('PROGRESSIVE_RANKING_DEADLINE_MS', 250)),
+    'recommendations': int(os.getenv('PROGRESSIVE_RECOMMEND_DEADLINE_MS', 1000)),
+}
+MIMETYPES = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+
+_executor = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix='progressive')
+
+
+def requested_mode(args, accept):
+    """'ndjson' or 'sse' if the client asked for a progressive response, else None"""
+    mode = args.get('stream')
+    if mode in MIMETYPES:
+        return mode
+    for name, mimetype in MIMETYPES.items():
+        if accept and mimetype in accept:
+            return name
+    return None
+
+
+def encode(mode, event, data, dumps_bytes):
+    """One NDJSON line or SSE frame"""
+    if mode == 'sse':
+        return b'event: ' + event.encode('ascii') + b'\ndata: ' + dumps_bytes(data) + b'\n\n'
+    return dumps_bytes({'event': event, 'data': data}) + b'\n'
+
+
+def events(constraints, m, save):
+    """
+    Yield (event, data) pairs for validated constraints.
+
+    Args:
+        constraints: validated constraints
+        m: ModelSet to score with
+        save: callable(designs, ml_data) -> project_id, run after the last stage
+    """
+    designs = evaluated_designs(constraints)
+    yield 'designs', {
+        'designs': designs,
+        'count': len(designs),
+        'constraints': constraints,
+        'generated_at': datetime.now().isoformat()
+    }
+
+    results = {}
+    timings = {}
+    timed_out = []
+    if m.ready:
+        start = time.monotonic()
+        # Copies: a stage past its deadline keeps running after the costs are
+        # written into designs below
+        pending = {
+            _executor.submit(predict_costs, constraints, m, [dict(d) for d in designs]): 'ml_predicted_cost',
+            _executor.submit(rank_designs, constraints, m, [dict(d) for d in designs]): 'ml_rankings',
+            _executor.submit(recommend, constraints, m): 'recommendations',
+        }
+        while pending:
+            deadline = min(start + DEADLINES_MS[name] / 1000 for name in pending.values())
+            done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                           return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for future in done:
+                name = pending.pop(future)
+                timings[name] = round((now - start) * 1000, 2)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    yield 'stage_error', {'stage': name, 'error': str(e)}
+                    continue
+                yield name, results[name]
+            for future, name in list(pending.items()):
+                if now >= start + DEADLINES_MS[name] / 1000:
+                    del pending[future]
+                    future.cancel()
+                    timed_out.append(name)
+                    yield 'stage_timeout', {'stage': name, 'deadline_ms': DEADLINES_MS[name]}
+
+    # Persist what made it, shaped like a plain generate result
+    costs = results.get('ml_predicted_cost') or {}
+    for design in designs:
+        if design['id'] in costs:
+            design['ml_predicted_cost'] = costs[design['id']]
+    project_id = save(designs, {
+        'ml_rankings': results.get('ml_rankings'),
+        'recommendations': results.get('recommendations')
+    })
+    yield 'done', {'project_id': project_id, 'stages': timings, 'timed_out': timed_out}
+
+
+def stream(mode, constraints, m, save, dumps_bytes):
+    """events() encoded for the wire"""
+    for event, data in events(constraints, m, save):
+        yield encode(mode, event, data, dumps_bytes)
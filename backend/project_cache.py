@@ -0,0 +1,135 @@
+"""
+Project Cache
+Bounded in-process LRU of decoded projects keyed by id
+
+save_project fills the cache (write-through) and get_project reads through
+it. clear_projects drops the matching entries locally and bumps a shared
+epoch file; every other worker process on the machine sees the new epoch on
+its next lookup and flushes its own cache, so cleared projects never come
+back from any worker.
+"""
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = int(os.getenv("PROJECT_CACHE_SIZE", 256))
+EPOCH_FILE = os.getenv(
+    "PROJECT_CACHE_EPOCH_FILE",
+    os.path.join(tempfile.gettempdir(), "sustainable-design-project-cache.epoch"),
+)
+
+
+class ProjectCache:
+    """Thread-safe LRU of decoded project dicts"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, epoch_file=EPOCH_FILE):
+        self.max_entries = max_entries
+        self.epoch_file = epoch_file
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = self._read_epoch()
+        self._stats = {"hits": 0, "misses": 0, "puts": 0, "evictions": 0,
+                       "invalidations": 0, "stale_puts": 0, "flushes": 0}
+
+    def _read_epoch(self):
+        try:
+            st = os.stat(self.epoch_file)
+            return (st.st_ino, st.st_mtime_ns)
+        except OSError:
+            return (0, 0)
+
+    def _bump_epoch(self):
+        # Atomic replace gives the file a new inode, so the stat tuple changes
+        tmp_path = f"{self.epoch_file}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, "w") as f:
+            f.write(str(os.getpid()))
+        os.replace(tmp_path, self.epoch_file)
+        return self._read_epoch()
+
+    def _sync_epoch(self):
+        """Flush everything if another process invalidated since we last looked"""
+        current = self._read_epoch()
+        if current != self._epoch:
+            self._entries.clear()
+            self._epoch = current
+            self._stats["flushes"] += 1
+        return current
+
+    def epoch(self):
+        """Token to pass to put() after a database read"""
+        with self._lock:
+            return self._sync_epoch()
+
+    def get(self, project_id):
+        key = str(project_id)
+        with self._lock:
+            self._sync_epoch()
+            project = self._entries.get(key)
+            if project is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return project
+
+    def put(self, project_id, project, epoch=None):
+        """
+        Cache a decoded project.
+
+        When epoch is given (read-through fill), the entry is dropped if an
+        invalidation happened after that token was taken.
+        """
+        if self.max_entries <= 0:
+            return
+        key = str(project_id)
+        with self._lock:
+            current = self._sync_epoch()
+            if epoch is not None and epoch != current:
+                self._stats["stale_puts"] += 1
+                return
+            self._entries[key] = project
+            self._entries.move_to_end(key)
+            self._stats["puts"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, user_id=None, guest=False):
+        """Drop entries matching a clear_projects scope (guest, user or all)"""
+        with self._lock:
+            self._sync_epoch()
+            if guest:
+                doomed = [k for k, p in self._entries.items() if p.get("user_id") is None]
+            elif user_id is not None:
+                doomed = [k for k, p in self._entries.items()
+                          if p.get("user_id") is not None and str(p.get("user_id")) == str(user_id)]
+            else:
+                doomed = list(self._entries)
+            for key in doomed:
+                del self._entries[key]
+            self._stats["invalidations"] += len(doomed)
+            self._epoch = self._bump_epoch()
+
+    def invalidate_ids(self, project_ids):
+        """Drop specific projects (e.g. rows removed by retention)"""
+        with self._lock:
+            self._sync_epoch()
+            for project_id in project_ids:
+                if self._entries.pop(str(project_id), None) is not None:
+                    self._stats["invalidations"] += 1
+            self._epoch = self._bump_epoch()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return dict(
+                self._stats,
+                size=len(self._entries),
+                max_entries=self.max_entries,
+                hit_rate=round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            )
+
+
+project_cache = ProjectCache()
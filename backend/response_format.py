@@ -0,0 +1,113 @@
+"""
+Compact Response Format
+Opt-in smaller encoding of generated designs (?format=compact)
+
+The full format repeats each template's name, icon, colour, approach and
+long description in every design and echoes the request constraints. The
+compact format instead:
+
+    - names the template of each design and sends only the description
+      arguments; the templates themselves come from /api/templates
+      (long-lived, ETag'd) or inline with &templates=1
+    - sends metrics as an array ordered by "metric_fields"
+    - drops the echoed constraints
+
+Expanding a compact design: start from templates[design.template], format
+its description with description_args, then zip metric_fields with metrics
+(dotted names are nested keys).
+"""
+
+import hashlib
+import json
+
+from generator import DESIGN_TEMPLATES, STATIC_TEMPLATE_FIELDS, description_args
+
+FORMAT_NAME = 'compact-v1'
+
+METRIC_FIELDS = (
+    'energyEfficiency',
+    'waterEfficiency',
+    'materialsEfficiency',
+    'carbonFootprint',
+    'sustainabilityIndex',
+    'estimatedCost',
+    'payback_period_years',
+    'lifecycle_analysis.embodied',
+    'lifecycle_analysis.operational',
+)
+
+_TEMPLATE_DOCUMENT = {
+    'templates': {
+        template['template']: {
+            'design_id': design_id,
+            'description': template['description'],
+            **{name: template[name] for name in STATIC_TEMPLATE_FIELDS},
+        }
+        for design_id, template in DESIGN_TEMPLATES.items()
+    },
+    'metric_fields': list(METRIC_FIELDS),
+    'format': FORMAT_NAME,
+}
+TEMPLATES_VERSION = hashlib.sha256(
+    json.dumps(_TEMPLATE_DOCUMENT, sort_keys=True).encode()
+).hexdigest()[:16]
+
+
+def wants_compact(args):
+    """True when the query string asks for the compact format"""
+    return args.get('format') == 'compact'
+
+
+def templates_document():
+    """Body of /api/templates"""
+    return dict(_TEMPLATE_DOCUMENT, version=TEMPLATES_VERSION)
+
+
+def metric_value(metrics, field):
+    """Value of a (possibly dotted) METRIC_FIELDS name in a metrics dict"""
+    value = metrics
+    for part in field.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def compact_design(design, constraints):
+    """One design in compact form"""
+    template = DESIGN_TEMPLATES.get(design.get('id'))
+    if template is None:
+        return design
+    compact = {
+        key: value for key, value in design.items()
+        if key not in STATIC_TEMPLATE_FIELDS and key not in ('description', 'metrics')
+    }
+    compact['template'] = template['template']
+    compact['description_args'] = description_args(design['id'], constraints)
+    if 'metrics' in design:
+        compact['metrics'] = [metric_value(design['metrics'], field) for field in METRIC_FIELDS]
+    return compact
+
+
+def compact_generation(response, constraints, inline_templates=False):
+    """
+    Compact form of a generate response.
+
+    Args:
+        response: full response dict with 'designs'
+        constraints: constraints the designs were generated from
+        inline_templates: embed the template table instead of referencing it
+    """
+    compact = {
+        key: value for key, value in response.items()
+        if key not in ('designs', 'constraints')
+    }
+    compact['format'] = FORMAT_NAME
+    compact['templates_version'] = TEMPLATES_VERSION
+    compact['metric_fields'] = list(METRIC_FIELDS)
+    compact['designs'] = [compact_design(d, constraints) for d in response.get('designs', [])]
+    if inline_templates:
+        compact['templates'] = _TEMPLATE_DOCUMENT['templates']
+    else:
+        compact['templates_url'] = '/api/templates'
+    return compact
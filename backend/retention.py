@@ -0,0 +1,215 @@
+"""
+Project Retention
+Deletes expired guest (and optionally user) projects in small batches
+
+Every anonymous generate persists a project, so guest rows would otherwise
+grow without bound. A background thread applies the policy below every
+RETENTION_INTERVAL_SECONDS. Each batch is its own short transaction with a
+pause in between, so the write lock is never held for long; on SQLite the
+freed pages are then returned with PRAGMA incremental_vacuum.
+
+Only one worker per machine runs a pass at a time (file lock). Run a single
+pass by hand with:
+
+    python retention.py
+"""
+
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def _env_int(name, default):
+    value = int(os.getenv(name, default))
+    return value if value > 0 else None
+
+
+# Zero or negative disables a limit
+POLICY = {
+    'guest': {
+        'ttl_days': _env_int('RETENTION_GUEST_TTL_DAYS', 30),
+        'max_rows': _env_int('RETENTION_GUEST_MAX_ROWS', 5000),
+    },
+    'user': {
+        'ttl_days': _env_int('RETENTION_USER_TTL_DAYS', 0),
+        'max_rows': _env_int('RETENTION_USER_MAX_ROWS', 0),
+    },
+}
+ENABLED = os.getenv('RETENTION_ENABLED', 'true').lower() == 'true'
+INTERVAL_SECONDS = float(os.getenv('RETENTION_INTERVAL_SECONDS', 600))
+BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', 200))
+BATCH_PAUSE_SECONDS = float(os.getenv('RETENTION_BATCH_PAUSE_SECONDS', 0.05))
+VACUUM_PAGES_PER_STEP = int(os.getenv('RETENTION_VACUUM_PAGES', 256))
+LOCK_FILE = os.path.join(tempfile.gettempdir(), 'sustainable-design-retention.lock')
+
+_stats_lock = threading.Lock()
+_stats = {
+    'runs': 0,
+    'rows_removed': {'guest': 0, 'user': 0},
+    'pages_reclaimed': 0,
+    'seconds_spent': 0.0,
+    'last_run': None,
+}
+# (timestamp, bytes) after each pass, for the size trend
+_size_history = deque(maxlen=48)
+_worker = None
+
+
+def _purge_scope(backend, guest, user_id, policy):
+    """Delete out-of-policy rows of one scope batch by batch"""
+    created_before = None
+    if policy['ttl_days']:
+        created_before = datetime.now() - timedelta(days=policy['ttl_days'])
+    if created_before is None and policy['max_rows'] is None:
+        return 0
+
+    removed = 0
+    while True:
+        ids = backend.delete_project_batch(
+            guest=guest,
+            user_id=user_id,
+            created_before=created_before,
+            keep_latest=policy['max_rows'],
+            batch_size=BATCH_SIZE,
+        )
+        removed += len(ids)
+        if len(ids) < BATCH_SIZE:
+            return removed
+        time.sleep(BATCH_PAUSE_SECONDS)
+
+
+def run_retention(backend):
+    """
+    Apply the retention policy once.
+
+    Args:
+        backend: db or db_supabase module
+
+    Returns:
+        Dict describing the pass
+    """
+    start = time.perf_counter()
+    guest_removed = _purge_scope(backend, True, None, POLICY['guest'])
+
+    user_removed = 0
+    user_policy = POLICY['user']
+    if user_policy['ttl_days'] or user_policy['max_rows']:
+        if user_policy['ttl_days']:
+            # TTL applies to every user, so sweep anyone over a zero-row limit
+            user_ids = backend.users_over_project_limit(0)
+        else:
+            user_ids = backend.users_over_project_limit(user_policy['max_rows'])
+        for user_id in user_ids:
+            user_removed += _purge_scope(backend, False, user_id, user_policy)
+
+    pages = 0
+    if guest_removed or user_removed:
+        while True:
+            step = backend.compact_storage(VACUUM_PAGES_PER_STEP)
+            pages += step
+            if step < VACUUM_PAGES_PER_STEP:
+                break
+            time.sleep(BATCH_PAUSE_SECONDS)
+
+    size = backend.database_size()
+    elapsed = time.perf_counter() - start
+
+    with _stats_lock:
+        _stats['runs'] += 1
+        _stats['rows_removed']['guest'] += guest_removed
+        _stats['rows_removed']['user'] += user_removed
+        _stats['pages_reclaimed'] += pages
+        _stats['seconds_spent'] += elapsed
+        _stats['last_run'] = datetime.now().isoformat()
+        _size_history.append((_stats['last_run'], size['bytes']))
+
+    return {
+        'guest_removed': guest_removed,
+        'user_removed': user_removed,
+        'pages_reclaimed': pages,
+        'database_bytes': size['bytes'],
+        'seconds': round(elapsed, 3),
+    }
+
+
+def _run_locked(backend):
+    """Run a pass unless another worker on this machine already is"""
+    if fcntl is None:
+        return run_retention(backend)
+    with open(LOCK_FILE, 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return None
+        try:
+            return run_retention(backend)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def start_retention_worker(backend):
+    """Start the background retention thread once per process"""
+    global _worker
+    if not ENABLED or _worker is not None:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(INTERVAL_SECONDS)
+            try:
+                _run_locked(backend)
+            except Exception as e:
+                print(f"⚠ Retention pass failed: {e}")
+
+    _worker = threading.Thread(target=loop, name='project-retention', daemon=True)
+    _worker.start()
+    return _worker
+
+
+def stats():
+    """Retention counters and the recent database size trend"""
+    with _stats_lock:
+        return {
+            'enabled': ENABLED,
+            'policy': POLICY,
+            'runs': _stats['runs'],
+            'rows_removed': dict(_stats['rows_removed']),
+            'pages_reclaimed': _stats['pages_reclaimed'],
+            'seconds_spent': round(_stats['seconds_spent'], 3),
+            'last_run': _stats['last_run'],
+            'size_trend': [{'at': at, 'bytes': size} for at, size in _size_history],
+        }
+
+
+def metrics():
+    """Flat counters for /api/metrics"""
+    with _stats_lock:
+        latest_size = _size_history[-1][1] if _size_history else 0
+        return {
+            'runs_total': _stats['runs'],
+            'guest_rows_removed_total': _stats['rows_removed']['guest'],
+            'user_rows_removed_total': _stats['rows_removed']['user'],
+            'pages_reclaimed_total': _stats['pages_reclaimed'],
+            'seconds_spent_total': round(_stats['seconds_spent'], 3),
+            'database_bytes': latest_size,
+        }
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    if os.getenv('DATABASE_URL'):
+        import db_supabase as backend
+    else:
+        import db as backend
+    backend.initialize_db()
+    print(f"✓ Retention pass: {run_retention(backend)}")
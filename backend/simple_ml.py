@@ -3,6 +3,9 @@ Lightweight ML Models for Sustainable Design
 Using simple statistical methods without heavy dependencies
 """
 
+import copy
+import hashlib
+import json
 import random
 import math
 from typing import List, Dict
@@ -120,6 +123,30 @@ class SimpleDesignRecommender:
     
     def recommend_design(self, constraints, top_n=3):
         """Find similar historical projects and recommend"""
+        return self._copied(self._recommend_for_priority(constraints.get('priority', 'energy'), top_n))
+
+    def recommend_batch(self, constraint_sets, top_n=3):
+        """
+        recommend_design for many constraint sets at once.
+
+        Recommendations depend only on the priority, so the history is
+        scanned once per distinct priority rather than once per item.
+        """
+        by_priority = {}
+        results = []
+        for constraints in constraint_sets:
+            priority = constraints.get('priority', 'energy')
+            if priority not in by_priority:
+                by_priority[priority] = self._recommend_for_priority(priority, top_n)
+            results.append(self._copied(by_priority[priority]))
+        return results
+
+    @staticmethod
+    def _copied(recommendation):
+        # Copies, so callers can never alter the shared training history
+        return dict(recommendation, similar_projects=copy.deepcopy(recommendation['similar_projects']))
+
+    def _recommend_for_priority(self, priority, top_n):
         if not self.historical:
             return {
                 'recommended_design': None,
@@ -128,7 +155,6 @@ class SimpleDesignRecommender:
             }
         
         # Find similar projects
-        priority = constraints.get('priority', 'energy')
         similar = [p for p in self.historical 
                   if p['constraints']['priority'] == priority]
         
@@ -158,6 +184,15 @@ class SimpleDesignRecommender:
         }
 
 
+def model_fingerprint(*models) -> str:
+    """Short content hash of trained model state; equal training data gives equal values"""
+    digest = hashlib.sha256()
+    for model in models:
+        digest.update(type(model).__name__.encode())
+        digest.update(json.dumps(model.__dict__, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
 def generate_synthetic_cost_data(n_samples: int = 200) -> List[Dict]:
     """Generate synthetic cost training data"""
     data = []
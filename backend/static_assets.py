@@ -0,0 +1,250 @@
+"""
+Static Assets
+Manifest-driven serving of the built frontend (frontend/dist)
+
+The build directory is indexed once at startup. For every file the manifest
+keeps its size, content type, a strong ETag and its precompressed variants
+(file.br / file.gz beside it), so a request is answered without touching the
+filesystem until the body is sent. Bodies go out through wsgi.file_wrapper,
+which gunicorn turns into sendfile(2); under uvicorn the ASGI server sends
+them natively (see asgi.py).
+
+Caching:
+    assets/<name>-<hash>.<ext>   public, max-age=1 year, immutable
+    everything else              no-cache (revalidated with the ETag)
+
+Missing variants are generated at startup into STATIC_CACHE_DIR when
+STATIC_PRECOMPRESS is on (brotli needs the optional "brotli" package). They
+can also be produced beside the build output as a build step, which keeps
+worker startup fast:
+
+    python static_assets.py ../frontend/dist
+
+The manifest is not refreshed while running: restart after a new build.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+import tempfile
+from collections import namedtuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PRECOMPRESS = os.getenv('STATIC_PRECOMPRESS', 'true').lower() == 'true'
+MIN_COMPRESS_SIZE = int(os.getenv('STATIC_MIN_COMPRESS_SIZE', 1024))
+CACHE_DIR = os.getenv('STATIC_CACHE_DIR') or os.path.join(
+    tempfile.gettempdir(), 'sustainable-design-static'
+)
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+# Vite names build output assets/<name>-<8 char hash>.<ext>
+HASHED_ASSET = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/javascript', 'application/json', 'application/xml',
+    'image/svg+xml', 'application/wasm', 'application/manifest+json',
+)
+# Preference order when the client accepts several
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+Variant = namedtuple('Variant', ['path', 'size', 'etag'])
+Entry = namedtuple('Entry', ['path', 'size', 'content_type', 'etag', 'cache_control', 'variants'])
+
+manifest = {}
+
+
+def _content_type(path):
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type == 'application/javascript':
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def _compressible(content_type, size):
+    return size >= MIN_COMPRESS_SIZE and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _compress(encoding, data):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11) if brotli is not None else None
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _write_atomic(target, data):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, target)
+
+
+def _variants(path, data, content_type, etag, precompress, variant_dir):
+    variants = {}
+    if not _compressible(content_type, len(data)):
+        return variants
+    for encoding, suffix in ENCODINGS:
+        # Shipped with the build, or generated earlier (by another worker)
+        candidates = [path + suffix]
+        if variant_dir:
+            candidates.append(os.path.join(variant_dir, etag + suffix))
+        variant_path = next((c for c in candidates if os.path.isfile(c)), None)
+        if variant_path is not None and variant_path == path + suffix \
+                and os.path.getmtime(variant_path) < os.path.getmtime(path):
+            variant_path = None
+        if variant_path is None:
+            if not precompress:
+                continue
+            compressed = _compress(encoding, data)
+            # Not worth a separate representation unless it saves a tenth
+            if compressed is None or len(compressed) > 0.9 * len(data):
+                continue
+            variant_path = candidates[-1]
+            try:
+                _write_atomic(variant_path, compressed)
+            except OSError as e:
+                print(f"⚠ Could not write {variant_path}: {e}")
+                continue
+        variants[encoding] = Variant(variant_path, os.path.getsize(variant_path), f"{etag}-{suffix[1:]}")
+    return variants
+
+
+def build_manifest(root, precompress=PRECOMPRESS, variant_dir=CACHE_DIR):
+    """
+    Index every file under root by its URL path.
+
+    Generated variants are written to variant_dir, named by content hash so
+    workers share them; None writes them beside the source files.
+    """
+    entries = {}
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.endswith(('.gz', '.br', '.tmp')):
+                continue
+            path = os.path.join(directory, name)
+            url_path = os.path.relpath(path, root).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = f.read()
+            etag = hashlib.sha256(data).hexdigest()[:20]
+            content_type = _content_type(path)
+            cache_control = IMMUTABLE_CACHE if HASHED_ASSET.match(url_path) else REVALIDATE_CACHE
+            entries[url_path] = Entry(
+                path, len(data), content_type, etag, cache_control,
+                _variants(path, data, content_type, etag, precompress, variant_dir),
+            )
+    return entries
+
+
+def _accepted(accept_encoding):
+    """Encodings the client accepts (q > 0)"""
+    accepted = set()
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == '*' or tag.strip('"') == etag:
+            return True
+    return False
+
+
+def lookup(path):
+    """Manifest entry for a URL path, falling back to index.html for SPA routes"""
+    return manifest.get(path or 'index.html') or manifest.get('index.html')
+
+
+def select(entry, accept_encoding, if_none_match):
+    """
+    Pick the representation of an entry for a request.
+
+    Returns:
+        (status, headers, file_path) where file_path is None for a 304
+    """
+    path, size, etag, encoding = entry.path, entry.size, entry.etag, None
+    accepted = _accepted(accept_encoding)
+    for name, _ in ENCODINGS:
+        if name in entry.variants and name in accepted:
+            variant = entry.variants[name]
+            path, size, etag, encoding = variant.path, variant.size, variant.etag, name
+            break
+
+    headers = [('ETag', f'"{etag}"'), ('Cache-Control', entry.cache_control)]
+    if entry.variants:
+        headers.append(('Vary', 'Accept-Encoding'))
+    if _etag_matches(if_none_match, etag):
+        return 304, headers, None
+
+    headers.extend([('Content-Type', entry.content_type), ('Content-Length', str(size))])
+    if encoding:
+        headers.append(('Content-Encoding', encoding))
+    return 200, headers, path
+
+
+def init_static(app, root):
+    """Index the frontend build and install the SPA routes"""
+    from flask import request
+    from werkzeug.wsgi import wrap_file
+
+    if os.path.isdir(root):
+        manifest.update(build_manifest(root))
+        compressed = sum(1 for entry in manifest.values() if entry.variants)
+        print(f"✓ Static manifest: {len(manifest)} files, {compressed} precompressed"
+              f"{'' if brotli is not None else ' (gzip only, brotli not installed)'}")
+
+    def serve(path):
+        entry = lookup(path)
+        if entry is None:
+            return None
+        status, headers, file_path = select(
+            entry, request.headers.get('Accept-Encoding'), request.headers.get('If-None-Match')
+        )
+        if file_path is None:
+            return app.response_class(status=status, headers=headers)
+        body = wrap_file(request.environ, open(file_path, 'rb'))
+        return app.response_class(body, status=status, headers=headers, direct_passthrough=True)
+
+    @app.route('/', methods=['GET', 'HEAD'])
+    def serve_frontend_index():
+        """Serve index.html for root path"""
+        return serve('') or ({'status': 'API active', 'message': 'Frontend not built'}, 200)
+
+    @app.route('/<path:path>', methods=['GET', 'HEAD'])
+    def serve_frontend_routes(path):
+        """Serve frontend for SPA routing, fallback for non-API routes"""
+        if path.startswith('api/'):
+            return {'error': 'Endpoint not found'}, 404
+        return serve(path) or ({'error': 'Not found'}, 404)
+
+    return app
+
+
+if __name__ == '__main__':
+    build_root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(__file__), '..', 'frontend', 'dist'
+    )
+    for url_path, entry in sorted(build_manifest(build_root, precompress=True, variant_dir=None).items()):
+        sizes = ', '.join(f"{name} {variant.size}" for name, variant in entry.variants.items())
+        print(f"{url_path}: {entry.size} bytes{f' ({sizes})' if sizes else ''} [{entry.cache_control}]")
@@ -0,0 +1,413 @@
+"""
+Monte Carlo Uncertainty Analysis
+Percentile bands for cost, payback and operational carbon under uncertain
+inputs
+
+The evaluator and cost model give point estimates for exact inputs. Here
+the inputs are sampled instead:
+
+    area_tolerance     area ~ triangular(area * (1 - t), area, area * (1 + t))
+    budget_range       budget ~ uniform integer in budget +/- r, within 0-100
+    climate_mix        climate drawn from {"cold": w, ...}; default the given one
+    cost_per_sqft_cv   market price factor ~ lognormal, mean 1, this CV;
+                       scales both the rule-based and the ML cost
+
+and pushed through vectorized twins of SustainabilityEvaluator's cost,
+energy, payback and operational carbon rules and of SimpleCostPredictor.
+Every design sees the same samples, so bands are comparable across designs.
+Results are deterministic for a given seed.
+
+With numpy the whole run is array arithmetic (100k samples in a few tens of
+milliseconds). Without it the scalar evaluator is called per sample and
+the sample count is capped at FALLBACK_MAX_SAMPLES.
+"""
+
+import math
+import os
+import random
+
+from evaluator import SustainabilityEvaluator
+from generator import DesignGenerator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_SAMPLES = int(os.getenv('MONTE_CARLO_SAMPLES', 100000))
+MAX_SAMPLES = int(os.getenv('MONTE_CARLO_MAX_SAMPLES', 200000))
+FALLBACK_MAX_SAMPLES = int(os.getenv('MONTE_CARLO_FALLBACK_MAX_SAMPLES', 5000))
+
+DEFAULTS = {
+    'area_tolerance': 0.10,
+    'budget_range': 10,
+    'cost_per_sqft_cv': 0.12,
+    'seed': 0,
+}
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+METRICS = ('estimated_cost', 'ml_predicted_cost', 'payback_period_years', 'operational_carbon')
+CLIMATES = ('cold', 'moderate', 'hot')
+
+# Mirrors SustainabilityEvaluator._evaluate_energy; benchmarks/bench_uncertainty.py
+# checks the two agree sample for sample
+DESIGN_ENERGY_BONUS = {'design-a': 15, 'design-b': 6, 'design-c': 8}
+
+_evaluator = SustainabilityEvaluator()
+_generator = DesignGenerator()
+
+
+def parse_params(data):
+    """
+    Uncertainty parameters from a request payload.
+
+    Returns:
+        (params dict, errors list)
+    """
+    errors = []
+    params = {name: data.get(name, default) for name, default in DEFAULTS.items()}
+
+    def number(name, low, high):
+        value = params[name]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+            errors.append(f'{name} must be a number between {low} and {high}')
+
+    number('area_tolerance', 0, 0.5)
+    number('budget_range', 0, 50)
+    number('cost_per_sqft_cv', 0, 1)
+    if not isinstance(params['seed'], int) or isinstance(params['seed'], bool):
+        errors.append('seed must be an integer')
+
+    limit = MAX_SAMPLES if np is not None else FALLBACK_MAX_SAMPLES
+    samples = data.get('samples', DEFAULT_SAMPLES)
+    if isinstance(samples, bool) or not isinstance(samples, int) or samples < 100:
+        errors.append('samples must be an integer of at least 100')
+    params['samples'] = min(samples, limit) if isinstance(samples, int) else samples
+
+    mix = data.get('climate_mix') or {data.get('climate'): 1.0}
+    if 'climate_mix' not in data and data.get('climate') not in CLIMATES:
+        # Reported by constraint validation
+        params['climate_mix'] = None
+    elif (not isinstance(mix, dict) or any(c not in CLIMATES for c in mix)
+            or any(not isinstance(w, (int, float)) or w < 0 for w in mix.values())
+            or sum(mix.values()) <= 0):
+        errors.append(f'climate_mix must map {", ".join(CLIMATES)} to non-negative weights')
+    else:
+        total = float(sum(mix.values()))
+        params['climate_mix'] = {c: round(mix[c] / total, 6) for c in CLIMATES if mix.get(c)}
+
+    design_ids = data.get('design_ids')
+    if design_ids is not None and (not isinstance(design_ids, list)
+                                   or any(d not in DESIGN_ENERGY_BONUS for d in design_ids)):
+        errors.append(f'design_ids must be a list drawn from {", ".join(DESIGN_ENERGY_BONUS)}')
+    params['design_ids'] = design_ids
+
+    return params, errors
+
+
+# ==================== VECTORIZED ENGINE ====================
+
+def sample_inputs(constraints, params):
+    """Arrays of sampled area, budget, climate index and price factor"""
+    rng = np.random.default_rng(params['seed'])
+    n = params['samples']
+    area = float(constraints['area'])
+    tolerance = params['area_tolerance']
+    if tolerance > 0:
+        areas = rng.triangular(area * (1 - tolerance), area, area * (1 + tolerance), n)
+    else:
+        areas = np.full(n, area)
+
+    budget = int(constraints['budget'])
+    spread = int(params['budget_range'])
+    budgets = rng.integers(max(0, budget - spread), min(100, budget + spread) + 1, n)
+
+    mix = params['climate_mix']
+    codes = [CLIMATES.index(c) for c in mix]
+    if len(codes) == 1:
+        climates = np.full(n, codes[0], dtype=np.intp)
+    else:
+        weights = np.array(list(mix.values()))
+        climates = rng.choice(np.array(codes, dtype=np.intp), size=n, p=weights / weights.sum())
+
+    cv = params['cost_per_sqft_cv']
+    sigma = math.sqrt(math.log(1 + cv * cv))
+    factors = rng.lognormal(-sigma * sigma / 2, sigma, n) if cv > 0 else np.ones(n)
+    return {'area': areas, 'budget': budgets, 'climate': climates, 'price_factor': factors}
+
+
+def _tables():
+    """Lookup tables over budget (0-100) and energy score (0-100)"""
+    budgets = np.arange(101)
+    energies = np.arange(101)
+    return {
+        # _estimate_cost: cost per sq ft and contingency by budget
+        'per_sqft': np.where(budgets < 33, 100, np.where(budgets < 67, 180, 280)).astype(float),
+        'contingency': np.where(budgets < 50, 0.15, 0.10),
+        # _evaluate_energy: budget term
+        'energy_budget': np.where(budgets >= 75, 20, np.where(budgets >= 50, 10, 0)),
+        # _estimate_payback taken from the scalar rule itself: [budget < 30][energy]
+        'payback': np.array([
+            [_evaluator._estimate_payback(int(e), 50) for e in energies],
+            [_evaluator._estimate_payback(int(e), 0) for e in energies],
+        ], dtype=float),
+    }
+
+
+_TABLES = _tables() if np is not None else None
+
+
+def estimated_cost(area, budget):
+    """Vectorized SustainabilityEvaluator._estimate_cost"""
+    total = area * _TABLES['per_sqft'][budget]
+    return np.floor(total + total * _TABLES['contingency'][budget])
+
+
+def energy_base(area, budget, climate, priority):
+    """Design-independent part of SustainabilityEvaluator._evaluate_energy"""
+    score = 50 + _TABLES['energy_budget'][budget] + np.array([5, 0, -5])[climate]
+    if priority == 'energy':
+        score += 25
+    score += np.where(area < 800, 8, np.where(area > 1600, -5, 0))
+    return score
+
+
+def energy_score(design, base):
+    """Vectorized SustainabilityEvaluator._evaluate_energy from energy_base"""
+    bonus = DESIGN_ENERGY_BONUS.get(design.get('id'), 0) + (4 if design.get('renewable_ready') else 0)
+    return np.clip(base + bonus, 0, 100)
+
+
+def payback_years(energy, budget):
+    """Vectorized SustainabilityEvaluator._estimate_payback"""
+    return _TABLES['payback'][(budget < 30).astype(np.intp), energy]
+
+
+def payback_band(energy, low_budget):
+    """
+    Band of payback_years without materializing it: payback is a lookup on
+    (budget < 30, energy), so counting those codes is enough.
+    """
+    counts = np.bincount(energy + 101 * low_budget, minlength=202)
+    values = _TABLES['payback'].ravel()
+    order = np.argsort(values, kind='stable')
+    return _counted_band(values[order], counts[order])
+
+
+def operational_carbon(area, energy):
+    """Vectorized SustainabilityEvaluator._estimate_operational_carbon (unrounded)"""
+    return area * 3.5 * (100 - energy) / 100
+
+
+def ml_cost_base(cost_predictor, area, budget, climate):
+    """Vectorized SimpleCostPredictor.predict without the design term and clipping"""
+    if not cost_predictor.is_trained:
+        return None
+    coefficients = cost_predictor.coefficients
+    climate_cost = np.array([coefficients['climate'].get(c, 0) for c in CLIMATES])[climate]
+    return (cost_predictor.mean_cost * 0.7 + (area / 1000) * coefficients['area']
+            + (budget / 100) * coefficients['budget'] + climate_cost)
+
+
+def ml_cost(cost_predictor, design_index, base):
+    """Vectorized SimpleCostPredictor.predict from ml_cost_base"""
+    coefficients = cost_predictor.coefficients
+    design_cost = coefficients['design'][design_index] if design_index < 3 else 0
+    return np.clip(base + design_cost, 10000, 500000)
+
+
+def _propagate_numpy(constraints, designs, cost_predictor, params):
+    samples = sample_inputs(constraints, params)
+    area, budget, climate, factor = samples['area'], samples['budget'], samples['climate'], samples['price_factor']
+    energy0 = energy_base(area, budget, climate, constraints['priority'])
+    ml0 = ml_cost_base(cost_predictor, area, budget, climate)
+
+    low_budget = (budget < 30).astype(np.intp)
+
+    cost_band = _sorted_band(estimated_cost(area, budget) * factor)
+    bands = {}
+    for index, design in designs:
+        energy = energy_score(design, energy0)
+        bands[(design['id'], 'estimated_cost')] = cost_band
+        if ml0 is not None:
+            bands[(design['id'], 'ml_predicted_cost')] = _sorted_band(ml_cost(cost_predictor, index, ml0) * factor)
+        bands[(design['id'], 'payback_period_years')] = payback_band(energy, low_budget)
+        bands[(design['id'], 'operational_carbon')] = _sorted_band(operational_carbon(area, energy))
+    return bands
+
+
+def _counted_band(values, counts):
+    """_sorted_band for sorted distinct values with their sample counts"""
+    n = counts.sum()
+    mean = (values * counts).sum() / n
+    std = np.sqrt((((values - mean) ** 2) * counts).sum() / n)
+    # The k-th order statistic is the first value whose running count exceeds k
+    ends = np.cumsum(counts)
+    positions = np.array(PERCENTILES) / 100 * (n - 1)
+    low = positions.astype(np.int64)
+    high = np.minimum(low + 1, n - 1)
+    at_low = values[np.searchsorted(ends, low, side='right')]
+    at_high = values[np.searchsorted(ends, high, side='right')]
+    return _band(mean, std, at_low + (at_high - at_low) * (positions - low))
+
+
+def _sorted_band(values):
+    """Mean, std and linear-interpolated percentiles (numpy's default method)"""
+    n = len(values)
+    mean = values.sum() / n
+    centered = values - mean
+    std = np.sqrt(centered @ centered / n)
+    # A full in-place sort of one row is several times cheaper than
+    # np.percentile's multi-kth partition at these sizes
+    values.sort()
+    positions = np.array(PERCENTILES) / 100 * (n - 1)
+    low = positions.astype(int)
+    high = np.minimum(low + 1, n - 1)
+    percentiles = values[low] + (values[high] - values[low]) * (positions - low)
+    return _band(mean, std, percentiles)
+
+
+# ==================== PURE PYTHON FALLBACK ====================
+
+def _percentile(ordered, q):
+    """Linear interpolation, same as numpy's default"""
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _python_samples(constraints, params):
+    """(area, budget, climate, price factor) tuples, the scalar twin of sample_inputs"""
+    rng = random.Random(params['seed'])
+    area0, budget0 = constraints['area'], int(constraints['budget'])
+    tolerance, spread = params['area_tolerance'], int(params['budget_range'])
+    climates, weights = list(params['climate_mix']), list(params['climate_mix'].values())
+    cv = params['cost_per_sqft_cv']
+    sigma = math.sqrt(math.log(1 + cv * cv))
+    for _ in range(params['samples']):
+        yield (
+            rng.triangular(area0 * (1 - tolerance), area0 * (1 + tolerance), area0),
+            rng.randint(max(0, budget0 - spread), min(100, budget0 + spread)),
+            rng.choices(climates, weights)[0],
+            rng.lognormvariate(-sigma * sigma / 2, sigma) if cv > 0 else 1.0,
+        )
+
+
+def _propagate_python(constraints, designs, cost_predictor, params):
+    values = {(design['id'], metric): [] for _, design in designs for metric in METRICS}
+    for area, budget, climate, factor in _python_samples(constraints, params):
+        sample = dict(constraints, area=area, budget=budget, climate=climate)
+        for index, design in designs:
+            energy = _evaluator._evaluate_energy(design, sample)
+            values[(design['id'], 'estimated_cost')].append(_evaluator._estimate_cost(area, budget) * factor)
+            predicted = cost_predictor.predict(area, budget, climate, sample['priority'], index)
+            if predicted is not None:
+                values[(design['id'], 'ml_predicted_cost')].append(predicted * factor)
+            values[(design['id'], 'payback_period_years')].append(_evaluator._estimate_payback(energy, budget))
+            values[(design['id'], 'operational_carbon')].append(area * 3.5 * (100 - energy) / 100)
+
+    results = {}
+    for label, series in values.items():
+        if not series:
+            continue
+        ordered = sorted(series)
+        mean = sum(series) / len(series)
+        std = math.sqrt(sum((v - mean) ** 2 for v in series) / len(series))
+        results[label] = _band(mean, std, [_percentile(ordered, q) for q in PERCENTILES])
+    return results
+
+
+# ==================== ENTRY POINT ====================
+
+def _band(mean, std, percentiles):
+    band = {'mean': round(float(mean), 2), 'std': round(float(std), 2)}
+    band.update({f'p{q}': round(float(v), 2) for q, v in zip(PERCENTILES, percentiles)})
+    return band
+
+
+def analyze(constraints, cost_predictor, params):
+    """
+    Monte Carlo bands per design.
+
+    Args:
+        constraints: validated constraints (area, budget, climate, priority)
+        cost_predictor: trained cost model of the current ModelSet
+        params: output of parse_params
+
+    Returns:
+        Response dict with per-design point estimates and percentile bands
+    """
+    wanted = params.get('design_ids')
+    designs = [
+        (index, design) for index, design in enumerate(_generator.generate(constraints))
+        if wanted is None or design['id'] in wanted
+    ]
+    propagate = _propagate_numpy if np is not None else _propagate_python
+    bands = propagate(constraints, designs, cost_predictor, params)
+
+    results = {}
+    for index, design in designs:
+        metrics = _evaluator.evaluate(design, constraints)
+        point = {
+            'estimated_cost': metrics['estimatedCost'],
+            'ml_predicted_cost': cost_predictor.predict(
+                constraints['area'], constraints['budget'], constraints['climate'],
+                constraints['priority'], index
+            ),
+            'payback_period_years': metrics['payback_period_years'],
+            'operational_carbon': metrics['lifecycle_analysis']['operational'],
+        }
+        results[design['id']] = {
+            'name': design.get('name'),
+            'point_estimate': point,
+            **{metric: bands[(design['id'], metric)] for metric in METRICS if (design['id'], metric) in bands},
+        }
+
+    return {
+        'designs': results,
+        'samples': params['samples'],
+        'seed': params['seed'],
+        'engine': 'numpy' if np is not None else 'python',
+        'percentiles': list(PERCENTILES),
+        'assumptions': {
+            'area_tolerance': params['area_tolerance'],
+            'budget_range': params['budget_range'],
+            'climate_mix': params['climate_mix'],
+            'cost_per_sqft_cv': params['cost_per_sqft_cv'],
+        },
+        'units': {
+            'estimated_cost': 'USD',
+            'ml_predicted_cost': 'USD',
+            'payback_period_years': 'years',
+            'operational_carbon': 'kg CO2e per year',
+        },
+    }
+
+
+def cost_interval(constraints, cost_predictor, design_index, samples=20000, within=0.10):
+    """
+    Spread of the ML cost under default input uncertainty.
+
+    Returns:
+        (p10/p50/p90 dict, share of samples within +/- `within` of the
+        point prediction) or (None, None) if the model is not trained
+    """
+    params, errors = parse_params(dict(constraints, samples=samples))
+    if errors or not cost_predictor.is_trained:
+        return None, None
+    point = cost_predictor.predict(constraints['area'], constraints['budget'], constraints['climate'],
+                                   constraints['priority'], design_index)
+    if np is not None:
+        drawn = sample_inputs(constraints, params)
+        base = ml_cost_base(cost_predictor, drawn['area'], drawn['budget'], drawn['climate'])
+        costs = ml_cost(cost_predictor, design_index, base) * drawn['price_factor']
+        p10, p50, p90 = np.percentile(costs, (10, 50, 90))
+        share = float(np.mean(np.abs(costs - point) <= within * point))
+    else:
+        costs = sorted(
+            cost_predictor.predict(area, budget, climate, constraints['priority'], design_index) * factor
+            for area, budget, climate, factor in _python_samples(constraints, params)
+        )
+        p10, p50, p90 = (_percentile(costs, q) for q in (10, 50, 90))
+        share = sum(1 for cost in costs if abs(cost - point) <= within * point) / len(costs)
+    return {'p10': round(float(p10)), 'p50': round(float(p50)), 'p90': round(float(p90))}, round(share, 3)